@@ -1,3 +1,5 @@
+import os
+
 from tools.report_builder import build_full_report
 from tools.full_risk_engine import analyze_full_contract_risk
 
@@ -9,8 +11,17 @@ from tools.legal_question_generator import generate_legal_questions
 
 from tools.rule_based_qa import rule_based_answer
 from tools.llm_qa import answer_with_llm
+from rag.bm25 import tokenize
+
 
-from tools.confidence import average_confidence, top_confidence, l2_to_confidence
+# Keyword fast path for QA: answer from BM25 hits alone (no query embedding)
+# when the query has enough terms, the best clause covers most of them and it
+# clearly beats the runner-up. (One or two terms are covered fully by every
+# clause that has them, so coverage says little there.)
+QA_KEYWORD_FASTPATH = os.getenv("QA_KEYWORD_FASTPATH", "1") not in {"0", "false", "False", ""}
+QA_KEYWORD_MIN_TERMS = int(os.getenv("QA_KEYWORD_MIN_TERMS", "3"))
+QA_KEYWORD_MIN_COVERAGE = float(os.getenv("QA_KEYWORD_MIN_COVERAGE", "0.8"))
+QA_KEYWORD_MIN_MARGIN = float(os.getenv("QA_KEYWORD_MIN_MARGIN", "1.5"))
 
 
 # Map tool name -> callable
@@ -39,6 +50,31 @@ def _extract_clause_ids(hits):
     return sorted(list(set(cids)))
 
 
+def _keyword_decisive(user_query: str, lexical) -> bool:
+    """
+    lexical: [(cid, txt, bm25, coverage), ...] best first
+    """
+    if not lexical or len(set(tokenize(user_query))) < QA_KEYWORD_MIN_TERMS:
+        return False
+    _, _, top_score, top_cov = lexical[0]
+    if top_cov < QA_KEYWORD_MIN_COVERAGE:
+        return False
+    return len(lexical) == 1 or top_score >= QA_KEYWORD_MIN_MARGIN * lexical[1][2]
+
+
+def _retrieve_for_qa(user_query: str, vector_store, k: int):
+    """
+    -> ([(cid, txt, confidence, coverage), ...], "keyword" | "hybrid")
+    confidence is the calibrated dense confidence on the hybrid path. The
+    keyword path has no embedding, so there it is the coverage that passed
+    the fast-path gates.
+    """
+    lexical = vector_store.keyword_search(user_query, k=max(k * 2, 10))
+    if QA_KEYWORD_FASTPATH and _keyword_decisive(user_query, lexical):
+        return [(cid, txt, cov, cov) for cid, txt, _, cov in lexical[:k]], "keyword"
+    return vector_store.hybrid_search_with_scores(user_query, k=k, lexical=lexical), "hybrid"
+
+
 def _run_qa(user_query: str, store, vector_store, k: int):
     """
     RAW QA result (JSON-friendly):
@@ -46,21 +82,22 @@ def _run_qa(user_query: str, store, vector_store, k: int):
       "answer": "...",
       "confidence": 0.0..1.0,
       "method": "rule_based" | "llm",
+      "retrieval": "keyword" | "hybrid",
       "citations": [clause_ids...],           # filtered for strength
-      "evidence": [{"clause_id": id, "confidence": 0..1}, ...]
+      "evidence": [{"clause_id": id, "confidence": 0..1, "coverage": 0..1}, ...]
     }
     """
-    hits_scored = vector_store.search_with_scores(user_query, k=k)  # [(cid, txt, dist), ...]
+    hits_scored, retrieval = _retrieve_for_qa(user_query, vector_store, k)  # [(cid, txt, conf, coverage), ...]
 
-    distances = [dist for _, _, dist in hits_scored] if hits_scored else []
-    avg_conf = average_confidence(distances) if distances else 0.0
-    best_conf = top_confidence(distances) if distances else 0.0
+    confs = [conf for _, _, conf, _ in hits_scored]
+    avg_conf = sum(confs) / len(confs) if confs else 0.0
+    best_conf = max(confs) if confs else 0.0
 
-    hits = [(cid, txt) for (cid, txt, _) in hits_scored]
+    hits = [(cid, txt) for (cid, txt, _, _) in hits_scored]
 
     evidence = [
-        {"clause_id": cid, "confidence": round(l2_to_confidence(dist), 3)}
-        for (cid, _, dist) in hits_scored
+        {"clause_id": cid, "confidence": round(conf, 3), "coverage": round(cov, 3)}
+        for (cid, _, conf, cov) in hits_scored
     ]
 
     # Only citing clauses with reasonably strong evidence
@@ -78,6 +115,7 @@ def _run_qa(user_query: str, store, vector_store, k: int):
             "answer": rb,
             "confidence": round(conf, 3),
             "method": "rule_based",
+            "retrieval": retrieval,
             "citations": strong_cites,  
             "evidence": evidence
         }
@@ -95,6 +133,7 @@ def _run_qa(user_query: str, store, vector_store, k: int):
         "answer": ans,
         "confidence": round(avg_conf, 3),
         "method": "llm",
+        "retrieval": retrieval,
         "citations": citations,
         "evidence": evidence
     }
@@ -1,5 +1,6 @@
 from llm import call_llm
-from tools.json_utils import safe_json_load
+from tools.llm_metrics import record_parse
+from tools.json_utils import parses_as, safe_json_load
 import re
 
 ALLOWED_INTENTS = {
@@ -120,12 +121,13 @@ Schema:
 """
     user_prompt = f"User query:\n{raw}\n\nReturn the plan JSON."
 
-    resp = call_llm(system_prompt=system_prompt, user_prompt=user_prompt).strip()
+    resp = call_llm(system_prompt=system_prompt, user_prompt=user_prompt, tool="planner", validate=parses_as(dict)).strip()
     resp = re.sub(r"^```(?:json)?\s*|\s*```$", "", resp).strip()
 
     try:
         obj = safe_json_load(resp)
         if not isinstance(obj, dict):
+            record_parse("planner", False)
             return {"intent": "qa", "k": 5, "steps": [{"tool": "qa", "args": {}}], "notes": "planner_not_dict"}
 
         obj.setdefault("intent", "qa")
@@ -136,6 +138,8 @@ Schema:
         if not isinstance(obj["steps"], list) or len(obj["steps"]) == 0:
             obj["steps"] = [{"tool": "qa", "args": {}}]
 
+        record_parse("planner", True)
         return obj
     except Exception:
+        record_parse("planner", False)
         return {"intent": "qa", "k": 5, "steps": [{"tool": "qa", "args": {}}], "notes": "planner_parse_error"}
\ No newline at end of file
@@ -1,8 +1,43 @@
+from sqlalchemy import inspect, text
+
 from api.db import engine
 from api.models import Base
 
+# Columns added after the first release; create_all() doesn't alter existing tables
+ADDED_COLUMNS = {
+    "contracts": {
+        "parent_contract_id": "VARCHAR",
+        "version": "INTEGER DEFAULT 1",
+        "file_sha256": "VARCHAR(64)",
+    },
+    "clauses": {
+        "content_hash": "VARCHAR(64)",
+        "type_source": "VARCHAR(16)",
+    },
+}
+
+# ... and their lookup indexes
+ADDED_INDEXES = {
+    "ix_contracts_file_sha256": ("contracts", "file_sha256"),
+}
+
+def ensure_columns():
+    insp = inspect(engine)
+    with engine.begin() as conn:
+        for table, columns in ADDED_COLUMNS.items():
+            if not insp.has_table(table):
+                continue
+            have = {c["name"] for c in insp.get_columns(table)}
+            for name, ddl in columns.items():
+                if name not in have:
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+        for index, (table, column) in ADDED_INDEXES.items():
+            if insp.has_table(table):
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS {index} ON {table} ({column})"))
+
 def init_db():
     Base.metadata.create_all(bind = engine)
+    ensure_columns()
 
 if __name__ =="__main__":
     init_db()
@@ -1,12 +1,18 @@
 import os
+import mmap
 import time
 import uuid
+import hashlib
 from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
 
 from fastapi import (
     FastAPI,
     UploadFile,
     File,
+    Form,
     HTTPException,
     Depends,
     Path as FPath,
@@ -24,46 +30,94 @@ from api.schemas import (
     QueryRequest,
     QueryResponse,
     HistoryResponse,
+    PortfolioSearchRequest,
+    PortfolioSearchResponse,
 )
 from api.db import get_db, engine, SessionLocal
-from api.models import Base, User
+from api.models import Base, Clause, Contract, User
 from api.persistence import (
     create_contract,
     get_contract,
+    find_contract_by_sha256,
+    list_llm_clause_labels,
     set_last_result,
     get_last_result,
     add_run,
     get_history,
 )
 
+from api.init_db import ensure_columns
+from api.upload_limit import UploadSizeLimitMiddleware
 from api.auth import router as auth_router
 from api.deps import get_current_user
+from api.state import (
+    ContractSession,
+    get_session,
+    index_version,
+    invalidate_session,
+    session_stats,
+    set_session,
+)
 
 from tools.contract_parser import load_contract, split_into_clauses
-from tools.clause_classifier import classify_clauses_batch
+from tools.clause_classifier import classify_clauses
+from tools.local_clause_classifier import local_classifier_stats, set_label_source, warm_local_classifier
 
 from rag.contract_store import ContractStore
-from rag.vector_store import VectorStore
+from rag.contract_revision import content_hash, match_by_hash, match_by_similarity
+from rag.vector_store import EMBED_DIM, VectorStore, encode_texts, link_index
+from rag.corpus_index import get_corpus_store
+from rag.embedding_cache import embedding_cache_stats
+from rag.query_embeddings import static_query_stats
 
 from agents.planner import plan
 from agents.executor import execute
 
 from tools.logger import logger
 from tools.metrics import time_it
+from tools.confidence import l2_to_confidence
+from tools.llm_cache import cache_stats
+from tools.single_flight import get_group, single_flight_stats
+
+from tools.rate_limiter import rate_limiter_stats
+
+from tools.llm_metrics import contract_usage, llm_usage_summary
+from tools.static_queries import all_static_queries, prepare_static_query_embeddings
+from rag.embedding_server import embedding_server_stats
+
+from llm import LLMTimeoutError, llm_deadline, llm_priority, llm_stats, llm_tags
 
 
 app = FastAPI(title="Contract Analyzer API", version="1.0")
 
 
 # ---------------- Startup ----------------
+def _stored_llm_labels(limit: int):
+    db = SessionLocal()
+    try:
+        return list_llm_clause_labels(db, limit)
+    finally:
+        db.close()
+
+
 @app.on_event("startup")
 def on_startup():
     try:
         Base.metadata.create_all(bind=engine)
+        ensure_columns()
         logger.info("[startup] DB tables ensured")
     except Exception as e:
         logger.exception(f"[startup] init failed: {e}")
 
+    set_label_source(_stored_llm_labels)
+    # fitted off the request path; ingest uses the LLM until it is ready
+    warm_local_classifier()
+
+    try:
+        prepare_static_query_embeddings()
+    except Exception as e:
+        logger.warning(f"[startup] static query embeddings not ready (will encode on demand): {e}")
+
 
 app.include_router(auth_router)
 
@@ -92,6 +146,23 @@ app.add_middleware(
 )
 
 
+def _max_upload_bytes() -> int:
+    return int(os.getenv("MAX_PDF_MB", "5")) * 1024 * 1024
+
+
+def _too_large_detail() -> str:
+    return f"PDF too large. Max {os.getenv('MAX_PDF_MB', '5')}MB."
+
+
+# 413 before the multipart body is spooled, not after
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    paths=["/contracts/upload"],
+    max_bytes=_max_upload_bytes,
+    detail=_too_large_detail,
+)
+
+
 # ---------------- Data dirs ----------------
 DATA_DIR = os.getenv("DATA_DIR", "/tmp/data")
 CONTRACTS_DIR = Path(DATA_DIR) / "contracts"
@@ -100,6 +171,18 @@ CONTRACTS_DIR.mkdir(parents=True, exist_ok=True)
 INDEX_DIR.mkdir(parents=True, exist_ok=True)
 
 
+# Byte-identical uploads reuse an already processed contract instead of re-running
+# parse/classify/embed: "user" (own uploads only), "global" (any owner's copy) or "off".
+# Only own copies are reused in the upload response; a match from another tenant is
+# applied in the background task so the response never reveals it exists.
+UPLOAD_DEDUP_SCOPE = os.getenv("UPLOAD_DEDUP_SCOPE", "user").strip().lower()
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+
+
+# Wall-clock budget for all LLM calls of one /query request (0 = no limit)
+QUERY_LLM_DEADLINE_S = float(os.getenv("LLM_QUERY_DEADLINE_S", "90"))
+
+
 VALID_MODES = {
     "qa",
     "summary_only",
@@ -112,8 +195,12 @@ VALID_MODES = {
 }
 
 
-def build_contract_index_from_text(text_data: str):
-    MAX_CHARS = int(os.getenv("MAX_CONTRACT_CHARS", "200000"))
+def _max_contract_chars() -> int:
+    return int(os.getenv("MAX_CONTRACT_CHARS", "200000"))
+
+
+def _split_for_index(text_data: str):
+    MAX_CHARS = _max_contract_chars()
     if len(text_data) > MAX_CHARS:
         text_data = text_data[:MAX_CHARS]
 
@@ -122,23 +209,113 @@ def build_contract_index_from_text(text_data: str):
     MAX_CLAUSES = int(os.getenv("MAX_CLAUSES", "250"))
     if len(clauses) > MAX_CLAUSES:
         clauses = clauses[:MAX_CLAUSES]
+    return clauses
+
+
+def _clause_rows(store: ContractStore):
+    return [(int(c["clause_id"]), c["text"], c.get("type"), c["metadata"].get("type_source")) for c in store.clauses]
+
+
+def build_contract_index_from_text(text_data: str):
+    clauses = _split_for_index(text_data)
+
+    # embed first: the local classifier labels most clauses from these vectors
+    embed_batch = int(os.getenv("EMBED_BATCH_SIZE", "16"))
+    vectors = encode_texts(clauses, batch_size=embed_batch)
+
+    clause_types, sources = classify_clauses(clauses, vectors)
 
     store = ContractStore()
+    store.add_clauses_batch(clauses, clause_types, [{"type_source": s} for s in sources])
+
     vector_store = VectorStore()
+    vector_store.add_embeddings([(c["clause_id"], c["text"]) for c in store.clauses], vectors)
+    # tool query x clause distances, saved with the index
+    vector_store.query_distances(all_static_queries())
 
-    clause_types = classify_clauses_batch(clauses)
-    store.add_clauses_batch(clauses, clause_types)
+    return store, vector_store, _clause_rows(store)
 
-    items = [(c["clause_id"], c["text"]) for c in store.clauses]
+
+def build_contract_index_from_revision(text_data: str, previous: Contract):
+    """
+    Index a revised upload against the previous version. Clauses with identical
+    content keep their type and vector; edited clauses close enough to a leftover
+    old clause keep its type (source "inherited"); only new/edited clauses are embedded and only
+    clauses without a type go to the LLM classifier.
+    """
+    clauses = _split_for_index(text_data)
+
+    old_rows = sorted(previous.clauses, key=lambda c: c.clause_id)
+    old_store = VectorStore()
+    old_store.load(previous.index_path)
+    n_old = old_store.index.ntotal
+    old_vectors = old_store.index.reconstruct_n(0, n_old) if n_old else np.zeros((0, old_store.dim), dtype="float32")
+    old_vec_row = {int(cid): i for i, cid in enumerate(old_store.ids)}
+
+    # 1) identical clauses (by content hash)
+    exact = match_by_hash(
+        [content_hash(t) for t in clauses],
+        [r.content_hash or content_hash(r.text) for r in old_rows],
+    )
+
+    types = [None] * len(clauses)
+    sources = [None] * len(clauses)
+    vectors = np.zeros((len(clauses), old_store.dim), dtype="float32")
+    need_embed = []
+    for i, j in enumerate(exact):
+        row = old_vec_row.get(old_rows[j].clause_id) if j is not None else None
+        if row is None:
+            need_embed.append(i)
+        else:
+            vectors[i] = old_vectors[row]
+        if j is not None:
+            types[i] = old_rows[j].clause_type
+            sources[i] = old_rows[j].type_source
 
     embed_batch = int(os.getenv("EMBED_BATCH_SIZE", "16"))
-    try:
-        vector_store.add(items, batch_size=embed_batch)
-    except TypeError:
-        vector_store.add(items)
+    if need_embed:
+        vectors[need_embed] = encode_texts([clauses[i] for i in need_embed], batch_size=embed_batch)
+
+    # 2) edited clauses vs. old clauses nobody matched
+    changed = [i for i, j in enumerate(exact) if j is None]
+    matched_old = {j for j in exact if j is not None}
+    leftover = [j for j in range(len(old_rows)) if j not in matched_old and old_rows[j].clause_id in old_vec_row]
+    similar = match_by_similarity(
+        vectors[changed],
+        old_vectors[[old_vec_row[old_rows[j].clause_id] for j in leftover]] if leftover else old_vectors[:0],
+    )
+    modified = 0
+    for i, m in zip(changed, similar):
+        if m.status == "modified":
+            modified += 1
+            types[i] = old_rows[leftover[m.old_index]].clause_type
+            # the LLM never saw the edited text: not a training label
+            sources[i] = "inherited"
+
+    # 3) classify whatever has no type yet
+    to_classify = [i for i, t in enumerate(types) if not t]
+    if to_classify:
+        new_types, new_sources = classify_clauses([clauses[i] for i in to_classify], vectors[to_classify])
+        for i, t, src in zip(to_classify, new_types, new_sources):
+            types[i], sources[i] = t, src
 
-    clause_rows = [(int(c["clause_id"]), c["text"], c.get("clause_type")) for c in store.clauses]
-    return store, vector_store, clause_rows
+    store = ContractStore()
+    store.add_clauses_batch(clauses, types, [{"type_source": s} for s in sources])
+
+    vector_store = VectorStore()
+    vector_store.add_embeddings([(c["clause_id"], c["text"]) for c in store.clauses], vectors)
+    vector_store.query_distances(all_static_queries())
+
+    unchanged = len(clauses) - len(changed)
+    revision = {
+        "unchanged": unchanged,
+        "modified": modified,
+        "added": len(changed) - modified,
+        "removed": len(old_rows) - unchanged - modified,
+        "classified": len(to_classify),
+        "embedded": len(need_embed),
+    }
+    return store, vector_store, _clause_rows(store), revision
 
 
 UPLOAD_STATUS = {}
@@ -179,24 +356,146 @@ def _cache_set(key: str, value):
     HEAVY_CACHE[key] = {"ts": time.time(), "value": value}
 
 
+def _load_session(contract) -> ContractSession:
+    """
+    Cached (store, vector_store) for a contract; loaded from disk + DB on a miss.
+    """
+    version = index_version(contract.index_path)
+    session = get_session(contract.contract_id, version)
+    if session is not None:
+        return session
+
+    def load() -> ContractSession:
+        # Load FAISS index from disk
+        vector_store = VectorStore()
+        vector_store.load(contract.index_path)
+
+        # Build ContractStore from DB clauses
+        store = ContractStore()
+        clauses_sorted = sorted(contract.clauses, key=lambda c: c.clause_id)
+        clause_texts = [c.text for c in clauses_sorted]
+        clause_types = [c.clause_type for c in clauses_sorted]
+        store.add_clauses_batch(clause_texts, clause_types)
+
+        loaded = ContractSession(store=store, vector_store=vector_store, version=version)
+        set_session(contract.contract_id, loaded)
+        return loaded
+
+    # concurrent first queries on the same contract version share one load; a
+    # caller that already sees a re-written index doesn't join a load of the old one
+    return get_group("contract_sessions").do(f"{contract.contract_id}:{version}", load)
+
+
+def _find_duplicate(db: Session, file_sha256: str, user_id: int, own_only: bool = False) -> Optional[Contract]:
+    if not file_sha256 or UPLOAD_DEDUP_SCOPE == "off":
+        return None
+    own_only = own_only or UPLOAD_DEDUP_SCOPE != "global"
+    source = find_contract_by_sha256(db, file_sha256, user_id if own_only else None)
+    if source is None or not os.path.exists(source.index_path):
+        return None
+    return source
+
+
+def _clone_contract(
+    db: Session,
+    source: Contract,
+    contract_id: str,
+    filename: str,
+    pdf_path: str,
+    index_path: str,
+    user_id: int,
+    previous: Optional[Contract] = None,
+) -> int:
+    """
+    New contract owned by user_id with source's processing results: index files
+    are hard-linked (copy-on-write via save()'s replace), clause rows are copied
+    so each owner keeps their own rows. Returns the number of clauses.
+    """
+    link_index(source.index_path, index_path)
+
+    # the uploaded bytes are identical: share the PDF too
+    try:
+        tmp = f"{pdf_path}.{os.getpid()}.link"
+        os.link(source.pdf_path, tmp)
+        os.replace(tmp, pdf_path)
+    except OSError:
+        pass
+
+    rows = [(c.clause_id, c.text, c.clause_type, c.type_source) for c in sorted(source.clauses, key=lambda c: c.clause_id)]
+    create_contract(
+        db=db,
+        user_id=user_id,
+        contract_id=contract_id,
+        filename=filename,
+        pdf_path=pdf_path,
+        index_path=index_path,
+        clauses=rows,
+        parent_contract_id=previous.contract_id if previous is not None else None,
+        version=(previous.version or 1) + 1 if previous is not None else 1,
+        file_sha256=source.file_sha256,
+    )
+    logger.info(f"[UPLOAD] contract_id={contract_id} reuses {source.contract_id} (identical PDF)")
+    return len(rows)
+
+
+def _corpus_vectors(vector_store: VectorStore):
+    """
+    (clause_ids, vectors) of a per-contract index, for the tenant portfolio index.
+    """
+    n = vector_store.index.ntotal
+    vectors = vector_store.index.reconstruct_n(0, n) if n else np.zeros((0, vector_store.dim), dtype="float32")
+    return [int(i) for i in vector_store.ids], vectors
+
+
+def _llm_budget_left(request_start: float):
+    """
+    Seconds of LLM time left for this request (planner + executor share one budget).
+    """
+    if QUERY_LLM_DEADLINE_S <= 0:
+        return None
+    return QUERY_LLM_DEADLINE_S - (time.perf_counter() - request_start)
+
+
 def process_contract_background(
     contract_id: str,
     filename: str,
     pdf_path: str,
     index_path: str,
     user_id: int,
+    previous_contract_id: str = None,
+    file_sha256: str = None,
+    pdf_buffer: Optional[mmap.mmap] = None,
 ):
     """
     Heavy parse+index happens here so /contracts/upload returns fast (no gateway timeout).
+    pdf_buffer: read-only mapping of the saved upload, parsed instead of re-opening pdf_path.
     """
     db = SessionLocal()
     try:
         UPLOAD_STATUS[contract_id] = {"status": "processing", "error": None, "num_clauses": 0}
-
-        text_data = load_contract(pdf_path)
-        store, vector_store, clause_rows = build_contract_index_from_text(text_data)
+        previous = get_contract(db, user_id, previous_contract_id) if previous_contract_id else None
+
+        # an identical upload may have finished indexing while this one was queued
+        source = _find_duplicate(db, file_sha256, user_id)
+        if source is not None:
+            n = _clone_contract(db, source, contract_id, filename, pdf_path, index_path, user_id, previous)
+            UPLOAD_STATUS[contract_id] = {"status": "indexed", "error": None, "num_clauses": n}
+            return
+
+        # pages past the char budget would be cut by _split_for_index anyway
+        text_data = load_contract(pdf_path, max_chars=_max_contract_chars(), stream=pdf_buffer)
+        revision = None
+        with llm_priority("background"), llm_tags(contract_id=contract_id, request_id=f"index:{contract_id}"):
+            if previous is not None and os.path.exists(previous.index_path):
+                store, vector_store, clause_rows, revision = build_contract_index_from_revision(text_data, previous)
+                logger.info(f"[BG] Revision of {previous.contract_id}: {revision}")
+            else:
+                if previous_contract_id:
+                    logger.warning(f"[BG] Previous version {previous_contract_id} unavailable; full re-index")
+                store, vector_store, clause_rows = build_contract_index_from_text(text_data)
 
         vector_store.save(index_path)
+        invalidate_session(contract_id)
 
         create_contract(
             db=db,
@@ -206,20 +505,32 @@ def process_contract_background(
             pdf_path=pdf_path,
             index_path=index_path,
             clauses=clause_rows,
+            parent_contract_id=previous.contract_id if previous is not None else None,
+            version=(previous.version or 1) + 1 if previous is not None else 1,
+            file_sha256=file_sha256,
         )
 
         UPLOAD_STATUS[contract_id] = {
             "status": "indexed",
             "error": None,
             "num_clauses": len(clause_rows),
+            "revision": revision,
         }
 
         logger.info(f"[BG] Indexed contract_id={contract_id} user_id={user_id} clauses={len(clause_rows)}")
 
+        # portfolio index is best-effort: search backfills anything missed here
+        try:
+            get_corpus_store(vector_store.dim).update(user_id, {contract_id: _corpus_vectors(vector_store)})
+        except Exception:
+            logger.exception(f"[BG] Portfolio index update failed contract_id={contract_id}")
+
     except Exception as e:
         logger.exception("[BG] Failed to process contract")
         UPLOAD_STATUS[contract_id] = {"status": "failed", "error": str(e), "num_clauses": 0}
     finally:
+        if pdf_buffer is not None:
+            pdf_buffer.close()
         db.close()
 
 
@@ -244,36 +555,109 @@ def db_health():
         db.close()
 
 
+@app.get("/metrics")
+def metrics():
+    """
+    Per-worker counters (no user data).
+    """
+    return {
+        "llm": llm_stats(),
+        "llm_usage": llm_usage_summary(),
+        "llm_cache": cache_stats(),
+        "embedding_cache": embedding_cache_stats(),
+        "static_query_embeddings": static_query_stats(),
+        "embedding_server": embedding_server_stats(),
+        "local_clause_classifier": local_classifier_stats(),
+        "llm_rate_limiter": rate_limiter_stats(),
+        "single_flight": single_flight_stats(),
+        "contract_sessions": session_stats(),
+    }
+
+
+async def _save_upload(file: UploadFile, path: str, max_bytes: int) -> Tuple[int, str, Optional[mmap.mmap]]:
+    """
+    Stream the upload to `path` in chunks, hashing and size-checking as it goes.
+    -> (size, sha256 hex, read-only mmap of the written bytes or None if empty).
+    The mapping is served from the page cache the write just filled, so the
+    background parse doesn't read the file again. 413 as soon as max_bytes is passed.
+    """
+    sha = hashlib.sha256()
+    size = 0
+    tmp = f"{path}.part"
+    try:
+        with open(tmp, "wb") as f:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=_too_large_detail())
+                sha.update(chunk)
+                f.write(chunk)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+
+    if not size:
+        return 0, sha.hexdigest(), None
+    with open(path, "rb") as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return size, sha.hexdigest(), buf
+
+
 @app.post("/contracts/upload", response_model=UploadResponse)
 async def upload_contract(
     background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
+    previous_contract_id: Optional[str] = Form(None),
     db: Session = Depends(get_db), 
     user: User = Depends(get_current_user),
 ):
+    """
+    previous_contract_id: optional earlier version of the same agreement; unchanged
+    clauses then reuse its classification and embeddings.
+    """
     if not file.filename:
         raise HTTPException(status_code=400, detail="filename missing")
     if not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Only .pdf supported for now")
-
-    content = await file.read()
-    if not content:
-        raise HTTPException(status_code=400, detail="Uploaded file is empty")
-
-    MAX_FILE_MB = int(os.getenv("MAX_PDF_MB", "5"))
-    if len(content) > MAX_FILE_MB * 1024 * 1024:
-        raise HTTPException(status_code=413, detail=f"PDF too large. Max {MAX_FILE_MB}MB.")
+    previous = get_contract(db, user.id, previous_contract_id) if previous_contract_id else None
+    if previous_contract_id and previous is None:
+        raise HTTPException(status_code=404, detail="Previous contract not found")
 
     contract_id = uuid.uuid4().hex
     pdf_path = str(CONTRACTS_DIR / f"{contract_id}_{file.filename}")
     index_path = str(INDEX_DIR / f"{contract_id}.faiss")
 
     try:
-        with open(pdf_path, "wb") as f:
-            f.write(content)
+        size, file_sha256, pdf_buffer = await _save_upload(file, pdf_path, _max_upload_bytes())
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed saving file: {str(e)}")
 
+    if not size:
+        os.unlink(pdf_path)
+        raise HTTPException(status_code=400, detail="Uploaded file is empty")
+
+    # own uploads only: answering "indexed" for another tenant's copy would leak that it exists
+    source = _find_duplicate(db, file_sha256, user.id, own_only=True)
+    if source is not None:
+        pdf_buffer.close()
+        n = _clone_contract(db, source, contract_id, file.filename, pdf_path, index_path, user.id, previous)
+        UPLOAD_STATUS[contract_id] = {"status": "indexed", "error": None, "num_clauses": n}
+        return UploadResponse(
+            contract_id=contract_id,
+            status="indexed",
+            filename=file.filename,
+            num_clauses=n,
+            tmp_path=pdf_path,
+            previous_contract_id=previous_contract_id or None,
+            deduplicated=True,
+        )
+
     UPLOAD_STATUS[contract_id] = {"status": "queued", "error": None, "num_clauses": 0}
     background_tasks.add_task(
         process_contract_background,
@@ -282,6 +666,9 @@ async def upload_contract(
         pdf_path,
         index_path,
         user.id,
+        previous_contract_id or None,
+        file_sha256,
+        pdf_buffer,
     )
 
     return UploadResponse(
@@ -290,6 +677,7 @@ async def upload_contract(
         filename=file.filename,
         num_clauses=0,
         tmp_path=pdf_path,
+        previous_contract_id=previous_contract_id or None,
     )
 
 
@@ -344,19 +732,14 @@ def query_contract(
             )
 
     total_start = time.perf_counter()
-    logger.info(f"[API] user_id={user.id} contract_id={contract_id} mode={req.mode} query={query[:200]}")
+    request_id = uuid.uuid4().hex[:12]
+    logger.info(
+        f"[API] user_id={user.id} contract_id={contract_id} request_id={request_id} mode={req.mode} query={query[:200]}"
+    )
 
     try:
-        # Load FAISS index from disk
-        vector_store = VectorStore()
-        vector_store.load(contract.index_path)
-
-        # Build ContractStore from DB clauses
-        store = ContractStore()
-        clauses_sorted = sorted(contract.clauses, key=lambda c: c.clause_id)
-        clause_texts = [c.text for c in clauses_sorted]
-        clause_types = [c.clause_type for c in clauses_sorted]
-        store.add_clauses_batch(clause_texts, clause_types)
+        session = _load_session(contract)
+        store, vector_store = session.store, session.vector_store
 
         planner_ms = 0.0
 
@@ -382,11 +765,13 @@ def query_contract(
                 "notes": "mode_param_override",
             }
         else:
-            plan_obj, planner_ms = time_it("Planner", plan, query)
+            with llm_deadline(_llm_budget_left(total_start)), llm_tags(contract_id=contract_id, request_id=request_id):
+                plan_obj, planner_ms = time_it("Planner", plan, query)
             if req.k is not None:
                 plan_obj["k"] = req.k
 
-        result, exec_ms = time_it("Executor", execute, plan_obj, query, store, vector_store)
+        with llm_deadline(_llm_budget_left(total_start)), llm_tags(contract_id=contract_id, request_id=request_id):
+            result, exec_ms = time_it("Executor", execute, plan_obj, query, store, vector_store)
 
         if cache_key is not None:
             _cache_set(cache_key, result)
@@ -410,11 +795,106 @@ def query_contract(
 
     except HTTPException:
         raise
+    except LLMTimeoutError as e:
+        logger.warning(f"[API] LLM deadline exceeded user_id={user.id} contract_id={contract_id}: {e}")
+        raise HTTPException(status_code=504, detail="Analysis timed out. Please retry.")
     except Exception as e:
         logger.exception("API query execution error")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/portfolio/search", response_model=PortfolioSearchResponse)
+def portfolio_search(
+    req: PortfolioSearchRequest,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """
+    Search clauses across all of the user's indexed contracts in one ANN query.
+    """
+    query = (req.query or "").strip()
+    if not query:
+        raise HTTPException(status_code=400, detail="Empty query")
+    k = max(1, min(req.k, 200))
+
+    t0 = time.perf_counter()
+    corpus_store = get_corpus_store(EMBED_DIM)
+    corpus = corpus_store.get(user.id)
+
+    # contracts indexed before the portfolio index existed (or whose update failed)
+    contracts = {
+        c.contract_id: c
+        for c in db.query(Contract).filter(Contract.user_id == user.id).all()
+    }
+    missing = set(contracts) - corpus.live_contracts()
+    if missing:
+        additions = {}
+        for cid in missing:
+            if not os.path.exists(contracts[cid].index_path):
+                continue
+            vs = VectorStore()
+            vs.load(contracts[cid].index_path)
+            additions[cid] = _corpus_vectors(vs)
+        corpus_store.update(user.id, additions)
+        corpus = corpus_store.get(user.id)
+        logger.info(f"[PORTFOLIO] backfilled {len(additions)} contracts user_id={user.id}")
+    load_ms = (time.perf_counter() - t0) * 1000
+
+    t1 = time.perf_counter()
+    raw = corpus.search(encode_texts([query]), k=k)[0]
+    # deleted contracts may linger in the index until the next compaction
+    raw = [h for h in raw if h[0] in contracts]
+    search_ms = (time.perf_counter() - t1) * 1000
+
+    rows = {}
+    if raw:
+        wanted = {(cid, clause_id) for cid, clause_id, _ in raw}
+        for c in db.query(Clause).filter(
+            Clause.user_id == user.id,
+            Clause.contract_id.in_({cid for cid, _ in wanted}),
+            Clause.clause_id.in_({clause_id for _, clause_id in wanted}),
+        ):
+            rows[(c.contract_id, c.clause_id)] = c
+
+    hits = []
+    for cid, clause_id, dist in raw:
+        row = rows.get((cid, clause_id))
+        hits.append({
+            "contract_id": cid,
+            "filename": contracts[cid].filename,
+            "clause_id": clause_id,
+            "clause_type": row.clause_type if row else None,
+            "score": round(l2_to_confidence(dist), 4),
+            "distance": round(dist, 4),
+            "text": row.text if row else None,
+        })
+
+    perf = {
+        "load": round(load_ms, 2),
+        "search": round(search_ms, 2),
+        "total": round((time.perf_counter() - t0) * 1000, 2),
+    }
+    logger.info(f"[PORTFOLIO] user_id={user.id} k={k} hits={len(hits)} perf={perf}")
+    return PortfolioSearchResponse(query=query, hits=hits, perf_ms=perf)
+
+
+@app.get("/contracts/{contract_id}/llm_usage")
+def llm_usage_endpoint(
+    contract_id: str,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """
+    LLM calls, estimated tokens and cost for this contract (indexing + queries)
+    as seen by this worker since it started.
+    """
+    contract = get_contract(db, user.id, contract_id)
+    if not contract:
+        raise HTTPException(status_code=404, detail="contract_id not found")
+
+    return {"contract_id": contract_id, "usage": contract_usage(contract_id)}
+
+
 @app.get("/contracts/{contract_id}/last_result")
 def last_result_endpoint(
     contract_id: str,
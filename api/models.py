@@ -25,6 +25,13 @@ class Contract(Base):
     num_clauses: Mapped[int] = mapped_column(Integer, default=0)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
+    # revision chain: a re-uploaded amendment points at the version it replaces
+    parent_contract_id: Mapped[Optional[str]] = mapped_column(String, nullable=True, index=True)
+    version: Mapped[int] = mapped_column(Integer, default=1)
+
+    # sha256 of the uploaded PDF bytes; identical uploads reuse the processed contract
+    file_sha256: Mapped[Optional[str]] = mapped_column(String(64), nullable=True, index=True)
+
     # relationship to clauses
     clauses: Mapped[List["Clause"]] = relationship(
         "Clause",
@@ -56,6 +63,12 @@ class Clause(Base):
     clause_id: Mapped[int] = mapped_column(Integer, nullable=False)
     text: Mapped[str] = mapped_column(Text, nullable=False)
     clause_type: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    # whitespace-insensitive sha256 of text, to align clauses across versions
+    content_hash: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    # who assigned clause_type: "llm" | "local" (embedding classifier) | "fallback"
+    # ('other' after the LLM gave no label) | "inherited" (edited clause keeping
+    # its previous version's type); NULL = llm (older rows)
+    type_source: Mapped[Optional[str]] = mapped_column(String(16), nullable=True)
 
     contract: Mapped["Contract"] = relationship("Contract", back_populates="clauses")
 
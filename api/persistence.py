@@ -3,8 +3,9 @@ from typing import List, Optional, Tuple, Any
 from sqlalchemy.orm import Session, selectinload
 from sqlalchemy import select
 from api.models import Contract, Clause, ContractResult, ContractRun
+from rag.contract_revision import content_hash
 
-ClauseRow = Tuple[int, str, Optional[str]]
+ClauseRow = Tuple[int, str, Optional[str], Optional[str]]  # (clause_id, text, clause_type, type_source)
 
 
 def create_contract(
@@ -15,6 +16,9 @@ def create_contract(
     pdf_path: str,
     index_path: str,
     clauses: List[ClauseRow],
+    parent_contract_id: Optional[str] = None,
+    version: int = 1,
+    file_sha256: Optional[str] = None,
 ):
     # create contract
     c = Contract(
@@ -24,11 +28,14 @@ def create_contract(
         pdf_path=pdf_path,
         index_path=index_path,
         num_clauses=len(clauses),
+        parent_contract_id=parent_contract_id,
+        version=version,
+        file_sha256=file_sha256,
     )
     db.add(c)
 
     # create clause rows
-    for clause_id, text, clause_type in clauses:
+    for clause_id, text, clause_type, type_source in clauses:
         db.add(
             Clause(
                 contract_id=contract_id,
@@ -36,6 +43,8 @@ def create_contract(
                 clause_id=int(clause_id),
                 text=text,
                 clause_type=clause_type,
+                content_hash=content_hash(text),
+                type_source=type_source,
             )
         )
 
@@ -52,6 +61,42 @@ def create_contract(
     db.commit()
 
 
+def find_contract_by_sha256(db: Session, file_sha256: str, user_id: Optional[int] = None) -> Optional[Contract]:
+    """
+    Oldest processed contract with these PDF bytes (any owner unless user_id is given).
+    """
+    stmt = select(Contract).where(Contract.file_sha256 == file_sha256)
+    if user_id is not None:
+        stmt = stmt.where(Contract.user_id == user_id)
+    stmt = stmt.order_by(Contract.created_at).options(selectinload(Contract.clauses))
+    return db.execute(stmt).scalars().first()
+
+
+def list_llm_clause_labels(db: Session, limit: int) -> List[Tuple[str, str]]:
+    """
+    [(text, clause_type), ...] of the most recent LLM-classified clauses, one per
+    distinct content, for training the local classifier. Labels the LLM did not
+    give to that exact text (local / fallback / inherited) are left out.
+    """
+    stmt = (
+        select(Clause.text, Clause.clause_type, Clause.content_hash)
+        .where(Clause.clause_type.is_not(None))
+        .where((Clause.type_source.is_(None)) | (Clause.type_source == "llm"))
+        .order_by(Clause.id.desc())
+    )
+    out: List[Tuple[str, str]] = []
+    seen = set()
+    for text, clause_type, h in db.execute(stmt).yield_per(1000):
+        key = h or content_hash(text)
+        if key in seen:
+            continue
+        seen.add(key)
+        out.append((text, clause_type))
+        if len(out) >= limit:
+            break
+    return out
+
+
 def get_contract(db: Session, user_id: int, contract_id: str) -> Optional[Contract]:
     stmt = (
         select(Contract)
@@ -9,6 +9,9 @@ class UploadResponse(BaseModel):
     filename: str
     num_clauses: int
     tmp_path: Optional[str] = None
+    previous_contract_id: Optional[str] = None
+    # identical PDF already processed by this user: results reused, no background indexing
+    deduplicated: bool = False
 
 
 class UploadStatusResponse(BaseModel):
@@ -16,6 +19,8 @@ class UploadStatusResponse(BaseModel):
     status: str
     error: Optional[str] = None
     num_clauses: int = 0
+    # clause alignment against the previous version (revision uploads only)
+    revision: Optional[Dict[str, int]] = None
 
 
 class QueryRequest(BaseModel):
@@ -42,4 +47,24 @@ class HistoryItem(BaseModel):
 
 class HistoryResponse(BaseModel):
     contract_id: str
-    runs: List[HistoryItem]
\ No newline at end of file
+    runs: List[HistoryItem]
+
+class PortfolioSearchRequest(BaseModel):
+    query: str
+    k: int = 20
+
+
+class PortfolioHit(BaseModel):
+    contract_id: str
+    filename: Optional[str] = None
+    clause_id: int
+    clause_type: Optional[str] = None
+    score: float
+    distance: float
+    text: Optional[str] = None
+
+
+class PortfolioSearchResponse(BaseModel):
+    query: str
+    hits: List[PortfolioHit]
+    perf_ms: Dict[str, float]
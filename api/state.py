@@ -1,19 +1,189 @@
-from dataclasses import dataclass
-from typing import Any, Dict, Optional
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
 from threading import Lock
 
+# Budget for loaded contracts kept per worker process
+CONTRACT_SESSION_MAX_MB = float(os.getenv("CONTRACT_SESSION_MAX_MB", "256"))
+CONTRACT_SESSION_MAX_ENTRIES = int(os.getenv("CONTRACT_SESSION_MAX_ENTRIES", "128"))
+CONTRACT_SESSION_TTL_SECONDS = int(os.getenv("CONTRACT_SESSION_TTL_SECONDS", "1800"))  # default 30 min
+
+
 @dataclass
 class ContractSession:
     store: Any
     vector_store: Any
+    # identifies the index files this session was loaded from (see index_version)
+    version: Any = None
+    size_bytes: int = 0
+    # (query-distance rows, cached vector bytes) counted in size_bytes; both
+    # grow after load as queries arrive
+    sized_for: Any = None
+    loaded_at: float = field(default_factory=time.time)
+
+
+def index_version(index_path: str) -> Optional[Tuple[int, int]]:
+    """
+    (mtime_ns, size) of the index file. Changes when the contract is re-indexed,
+    including by another worker, so stale sessions are detected without IPC.
+    """
+    try:
+        st = os.stat(index_path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def estimate_session_bytes(store: Any, vector_store: Any) -> int:
+    """
+    Rough resident cost: clause texts (held twice: store + index arena), vectors
+    (at the index's code size: float32, fp16 or SQ8), the float32 copy kept for
+    distance computations once built, and the query x clause distances.
+    """
+    text_bytes = sum(len(c.get("text") or "") for c in getattr(store, "clauses", []))
+    index = getattr(vector_store, "index", None)
+    code_size = getattr(index, "code_size", int(getattr(vector_store, "dim", 0)) * 4)
+    vec_bytes = int(getattr(index, "ntotal", 0)) * int(code_size)
+    qdist_bytes = sum(int(row.nbytes) for row in _qdist(vector_store).values())
+    return 2 * text_bytes + vec_bytes + _cached_vector_bytes(vector_store) + qdist_bytes + 4096
+
+
+def _qdist(vector_store: Any) -> Dict[str, Any]:
+    return getattr(vector_store, "_qdist", None) or {}
+
+
+def _cached_vector_bytes(vector_store: Any) -> int:
+    cached = getattr(vector_store, "_vecs", None)
+    return sum(int(a.nbytes) for a in cached) if cached else 0
+
+
+def _growth(vector_store: Any) -> Tuple[int, int]:
+    return len(_qdist(vector_store)), _cached_vector_bytes(vector_store)
+
+
+def _measure(session: ContractSession) -> Tuple[int, Tuple[int, int]]:
+    """
+    -> (estimated bytes, the _growth state included in the estimate)
+    """
+    grown = _growth(session.vector_store)
+    return estimate_session_bytes(session.store, session.vector_store), grown
+
+
+class SessionCache:
+    """
+    Bounded LRU of loaded contracts (ContractStore + VectorStore), so repeat
+    queries on a hot contract skip DB row loading and index deserialization.
+
+    Entries are dropped when over the memory budget / entry cap (LRU first),
+    after ttl_seconds, on explicit invalidate(), or when the caller's version
+    no longer matches (index re-written). An entry is re-measured on access
+    when its cached query distances / vectors have grown since it was sized.
+    """
+
+    def __init__(self, max_bytes: int, max_entries: int, ttl_seconds: int):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = Lock()
+        self._sessions: "OrderedDict[str, ContractSession]" = OrderedDict()
+        self._bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def _drop(self, contract_id: str):
+        s = self._sessions.pop(contract_id, None)
+        if s is not None:
+            self._bytes -= s.size_bytes
+
+    def _evict(self):
+        while self._sessions and (self._bytes > self.max_bytes or len(self._sessions) > self.max_entries):
+            oldest = next(iter(self._sessions))
+            self._drop(oldest)
+            self._stats["evictions"] += 1
+
+    def get(self, contract_id: str, version: Any = None) -> Optional[ContractSession]:
+        with self._lock:
+            s = self._sessions.get(contract_id)
+            if s is None:
+                self._stats["misses"] += 1
+                return None
+
+            if self.ttl_seconds > 0 and time.time() - s.loaded_at > self.ttl_seconds:
+                self._drop(contract_id)
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return None
+
+            if version is not None and s.version != version:
+                self._drop(contract_id)
+                self._stats["invalidations"] += 1
+                self._stats["misses"] += 1
+                return None
+
+            self._sessions.move_to_end(contract_id)
+            self._stats["hits"] += 1
+            if _growth(s.vector_store) != s.sized_for:
+                self._bytes -= s.size_bytes
+                s.size_bytes, s.sized_for = _measure(s)
+                self._bytes += s.size_bytes
+                self._evict()
+            return s
+
+    def put(self, contract_id: str, session: ContractSession):
+        if not session.size_bytes:
+            session.size_bytes, session.sized_for = _measure(session)
+
+        with self._lock:
+            self._drop(contract_id)
+            if session.size_bytes > self.max_bytes:
+                return  # would evict everything else; serve it uncached
+
+            self._sessions[contract_id] = session
+            self._bytes += session.size_bytes
+            self._evict()
+
+    def invalidate(self, contract_id: str):
+        with self._lock:
+            if contract_id in self._sessions:
+                self._drop(contract_id)
+                self._stats["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._stats)
+            out["entries"] = len(self._sessions)
+            out["bytes"] = self._bytes
+
+        lookups = out["hits"] + out["misses"]
+        out["hit_rate"] = round(out["hits"] / lookups, 3) if lookups else 0.0
+        out["max_bytes"] = self.max_bytes
+        out["max_entries"] = self.max_entries
+        out["ttl_seconds"] = self.ttl_seconds
+        return out
+
+
+SESSIONS = SessionCache(
+    max_bytes=int(CONTRACT_SESSION_MAX_MB * 1024 * 1024),
+    max_entries=CONTRACT_SESSION_MAX_ENTRIES,
+    ttl_seconds=CONTRACT_SESSION_TTL_SECONDS,
+)
 
-_sessions: Dict[str, ContractSession] = {}
-_lock = Lock()
 
 def set_session(contract_id: str, session: ContractSession):
-    with _lock:
-        _sessions[contract_id] = session
+    SESSIONS.put(contract_id, session)
+
+def get_session(contract_id: str, version: Any = None) -> Optional[ContractSession]:
+    return SESSIONS.get(contract_id, version)
+
+def invalidate_session(contract_id: str):
+    SESSIONS.invalidate(contract_id)
 
-def get_session(contract_id: str) -> Optional[ContractSession]:
-    with _lock:
-        return _sessions.get(contract_id)
\ No newline at end of file
+def session_stats() -> Dict[str, Any]:
+    return SESSIONS.stats()
@@ -0,0 +1,47 @@
+from typing import Callable, Iterable
+
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+
+# multipart boundaries + form fields around the file itself
+MULTIPART_SLACK_BYTES = 64 * 1024
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Pure ASGI middleware: rejects oversized request bodies on `paths` with 413
+    before they are buffered - from Content-Length when the client sends it,
+    else as soon as the streamed body passes the limit.
+    """
+
+    def __init__(self, app, paths: Iterable[str], max_bytes: Callable[[], int], detail: Callable[[], str]):
+        self.app = app
+        self.paths = set(paths)
+        self.max_bytes = max_bytes
+        self.detail = detail
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.max_bytes() + MULTIPART_SLACK_BYTES
+
+        content_length = dict(scope.get("headers") or []).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            await JSONResponse({"detail": self.detail()}, status_code=413)(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # raised inside form parsing -> FastAPI turns it into the 413 response
+                    raise HTTPException(status_code=413, detail=self.detail())
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,145 @@
+"""
+Accuracy/latency of the local (embedding nearest-centroid) clause classifier
+against LLM labels.
+
+Reference labels come from the clauses table (stored LLM labels, default), a
+JSONL file of {"text": ..., "type": ...}, or are produced here by the LLM
+classifier for the clauses of a PDF. Evaluated with k-fold cross-validation:
+each fold is predicted by a classifier fitted on the seeds + the other folds.
+
+    python -m benchmarks.bench_clause_classifier --source db --folds 5
+    python -m benchmarks.bench_clause_classifier --source jsonl --path labels.jsonl
+    python -m benchmarks.bench_clause_classifier --source llm --pdf contract.pdf
+"""
+import json
+import time
+import argparse
+from typing import List, Tuple
+
+import numpy as np
+
+from rag.vector_store import encode_texts
+from tools.local_clause_classifier import (
+    LOCAL_CLASSIFIER_MAX_TRAIN,
+    LOCAL_CLASSIFIER_MIN_SIM,
+    CentroidClassifier,
+    seed_examples,
+)
+
+
+def load_labels(args) -> Tuple[List[str], List[str], float]:
+    """
+    -> (texts, reference labels, LLM seconds spent labelling or 0)
+    """
+    if args.source == "db":
+        from api.db import SessionLocal
+        from api.persistence import list_llm_clause_labels
+
+        db = SessionLocal()
+        try:
+            rows = list_llm_clause_labels(db, args.limit)
+        finally:
+            db.close()
+        return [t for t, _ in rows], [l for _, l in rows], 0.0
+
+    if args.source == "jsonl":
+        with open(args.path, "r", encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        return [r["text"] for r in rows][: args.limit], [r["type"] for r in rows][: args.limit], 0.0
+
+    from tools.clause_classifier import classify_clauses_batch
+    from tools.contract_parser import load_contract, split_into_clauses
+    from benchmarks.bench_full_report import SAMPLE_CLAUSES
+
+    texts = split_into_clauses(load_contract(args.pdf)) if args.pdf else list(SAMPLE_CLAUSES)
+    texts = texts[: args.limit]
+    t0 = time.perf_counter()
+    labels = classify_clauses_batch(texts)
+    return texts, labels, time.perf_counter() - t0
+
+
+def evaluate(vectors: np.ndarray, labels: List[str], seed_vectors: np.ndarray, seed_labels: List[str], folds: int):
+    """
+    Out-of-fold predictions -> (predicted labels, confidence, cosine). folds=0: seeds only.
+    """
+    n = len(labels)
+    pred = [""] * n
+    conf = np.zeros(n, dtype="float32")
+    sims = np.zeros(n, dtype="float32")
+    fold_of = np.arange(n) % folds if folds > 1 else np.zeros(n, dtype=int)
+
+    for f in range(max(folds, 1)):
+        test = np.flatnonzero(fold_of == f)
+        train = np.flatnonzero(fold_of != f) if folds > 1 else np.array([], dtype=int)
+        clf = CentroidClassifier.fit(
+            np.vstack([seed_vectors, vectors[train]]),
+            seed_labels + [labels[i] for i in train],
+        )
+        p, c, s = clf.predict(vectors[test])
+        for i, label in zip(test, p):
+            pred[i] = label
+        conf[test] = c
+        sims[test] = s
+    return pred, conf, sims
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", choices=["db", "jsonl", "llm"], default="db")
+    parser.add_argument("--path", default=None, help="JSONL file for --source jsonl")
+    parser.add_argument("--pdf", default=None, help="contract PDF for --source llm (default: sample clauses)")
+    parser.add_argument("--limit", type=int, default=LOCAL_CLASSIFIER_MAX_TRAIN)
+    parser.add_argument("--folds", type=int, default=5, help="0 = evaluate the seed-only classifier")
+    parser.add_argument("--repeat", type=int, default=20, help="timed prediction passes")
+    args = parser.parse_args()
+
+    texts, labels, llm_s = load_labels(args)
+    if not texts:
+        raise SystemExit("no labelled clauses found")
+
+    seeds = seed_examples()
+    t0 = time.perf_counter()
+    seed_vectors = encode_texts([t for t, _ in seeds])
+    vectors = encode_texts(texts)
+    embed_s = time.perf_counter() - t0
+
+    pred, conf, sims = evaluate(vectors, labels, seed_vectors, [l for _, l in seeds], args.folds)
+    correct = np.array([p == l for p, l in zip(pred, labels)])
+
+    # classify-time cost only: vectors already exist at ingest
+    clf = CentroidClassifier.fit(np.vstack([seed_vectors, vectors]), [l for _, l in seeds] + labels)
+    t1 = time.perf_counter()
+    for _ in range(args.repeat):
+        clf.predict(vectors)
+    predict_us = (time.perf_counter() - t1) / (args.repeat * len(texts)) * 1e6
+
+    sweep = []
+    for min_conf in (0.4, 0.5, 0.6, 0.7, 0.8, 0.9):
+        local = (conf >= min_conf) & (sims >= LOCAL_CLASSIFIER_MIN_SIM)
+        sweep.append({
+            "min_confidence": min_conf,
+            "local_share": round(float(local.mean()), 4),
+            "local_accuracy": round(float(correct[local].mean()), 4) if local.any() else None,
+            # uncertain clauses go to the LLM, which agrees with itself
+            "hybrid_agreement": round(float((correct | ~local).mean()), 4),
+        })
+
+    per_type = {}
+    for label in sorted(set(labels)):
+        idx = [i for i, l in enumerate(labels) if l == label]
+        per_type[label] = {"n": len(idx), "accuracy": round(float(correct[idx].mean()), 4)}
+
+    print(json.dumps({
+        "clauses": len(texts),
+        "folds": args.folds,
+        "accuracy_all": round(float(correct.mean()), 4),
+        "threshold_sweep": sweep,
+        "per_type": per_type,
+        "predict_us_per_clause": round(predict_us, 2),
+        "embed_ms_per_clause": round(embed_s / (len(texts) + len(seeds)) * 1000, 3),
+        "llm_ms_per_clause": round(llm_s / len(texts) * 1000, 3) if llm_s else None,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Embedding backend parity check and throughput benchmark (torch vs int8 ONNX).
+
+Export the ONNX model first:
+    python -m rag.onnx_embedder --out /tmp/data/models/all-MiniLM-L6-v2-onnx-int8
+
+    # cosine agreement between torch and ONNX vectors (exit code 1 below threshold)
+    python -m benchmarks.bench_embeddings parity --onnx-dir <dir> --threshold 0.98
+
+    # clauses/sec and peak RSS per backend (each backend in its own process)
+    python -m benchmarks.bench_embeddings throughput --onnx-dir <dir> --texts 2000 --batch-size 32
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+from typing import List
+
+import numpy as np
+
+from benchmarks.bench_full_report import SAMPLE_CLAUSES
+
+
+def sample_texts(n: int, pdf: str = None) -> List[str]:
+    if pdf:
+        from tools.contract_parser import load_contract, split_into_clauses
+        base = split_into_clauses(load_contract(pdf))
+    else:
+        base = SAMPLE_CLAUSES
+    # vary the texts so nothing is served from a cache
+    return [f"{base[i % len(base)]} (variant {i // len(base)})" for i in range(n)]
+
+
+def load_backend(name: str, model: str, onnx_dir: str, threads: int):
+    if name == "torch":
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model, device="cpu")
+    if name == "onnx":
+        from rag.onnx_embedder import OnnxEmbedder
+        return OnnxEmbedder(onnx_dir, threads=threads)
+    raise ValueError(f"Unknown backend: {name}")
+
+
+def cmd_parity(args) -> int:
+    texts = sample_texts(args.texts, args.pdf)
+
+    ref = load_backend("torch", args.model, args.onnx_dir, args.threads).encode(texts, batch_size=args.batch_size)
+    cand = load_backend("onnx", args.model, args.onnx_dir, args.threads).encode(texts, batch_size=args.batch_size)
+
+    ref = np.asarray(ref, dtype=np.float32)
+    cand = np.asarray(cand, dtype=np.float32)
+    ref /= np.clip(np.linalg.norm(ref, axis=1, keepdims=True), 1e-12, None)
+    cand /= np.clip(np.linalg.norm(cand, axis=1, keepdims=True), 1e-12, None)
+    cos = (ref * cand).sum(axis=1)
+
+    # retrieval agreement: same nearest neighbour for each text among the others
+    sim_ref = ref @ ref.T
+    sim_cand = cand @ cand.T
+    np.fill_diagonal(sim_ref, -1)
+    np.fill_diagonal(sim_cand, -1)
+    top1 = float((sim_ref.argmax(axis=1) == sim_cand.argmax(axis=1)).mean())
+
+    result = {
+        "texts": len(texts),
+        "cosine_mean": round(float(cos.mean()), 5),
+        "cosine_min": round(float(cos.min()), 5),
+        "cosine_p1": round(float(np.percentile(cos, 1)), 5),
+        "top1_neighbour_agreement": round(top1, 4),
+        "threshold": args.threshold,
+        "passed": bool(cos.min() >= args.threshold),
+    }
+    print(json.dumps(result, indent=2))
+    return 0 if result["passed"] else 1
+
+
+def cmd_worker(args) -> int:
+    """
+    One backend, fresh process: load time, throughput and peak RSS.
+    """
+    texts = sample_texts(args.texts, args.pdf)
+    rss0 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    t0 = time.perf_counter()
+    backend = load_backend(args.backend, args.model, args.onnx_dir, args.threads)
+    load_s = time.perf_counter() - t0
+
+    backend.encode(texts[: args.batch_size], batch_size=args.batch_size)  # warm-up
+
+    t1 = time.perf_counter()
+    backend.encode(texts, batch_size=args.batch_size)
+    encode_s = time.perf_counter() - t1
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({
+        "backend": args.backend,
+        "texts": len(texts),
+        "batch_size": args.batch_size,
+        "load_s": round(load_s, 3),
+        "encode_s": round(encode_s, 3),
+        "clauses_per_s": round(len(texts) / encode_s, 1) if encode_s else 0.0,
+        "peak_rss_mb": round(rss / 1024, 1),  # ru_maxrss is KiB on Linux
+        "rss_before_load_mb": round(rss0 / 1024, 1),
+    }))
+    return 0
+
+
+def cmd_throughput(args) -> int:
+    results = []
+    for backend in args.backends.split(","):
+        cmd = [
+            sys.executable, "-m", "benchmarks.bench_embeddings", "_worker",
+            "--backend", backend, "--model", args.model, "--onnx-dir", args.onnx_dir,
+            "--texts", str(args.texts), "--batch-size", str(args.batch_size), "--threads", str(args.threads),
+        ]
+        if args.pdf:
+            cmd += ["--pdf", args.pdf]
+        out = subprocess.run(cmd, capture_output=True, text=True, env=os.environ.copy())
+        if out.returncode != 0:
+            print(out.stderr, file=sys.stderr)
+            return out.returncode
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    if len(results) == 2 and results[0]["clauses_per_s"]:
+        results.append({
+            "speedup": round(results[1]["clauses_per_s"] / results[0]["clauses_per_s"], 2),
+            "rss_ratio": round(results[1]["peak_rss_mb"] / max(results[0]["peak_rss_mb"], 1e-9), 2),
+        })
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="target", required=True)
+
+    p_parity = sub.add_parser("parity", help="cosine agreement torch vs ONNX")
+    p_parity.add_argument("--threshold", type=float, default=0.98)
+
+    p_tp = sub.add_parser("throughput", help="clauses/sec and memory per backend")
+    p_tp.add_argument("--backends", default="torch,onnx")
+
+    p_worker = sub.add_parser("_worker")
+    p_worker.add_argument("--backend", required=True)
+
+    default_dir = os.path.join(os.getenv("DATA_DIR", "/tmp/data"), "models", "all-MiniLM-L6-v2-onnx-int8")
+    for p in (p_parity, p_tp, p_worker):
+        p.add_argument("--model", default="all-MiniLM-L6-v2")
+        p.add_argument("--onnx-dir", default=os.getenv("EMBED_ONNX_DIR", default_dir))
+        p.add_argument("--pdf", default=None, help="take clause texts from a contract PDF")
+        p.add_argument("--texts", type=int, default=500)
+        p.add_argument("--batch-size", type=int, default=32)
+        p.add_argument("--threads", type=int, default=0)
+
+    args = parser.parse_args()
+    handlers = {"parity": cmd_parity, "throughput": cmd_throughput, "_worker": cmd_worker}
+    sys.exit(handlers[args.target](args))
+
+
+if __name__ == "__main__":
+    main()
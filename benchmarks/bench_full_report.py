@@ -0,0 +1,168 @@
+"""
+Offline throughput benchmark for build_full_report and the query API.
+
+Uses the synthetic LLM backend, so no network/API key is needed
+(the embedding model must already be in the local HF cache).
+
+    # in-process: build_full_report on a generated (or given) contract
+    python -m benchmarks.bench_full_report report --iterations 20 --concurrency 4
+
+    # API: start the server with LLM_PROVIDER=synthetic, then
+    python -m benchmarks.bench_full_report api --url http://localhost:8000 \\
+        --token <jwt> --contract-id <id> --iterations 20 --concurrency 4
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+# benchmark the pipeline, not the response cache
+os.environ.setdefault("LLM_CACHE_ENABLED", "0")
+os.environ.setdefault("LLM_PROVIDER", "synthetic")
+
+
+SAMPLE_CLAUSES = [
+    "The Associate shall keep confidential all trade secrets, client lists and business information of the Company during and after the term of employment, worldwide and without limit of time.",
+    "Either Party may terminate this Agreement by giving thirty days prior written notice, provided that the Company may terminate immediately for misconduct at its sole discretion.",
+    "The Associate shall be paid a monthly salary of Rs. 25,000 payable on the last working day of each month, subject to deduction of PF, ESI and applicable TDS.",
+    "If the Associate leaves the Company before completion of two years, the Associate is liable to pay a penalty equal to Rs. 2 lakhs as liquidated damages under section 74.",
+    "All disputes arising out of this Agreement shall be referred to arbitration under the Arbitration and Conciliation Act and the courts at Jaipur shall have exclusive jurisdiction.",
+    "The Associate shall not, for a period of two years after leaving, work with any competitor of the Company or solicit any of its clients or staff anywhere in India.",
+    "All inventions, source code and intellectual property created by the Associate during employment shall be the exclusive property of the Company without further compensation.",
+    "The Associate shall indemnify the Company against all losses, damages and claims arising from any negligent act of the Associate, without any limit on liability.",
+    "The Company may from time to time modify the duties, designation, working hours and policies applicable to the Associate as decided by the management.",
+    "On termination the Associate shall return all laptops, books, papers and other company property in his or her possession to the Company in good condition.",
+]
+
+
+def sample_contract(n_clauses: int) -> str:
+    parts = []
+    for i in range(n_clauses):
+        base = SAMPLE_CLAUSES[i % len(SAMPLE_CLAUSES)]
+        parts.append(f"{i + 1}. {base} (Clause variant {i // len(SAMPLE_CLAUSES)}.)")
+    return "\n" + "\n".join(parts)
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(p / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def run_load(fn: Callable[[int], None], iterations: int, concurrency: int) -> dict:
+    latencies: List[float] = []
+    errors = 0
+
+    def one(i: int):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            fn(i)
+        except Exception as e:
+            errors += 1
+            print(f"request {i} failed: {e}", file=sys.stderr)
+            return
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(iterations)))
+    wall_s = time.perf_counter() - wall_start
+
+    return {
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "errors": errors,
+        "wall_s": round(wall_s, 3),
+        "throughput_per_s": round(len(latencies) / wall_s, 3) if wall_s else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "mean_ms": round(statistics.mean(latencies), 2) if latencies else 0.0,
+    }
+
+
+def bench_report(args) -> dict:
+    from llm import set_provider
+    from tools.llm_providers import SyntheticProvider
+    from tools.contract_parser import load_contract, split_into_clauses
+    from tools.clause_classifier import classify_clauses_batch
+    from tools.report_builder import build_full_report
+    from rag.contract_store import ContractStore
+    from rag.vector_store import VectorStore
+
+    set_provider(SyntheticProvider(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, seed=args.seed))
+
+    text = load_contract(args.pdf) if args.pdf else sample_contract(args.clauses)
+    clauses = split_into_clauses(text)
+
+    store = ContractStore()
+    store.add_clauses_batch(clauses, classify_clauses_batch(clauses))
+
+    vector_store = VectorStore()
+    vector_store.add([(c["clause_id"], c["text"]) for c in store.clauses])
+
+    build_full_report(store, vector_store)  # warm-up (model load, first encodes)
+
+    result = run_load(lambda i: build_full_report(store, vector_store), args.iterations, args.concurrency)
+    result["clauses"] = len(store.clauses)
+    result["llm_latency_ms"] = args.latency_ms
+    return result
+
+
+def bench_api(args) -> dict:
+    url = f"{args.url.rstrip('/')}/contracts/{args.contract_id}/query"
+
+    def one(i: int):
+        # unique query text so the API's heavy-mode cache doesn't short-circuit
+        body = json.dumps({"query": f"bench run {i} {time.time()}", "mode": args.mode}).encode("utf-8")
+        req = urllib.request.Request(
+            url,
+            data=body,
+            headers={"Content-Type": "application/json", "Authorization": f"Bearer {args.token}"},
+            method="POST",
+        )
+        with urllib.request.urlopen(req, timeout=args.timeout) as resp:
+            resp.read()
+
+    result = run_load(one, args.iterations, args.concurrency)
+    result["mode"] = args.mode
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="target", required=True)
+
+    p_report = sub.add_parser("report", help="build_full_report in-process")
+    p_report.add_argument("--pdf", default=None, help="contract PDF (default: generated sample)")
+    p_report.add_argument("--clauses", type=int, default=40, help="clauses in the generated sample")
+    p_report.add_argument("--latency-ms", type=float, default=800.0)
+    p_report.add_argument("--jitter-ms", type=float, default=300.0)
+    p_report.add_argument("--seed", type=int, default=0)
+
+    p_api = sub.add_parser("api", help="POST /contracts/{id}/query against a running server")
+    p_api.add_argument("--url", default="http://localhost:8000")
+    p_api.add_argument("--token", required=True)
+    p_api.add_argument("--contract-id", required=True)
+    p_api.add_argument("--mode", default="full_report")
+    p_api.add_argument("--timeout", type=float, default=120.0)
+
+    for p in (p_report, p_api):
+        p.add_argument("--iterations", type=int, default=10)
+        p.add_argument("--concurrency", type=int, default=1)
+
+    args = parser.parse_args()
+    result = bench_report(args) if args.target == "report" else bench_api(args)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
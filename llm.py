@@ -1,13 +1,433 @@
 import os
+import time
+import asyncio
+import contextvars
+import functools
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
 from dotenv import load_dotenv
-import google.genai as genai
 load_dotenv()
 
-client = genai.Client(api_key=os.getenv('GEMINI_API_KEY'))
+from tenacity import Retrying, retry_if_exception, stop_after_attempt, wait_random_exponential
+
+from tools.llm_cache import get_llm_cache, make_key
+from tools.llm_providers import LLMProvider, provider_from_env
+from tools.single_flight import get_group
+from tools.rate_limiter import (
+    RateLimitTimeout,
+    current_priority,
+    get_rate_limiter,
+    llm_priority,  # re-exported: callers tag background work via llm.llm_priority
+)
+from tools.metrics import RollingPercentile
+from tools.llm_metrics import current_tags, llm_tags, record_call  # llm_tags re-exported
+from tools.logger import logger
+
+LLM_MODEL = os.getenv("LLM_MODEL", "gemini-2.0-flash")
+
+# Max provider calls in flight per worker process (sync + async + batch combined)
+LLM_MAX_CONCURRENCY = max(1, int(os.getenv("LLM_MAX_CONCURRENCY", "8")))
+
+# Hedging: if an attempt hasn't answered by the p-th percentile of recent
+# latencies, fire one backup request and take whichever finishes first.
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "1") not in {"0", "false", "False", ""}
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_DEFAULT_MS = float(os.getenv("LLM_HEDGE_DEFAULT_MS", "8000"))  # until enough samples
+LLM_HEDGE_MIN_MS = float(os.getenv("LLM_HEDGE_MIN_MS", "300"))
+
+# Retries on transient provider errors (jittered exponential backoff)
+LLM_MAX_ATTEMPTS = max(1, int(os.getenv("LLM_MAX_ATTEMPTS", "3")))
+LLM_RETRY_BASE_S = float(os.getenv("LLM_RETRY_BASE_S", "0.5"))
+LLM_RETRY_MAX_S = float(os.getenv("LLM_RETRY_MAX_S", "8"))
+
+_PROVIDER: Optional[LLMProvider] = None
+_PROVIDER_LOCK = threading.Lock()
+
+_INFLIGHT = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+# Set on _EXECUTOR workers: a batch issued from one runs inline instead of
+# queueing behind (and possibly deadlocking on) its own pool.
+_WORKER = threading.local()
+_EXECUTOR = ThreadPoolExecutor(
+    max_workers=LLM_MAX_CONCURRENCY,
+    thread_name_prefix="llm",
+    initializer=lambda: setattr(_WORKER, "active", True),
+)
+
+# Attempts (primary + hedge) run here; separate from _EXECUTOR so a call
+# that is itself running on _EXECUTOR never waits on its own pool.
+_ATTEMPT_POOL = ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY * 2, thread_name_prefix="llm-attempt")
+
+# Identical prompts in flight at the same time share one provider call
+_FLIGHT = get_group("llm")
+
+_LATENCY = RollingPercentile(window=500)
+
+_STATS_LOCK = threading.Lock()
+_STATS = {
+    "attempts": 0,
+    "hedges": 0,
+    "hedge_wins": 0,
+    "hedges_skipped": 0,
+    "abandoned": 0,
+    "retries": 0,
+    "timeouts": 0,
+    "errors": 0,
+}
+
+# Absolute time.monotonic() deadline for every LLM call made in this context
+_DEADLINE: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("llm_deadline", default=None)
+
+LLMRequest = Tuple[str, str]  # (system_prompt, user_prompt)
+# Reply check for the response cache: replies it rejects are returned but never stored
+Validator = Callable[[str], bool]
+
+
+class LLMTimeoutError(TimeoutError):
+    """
+    The call's deadline passed before any attempt answered.
+    """
+
+
+class _AttemptCancelled(Exception):
+    """
+    The caller gave up on this attempt before it reached the provider.
+    """
+
+
+# Attempts whose caller moved on (lost hedge, deadline) while the provider call
+# was already running; they still hold an _INFLIGHT slot until they return.
+_ORPHANS = 0
+
+# How often an attempt waiting for a free slot checks whether it was abandoned
+_SLOT_POLL_S = 0.05
+
+
+class _Attempt:
+    """
+    Shared state of one submitted attempt: the caller can abandon it, and an
+    abandoned attempt that is already running is counted as an orphan.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.running = False
+        self.abandoned = False
+
+    def start(self) -> bool:
+        with self._lock:
+            if self.abandoned:
+                return False
+            self.running = True
+            return True
+
+    def finish(self):
+        global _ORPHANS
+        with self._lock:
+            self.running = False
+            if self.abandoned:
+                with _STATS_LOCK:
+                    _ORPHANS -= 1
+
+    def abandon(self):
+        global _ORPHANS
+        with self._lock:
+            if self.abandoned:
+                return
+            self.abandoned = True
+            if self.running:
+                with _STATS_LOCK:
+                    _ORPHANS += 1
+                    _STATS["abandoned"] += 1
+
+
+def _bump(name: str, n: int = 1):
+    with _STATS_LOCK:
+        _STATS[name] += n
+
+
+def llm_stats() -> Dict[str, Any]:
+    with _STATS_LOCK:
+        out: Dict[str, Any] = dict(_STATS)
+        out["orphaned_in_flight"] = _ORPHANS
+    out["hedge_after_ms"] = round(_hedge_delay_s() * 1000, 1)
+    out["latency_samples"] = _LATENCY.count()
+    return out
+
+
+@contextmanager
+def llm_deadline(seconds: Optional[float]):
+    """
+    Every call_llm inside this block (including tool threads started from it)
+    must finish within `seconds`. Nested blocks keep the earlier deadline.
+    """
+    if seconds is None:
+        yield
+        return
+
+    new = time.monotonic() + seconds
+    current = _DEADLINE.get()
+    token = _DEADLINE.set(new if current is None else min(current, new))
+    try:
+        yield
+    finally:
+        _DEADLINE.reset(token)
+
+
+def get_provider() -> LLMProvider:
+    """
+    Singleton: backend chosen by LLM_PROVIDER (see tools/llm_providers.py),
+    shared by every call path in this worker process.
+    """
+    global _PROVIDER
+    if _PROVIDER is None:
+        with _PROVIDER_LOCK:
+            if _PROVIDER is None:
+                _PROVIDER = provider_from_env(LLM_MODEL)
+    return _PROVIDER
+
+
+def set_provider(provider: LLMProvider):
+    """
+    Swap the backend at runtime (benchmarks, record/replay sessions).
+    """
+    global _PROVIDER
+    with _PROVIDER_LOCK:
+        _PROVIDER = provider
+
+
+def _hedge_delay_s() -> float:
+    ms = LLM_HEDGE_DEFAULT_MS
+    if _LATENCY.count() >= LLM_HEDGE_MIN_SAMPLES:
+        ms = _LATENCY.percentile(LLM_HEDGE_PERCENTILE) or ms
+    return max(ms, LLM_HEDGE_MIN_MS) / 1000.0
+
+
+def _attempt(provider: LLMProvider, full_prompt: str, state: _Attempt) -> str:
+    # an abandoned attempt never takes a slot / makes the provider call
+    while not _INFLIGHT.acquire(timeout=_SLOT_POLL_S):
+        if state.abandoned:
+            raise _AttemptCancelled()
+    try:
+        if not state.start():
+            raise _AttemptCancelled()
+        _bump("attempts")
+        start = time.monotonic()
+        try:
+            text = provider.generate(full_prompt)
+        finally:
+            state.finish()
+    finally:
+        _INFLIGHT.release()
+    _LATENCY.add((time.monotonic() - start) * 1000)
+    return text
+
+
+def _take_token(deadline: Optional[float], blocking: bool = True) -> bool:
+    """
+    One provider request = one token from the shared rate limiter (if enabled).
+    Non-blocking mode is used for hedges: no free token -> no hedge.
+    """
+    limiter = get_rate_limiter()
+    if limiter is None:
+        return True
+
+    priority = current_priority()
+    if not blocking:
+        return limiter.try_acquire(priority)
+
+    timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+    try:
+        limiter.acquire(priority, timeout=timeout)
+    except RateLimitTimeout as e:
+        _bump("timeouts")
+        raise LLMTimeoutError(str(e)) from e
+    return True
+
+
+def _hedged(provider: LLMProvider, full_prompt: str, deadline: Optional[float]) -> str:
+    """
+    One logical attempt: primary request, plus a backup if the primary is slower
+    than the hedge threshold. First success wins; the loser is abandoned: if it
+    hasn't reached the provider yet it never will, otherwise it is an orphan
+    until it lands (result discarded). No hedges are fired while orphans are
+    outstanding, so slow providers don't get double the load.
+    """
+    if deadline is not None and time.monotonic() >= deadline:
+        _bump("timeouts")
+        raise LLMTimeoutError("LLM deadline already passed")
+
+    _take_token(deadline)
+
+    if deadline is None and not LLM_HEDGE_ENABLED:
+        return _attempt(provider, full_prompt, _Attempt())
+
+    start = time.monotonic()
+    states: Dict[Any, _Attempt] = {}
+
+    def submit():
+        state = _Attempt()
+        fut = _ATTEMPT_POOL.submit(contextvars.copy_context().run, _attempt, provider, full_prompt, state)
+        states[fut] = state
+        return fut
+
+    primary = submit()
+    pending = {primary}
+    hedge_at = start + _hedge_delay_s() if LLM_HEDGE_ENABLED else None
+    last_error: Optional[BaseException] = None
+
+    try:
+        while True:
+            now = time.monotonic()
+            wake_at = [t for t in (hedge_at, deadline) if t is not None]
+            timeout = max(0.0, min(wake_at) - now) if wake_at else None
+
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for fut in done:
+                err = fut.exception()
+                if err is None:
+                    if fut is not primary:
+                        _bump("hedge_wins")
+                    return fut.result()
+                last_error = err
 
+            if not pending:
+                # every attempt so far failed -> let the retry policy decide
+                raise last_error
 
+            now = time.monotonic()
 
-def call_llm(system_prompt:str,user_prompt:str)->str:
+            if deadline is not None and now >= deadline:
+                _bump("timeouts")
+                raise LLMTimeoutError(f"LLM call exceeded deadline after {round((now - start) * 1000)} ms")
+
+            if hedge_at is not None and now >= hedge_at:
+                hedge_at = None
+                with _STATS_LOCK:
+                    orphans = _ORPHANS
+                if not orphans and _take_token(deadline, blocking=False):
+                    _bump("hedges")
+                    pending.add(submit())
+                else:
+                    _bump("hedges_skipped")
+    finally:
+        for fut in pending:
+            if not fut.cancel():
+                states[fut].abandon()
+
+
+def _generate(full_prompt: str, deadline: Optional[float]) -> str:
+    provider = get_provider()
+
+    def retryable(exc: BaseException) -> bool:
+        return not isinstance(exc, LLMTimeoutError) and provider.is_transient(exc)
+
+    def out_of_time(retry_state) -> bool:
+        return deadline is not None and time.monotonic() >= deadline
+
+    backoff = wait_random_exponential(multiplier=LLM_RETRY_BASE_S, max=LLM_RETRY_MAX_S)
+
+    def wait_within_deadline(retry_state) -> float:
+        w = backoff(retry_state)
+        if deadline is not None:
+            w = min(w, max(0.0, deadline - time.monotonic()))
+        return w
+
+    def before_sleep(retry_state):
+        _bump("retries")
+        logger.warning(
+            f"[LLM] transient error, retry {retry_state.attempt_number}/{LLM_MAX_ATTEMPTS - 1}: "
+            f"{retry_state.outcome.exception()!r}"
+        )
+
+    try:
+        for attempt in Retrying(
+            stop=stop_after_attempt(LLM_MAX_ATTEMPTS) | out_of_time,
+            wait=wait_within_deadline,
+            retry=retry_if_exception(retryable),
+            before_sleep=before_sleep,
+            reraise=True,
+        ):
+            with attempt:
+                return _hedged(provider, full_prompt, deadline)
+    except Exception:
+        _bump("errors")
+        raise
+
+
+def _valid(validate: Optional[Validator], text: str) -> bool:
+    if validate is None:
+        return True
+    try:
+        return bool(validate(text))
+    except Exception:
+        return False
+
+
+def _call_llm(
+    full_prompt: str, use_cache: bool, abs_deadline: Optional[float], validate: Optional[Validator] = None
+) -> Tuple[str, str]:
+    """
+    Returns (text, source) with source "provider" | "cache" | "coalesced".
+    A reply failing `validate` is not cached (and a cached one is treated as a miss).
+    """
+    if not use_cache:
+        return _generate(full_prompt, abs_deadline), "provider"
+
+    model = get_provider().model
+    key = make_key(model, full_prompt)
+    cache = get_llm_cache()
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None and _valid(validate, cached):
+            return cached, "cache"
+
+    fetched = []
+
+    def fetch() -> str:
+        text = _generate(full_prompt, abs_deadline)
+        fetched.append(True)
+        if cache is not None and _valid(validate, text):
+            cache.set(key, model, text)
+        return text
+
+    wait_s = None if abs_deadline is None else max(0.0, abs_deadline - time.monotonic())
+    try:
+        text = _FLIGHT.do(key, fetch, timeout=wait_s)
+    except LLMTimeoutError:
+        raise
+    except TimeoutError as e:
+        # follower gave up waiting on the shared in-flight call
+        raise LLMTimeoutError(str(e)) from e
+    return text, "provider" if fetched else "coalesced"
+
+
+def call_llm(
+    system_prompt:str,
+    user_prompt:str,
+    use_cache: bool = True,
+    deadline: Optional[float] = None,
+    tool: Optional[str] = None,
+    validate: Optional[Validator] = None,
+)->str:
+    """
+    use_cache=False skips the response cache and request coalescing for this
+    call (always a fresh provider round trip, nothing stored).
+
+    validate: the caller's parse check; a reply it rejects (or raises on) is
+    still returned but not cached, so the next identical call asks again.
+
+    deadline: seconds this call may take, retries and hedges included
+    (LLMTimeoutError when exceeded). An enclosing llm_deadline() block also
+    applies; the earlier of the two wins.
+
+    tool: call-site name for instrumentation (falls back to an enclosing
+    llm_tags(tool=...) block, then "unknown").
+    """
 
     full_prompt = f"""
     {system_prompt}
@@ -15,11 +435,109 @@ def call_llm(system_prompt:str,user_prompt:str)->str:
     User Task:
     {user_prompt}
     """
-    
 
-    response = client.models.generate_content(
-        model = "gemini-2.0-flash",
-        contents = full_prompt
+    abs_deadline = _DEADLINE.get()
+    if deadline is not None:
+        own = time.monotonic() + deadline
+        abs_deadline = own if abs_deadline is None else min(abs_deadline, own)
+
+    tool = tool or current_tags().get("tool") or "unknown"
+    start = time.perf_counter()
+    try:
+        text, source = _call_llm(full_prompt, use_cache, abs_deadline, validate)
+    except Exception as e:
+        record_call(tool, full_prompt, None, (time.perf_counter() - start) * 1000, "provider", ok=False, error=e)
+        raise
+
+    record_call(tool, full_prompt, text, (time.perf_counter() - start) * 1000, source)
+    return text
+
+
+async def call_llm_async(
+    system_prompt: str,
+    user_prompt: str,
+    use_cache: bool = True,
+    deadline: Optional[float] = None,
+    tool: Optional[str] = None,
+    validate: Optional[Validator] = None,
+) -> str:
+    """
+    Awaitable call_llm. Runs on the shared LLM pool, so the in-flight limit and
+    the provider client are the same for sync and async callers.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _EXECUTOR,
+        functools.partial(
+            contextvars.copy_context().run, call_llm, system_prompt, user_prompt,
+            use_cache=use_cache, deadline=deadline, tool=tool, validate=validate,
+        ),
+    )
+
+
+async def call_llm_batch_async(
+    requests: Sequence[LLMRequest],
+    return_exceptions: bool = False,
+    use_cache: bool = True,
+    deadline: Optional[float] = None,
+    tool: Optional[str] = None,
+    validate: Union[Validator, Sequence[Optional[Validator]], None] = None,
+) -> List[Any]:
+    """
+    Awaitable call_llm_batch: independent calls run concurrently, results keep
+    input order.
+    """
+    checks = list(validate) if isinstance(validate, (list, tuple)) else [validate] * len(requests)
+    return await asyncio.gather(
+        *(
+            call_llm_async(s, u, use_cache=use_cache, deadline=deadline, tool=tool, validate=check)
+            for (s, u), check in zip(requests, checks)
+        ),
+        return_exceptions=return_exceptions,
     )
 
-    return response.text
+
+def call_llm_batch(
+    requests: Sequence[LLMRequest],
+    return_exceptions: bool = False,
+    use_cache: bool = True,
+    deadline: Optional[float] = None,
+    tool: Optional[str] = None,
+    validate: Union[Validator, Sequence[Optional[Validator]], None] = None,
+) -> List[Any]:
+    """
+    Run independent LLM calls concurrently on the shared pool; results keep input order.
+    With return_exceptions=True a failed call yields its exception instead of raising.
+    validate: one check for every reply, or one per request (see call_llm).
+    Called from a pool worker itself, the requests run inline one after another.
+    """
+    checks = list(validate) if isinstance(validate, (list, tuple)) else [validate] * len(requests)
+    results: List[Any] = []
+    if getattr(_WORKER, "active", False):
+        for (s, u), check in zip(requests, checks):
+            try:
+                results.append(call_llm(s, u, use_cache=use_cache, deadline=deadline, tool=tool, validate=check))
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results.append(e)
+        return results
+
+    futures = [
+        _EXECUTOR.submit(
+            functools.partial(
+                contextvars.copy_context().run, call_llm, s, u,
+                use_cache=use_cache, deadline=deadline, tool=tool, validate=check,
+            )
+        )
+        for (s, u), check in zip(requests, checks)
+    ]
+
+    for fut in futures:
+        try:
+            results.append(fut.result())
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            results.append(e)
+    return results
@@ -0,0 +1,149 @@
+import os
+import re
+import math
+from typing import Dict, Hashable, List, Sequence, Tuple
+
+import numpy as np
+
+# Okapi BM25 parameters
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+# Reciprocal rank fusion constant (60 is the usual choice)
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+_TOKEN = re.compile(r"\d+(?:[.,]\d+)*|[a-z]+")
+
+# Question words and filler; contract vocabulary ("notice", "pay", "term", ...) stays
+STOPWORDS = frozenset("""
+a an and are as at be been by can do does for from has have how i if in into is it its
+me my of on or our shall should so that the their them there these this those to was
+we were what when where which who whom why will with would you your any all about
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase words and numbers ("2,00,000", "74"); a plural "s" is dropped
+    so "2 lakh" matches "2 lakhs".
+    """
+    out = []
+    for tok in _TOKEN.findall((text or "").lower()):
+        if tok in STOPWORDS:
+            continue
+        if tok[0].isalpha() and len(tok) > 3 and tok.endswith("s") and not tok.endswith("ss"):
+            tok = tok[:-1]
+        out.append(tok)
+    return out
+
+
+class BM25Index:
+    """
+    Inverted index over a contract's clauses (same order as the VectorStore rows).
+
+    Postings are CSR-style arrays: term i (in sorted `terms`) owns
+    docs[offsets[i]:offsets[i+1]] with term frequencies tf[...]. Terms are
+    looked up with np.searchsorted, so loading needs no per-term work.
+    """
+
+    def __init__(self, terms: np.ndarray, offsets: np.ndarray, docs: np.ndarray, tf: np.ndarray, doc_len: np.ndarray):
+        self.terms = terms
+        self.offsets = offsets
+        self.docs = docs
+        self.tf = tf
+        self.doc_len = doc_len
+
+        n = len(doc_len)
+        self.n_docs = n
+        self.avg_len = float(doc_len.mean()) if n else 0.0
+        df = np.diff(offsets).astype("float64")
+        self.idf = np.log1p((n - df + 0.5) / (df + 0.5))
+        self._unknown_idf = math.log1p((n + 0.5) / 0.5)
+
+    @classmethod
+    def build(cls, texts: Sequence[str]) -> "BM25Index":
+        postings: Dict[str, Dict[int, int]] = {}
+        doc_len = np.zeros(len(texts), dtype="float32")
+        for d, text in enumerate(texts):
+            toks = tokenize(text)
+            doc_len[d] = len(toks)
+            for t in toks:
+                row = postings.setdefault(t, {})
+                row[d] = row.get(d, 0) + 1
+
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype="int64")
+        offsets[1:] = np.cumsum([len(postings[t]) for t in terms])
+        docs = np.zeros(int(offsets[-1]), dtype="int32")
+        tf = np.zeros(int(offsets[-1]), dtype="float32")
+        for i, t in enumerate(terms):
+            row = postings[t]
+            docs[offsets[i]:offsets[i + 1]] = list(row.keys())
+            tf[offsets[i]:offsets[i + 1]] = list(row.values())
+
+        return cls(np.array(terms, dtype=str), offsets, docs, tf, doc_len)
+
+    def save(self, path: str):
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp, terms=self.terms, offsets=self.offsets, docs=self.docs, tf=self.tf, doc_len=self.doc_len)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["terms"], data["offsets"], data["docs"], data["tf"], data["doc_len"])
+
+    def _term_id(self, term: str) -> int:
+        i = int(np.searchsorted(self.terms, term))
+        if i < len(self.terms) and self.terms[i] == term:
+            return i
+        return -1
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[int, float, float]]:
+        """
+        [(row, bm25 score, coverage), ...] best first, only rows matching a term.
+        coverage = share of the query's IDF mass found in the row (0..1);
+        query terms absent from the contract count against it.
+        """
+        q_terms = list(dict.fromkeys(tokenize(query)))
+        if not q_terms or not self.n_docs:
+            return []
+
+        scores = np.zeros(self.n_docs, dtype="float64")
+        matched = np.zeros(self.n_docs, dtype="float64")
+        total_idf = 0.0
+        for term in q_terms:
+            t = self._term_id(term)
+            if t < 0:
+                total_idf += self._unknown_idf
+                continue
+            idf = float(self.idf[t])
+            total_idf += idf
+
+            lo, hi = int(self.offsets[t]), int(self.offsets[t + 1])
+            docs = self.docs[lo:hi]
+            tf = self.tf[lo:hi]
+            norm = BM25_K1 * (1.0 - BM25_B + BM25_B * self.doc_len[docs] / max(self.avg_len, 1e-9))
+            scores[docs] += idf * tf * (BM25_K1 + 1.0) / (tf + norm)
+            matched[docs] += idf
+
+        hit_rows = np.flatnonzero(scores > 0)
+        if not len(hit_rows):
+            return []
+        if len(hit_rows) > k:
+            hit_rows = hit_rows[np.argpartition(-scores[hit_rows], k - 1)[:k]]
+        hit_rows = hit_rows[np.argsort(-scores[hit_rows], kind="stable")]
+
+        return [(int(r), float(scores[r]), float(matched[r] / total_idf)) for r in hit_rows]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Hashable]], k: int = RRF_K) -> List[Tuple[Hashable, float]]:
+    """
+    Fuse ranked lists: score(x) = sum over lists of 1 / (k + rank), rank from 1.
+    Returns [(key, score), ...] best first; ties keep first-seen order.
+    """
+    fused: Dict[Hashable, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            fused[key] = fused.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda kv: kv[1], reverse=True)
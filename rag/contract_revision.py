@@ -0,0 +1,75 @@
+import os
+import hashlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from rag.embedding_cache import normalize_text
+
+# A changed clause at least this similar (cosine) to a leftover clause of the
+# previous version keeps that clause's type instead of being re-classified.
+REVISION_REUSE_TYPE_MIN_SIM = float(os.getenv("REVISION_REUSE_TYPE_MIN_SIM", "0.92"))
+
+
+def content_hash(text: str) -> str:
+    """
+    Whitespace-insensitive SHA-256 of a clause (same normalization as the embedding cache).
+    """
+    return hashlib.sha256(normalize_text(text or "").encode("utf-8")).hexdigest()
+
+
+@dataclass
+class ClauseMatch:
+    status: str                      # "unchanged" | "modified" | "added"
+    old_index: Optional[int] = None  # row in the previous version
+    similarity: float = 1.0
+
+
+def match_by_hash(new_hashes: Sequence[str], old_hashes: Sequence[str]) -> List[Optional[int]]:
+    """
+    Old row with identical content for each new clause, else None. Repeated
+    boilerplate is paired in order, each old row used at most once.
+    """
+    free: Dict[str, List[int]] = {}
+    for i, h in enumerate(old_hashes):
+        free.setdefault(h, []).append(i)
+
+    out: List[Optional[int]] = []
+    for h in new_hashes:
+        rows = free.get(h)
+        out.append(rows.pop(0) if rows else None)
+    return out
+
+
+def match_by_similarity(
+    new_vectors: np.ndarray,
+    old_vectors: np.ndarray,
+    min_sim: float = REVISION_REUSE_TYPE_MIN_SIM,
+) -> List[ClauseMatch]:
+    """
+    Greedy one-to-one alignment of edited clauses to leftover old clauses:
+    the most similar pairs are taken first; anything below min_sim is "added".
+    Indices are rows of the given matrices.
+    """
+    out = [ClauseMatch("added", None, 0.0) for _ in range(len(new_vectors))]
+    if not len(new_vectors) or not len(old_vectors):
+        return out
+
+    def unit(m: np.ndarray) -> np.ndarray:
+        m = np.asarray(m, dtype="float32")
+        return m / np.clip(np.linalg.norm(m, axis=1, keepdims=True), 1e-12, None)
+
+    sims = unit(new_vectors) @ unit(old_vectors).T
+    used_new, used_old = set(), set()
+    for flat in np.argsort(-sims, axis=None):
+        i, j = divmod(int(flat), sims.shape[1])
+        s = float(sims[i, j])
+        if s < min_sim:
+            break
+        if i in used_new or j in used_old:
+            continue
+        used_new.add(i)
+        used_old.add(j)
+        out[i] = ClauseMatch("modified", j, s)
+    return out
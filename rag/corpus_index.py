@@ -0,0 +1,356 @@
+import os
+import io
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import faiss
+import numpy as np
+
+from tools.logger import logger
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: single-worker deployments only
+    fcntl = None
+
+DATA_DIR = os.getenv("DATA_DIR", "/tmp/data")
+
+CORPUS_INDEX_DIR = os.getenv("CORPUS_INDEX_DIR", os.path.join(DATA_DIR, "indexes", "corpus"))
+
+# "hnsw" (default) | "ivf" | "flat"
+CORPUS_INDEX_TYPE = os.getenv("CORPUS_INDEX_TYPE", "hnsw").strip().lower()
+CORPUS_HNSW_M = int(os.getenv("CORPUS_HNSW_M", "32"))
+CORPUS_HNSW_EF_CONSTRUCTION = int(os.getenv("CORPUS_HNSW_EF_CONSTRUCTION", "80"))
+CORPUS_HNSW_EF_SEARCH = int(os.getenv("CORPUS_HNSW_EF_SEARCH", "64"))
+CORPUS_IVF_NLIST = int(os.getenv("CORPUS_IVF_NLIST", "256"))
+CORPUS_IVF_NPROBE = int(os.getenv("CORPUS_IVF_NPROBE", "16"))
+# IVF stays exact (flat) until this many vectors exist, then trains once
+CORPUS_IVF_MIN_TRAIN = int(os.getenv("CORPUS_IVF_MIN_TRAIN", "4000"))
+
+# Rebuild once this share of stored vectors belongs to replaced contracts
+_COMPACT_DELETED_FRACTION = 0.2
+
+
+def _new_index(dim: int, kind: str, n_hint: int = 0) -> faiss.Index:
+    if kind == "hnsw":
+        base = faiss.IndexHNSWFlat(dim, CORPUS_HNSW_M)
+        base.hnsw.efConstruction = CORPUS_HNSW_EF_CONSTRUCTION
+        return faiss.IndexIDMap2(base)
+
+    if kind == "ivf" and n_hint >= CORPUS_IVF_MIN_TRAIN:
+        nlist = max(1, min(CORPUS_IVF_NLIST, n_hint // 39))
+        quantizer = faiss.IndexFlatL2(dim)
+        return faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_L2)
+
+    return faiss.IndexIDMap2(faiss.IndexFlatL2(dim))
+
+
+def _is_ivf(index: faiss.Index) -> bool:
+    return isinstance(index, faiss.IndexIVF)
+
+
+class CorpusIndex:
+    """
+    One tenant's portfolio index: every clause vector of every contract,
+    labelled with a running int64 id that maps back to (contract_id, clause_id).
+
+    Stored as a single .npz (serialized FAISS index + label map), replaced
+    atomically, so readers in other workers always see a consistent pair.
+    Re-indexing a contract marks its old labels deleted (HNSW can't remove);
+    they are filtered at search time and dropped by the next compaction.
+    """
+
+    def __init__(self, dim: int, kind: str):
+        self.dim = dim
+        self.kind = kind
+        self.index = _new_index(dim, kind)
+        self.labels = np.zeros(0, dtype="int64")
+        self.contract_ids: List[str] = []
+        self.clause_ids = np.zeros(0, dtype="int64")
+        self.deleted = np.zeros(0, dtype=bool)
+        self.next_label = 0
+        # contracts indexed with no clauses: present, but own no labels
+        self.empty_contracts: Set[str] = set()
+        self._pos: Dict[int, int] = {}
+
+    # ---------- persistence ----------
+    def to_bytes(self) -> bytes:
+        buf = io.BytesIO()
+        np.savez(
+            buf,
+            kind=np.array(self.kind),
+            dim=np.array(self.dim),
+            index=faiss.serialize_index(self.index),
+            labels=self.labels,
+            contract_ids=np.array(self.contract_ids, dtype=str),
+            clause_ids=self.clause_ids,
+            deleted=self.deleted,
+            next_label=np.array(self.next_label),
+            empty_contracts=np.array(sorted(self.empty_contracts), dtype=str),
+        )
+        return buf.getvalue()
+
+    @classmethod
+    def from_file(cls, path: str) -> "CorpusIndex":
+        with np.load(path, allow_pickle=False) as data:
+            obj = cls(int(data["dim"]), str(data["kind"]))
+            obj.index = faiss.deserialize_index(np.array(data["index"]))
+            obj.labels = np.array(data["labels"], dtype="int64")
+            obj.contract_ids = [str(c) for c in data["contract_ids"]]
+            obj.clause_ids = np.array(data["clause_ids"], dtype="int64")
+            obj.deleted = np.array(data["deleted"], dtype=bool)
+            obj.next_label = int(data["next_label"])
+            if "empty_contracts" in data.files:  # older files
+                obj.empty_contracts = {str(c) for c in data["empty_contracts"]}
+        obj._reindex_positions()
+        return obj
+
+    def _reindex_positions(self):
+        self._pos = {int(l): i for i, l in enumerate(self.labels)}
+
+    # ---------- updates ----------
+    def live_contracts(self) -> Set[str]:
+        return {c for c, d in zip(self.contract_ids, self.deleted) if not d} | self.empty_contracts
+
+    def remove_contract(self, contract_id: str) -> int:
+        self.empty_contracts.discard(contract_id)
+        mask = np.array([c == contract_id for c in self.contract_ids], dtype=bool) & ~self.deleted
+        n = int(mask.sum())
+        if n:
+            self.deleted |= mask
+        return n
+
+    def add_contract(self, contract_id: str, clause_ids: Iterable[int], vectors: np.ndarray):
+        """
+        Incremental: new vectors are added to the existing graph / lists.
+        A contract that was indexed before is replaced.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        clause_ids = np.asarray(list(clause_ids), dtype="int64")
+        if len(clause_ids) != vectors.shape[0]:
+            raise ValueError("clause_ids and vectors must have the same length")
+
+        self.remove_contract(contract_id)
+        if not len(clause_ids):
+            self.empty_contracts.add(contract_id)
+            return
+
+        labels = np.arange(self.next_label, self.next_label + len(clause_ids), dtype="int64")
+        self.next_label += len(clause_ids)
+
+        self._maybe_train(extra=vectors)
+        self.index.add_with_ids(vectors, labels)
+
+        start = len(self.labels)
+        self.labels = np.concatenate([self.labels, labels])
+        self.contract_ids.extend([contract_id] * len(labels))
+        self.clause_ids = np.concatenate([self.clause_ids, clause_ids])
+        self.deleted = np.concatenate([self.deleted, np.zeros(len(labels), dtype=bool)])
+        for i, l in enumerate(labels):
+            self._pos[int(l)] = start + i
+
+        if len(self.deleted) and self.deleted.mean() > _COMPACT_DELETED_FRACTION:
+            self.compact()
+
+    def _live_vectors(self) -> Tuple[np.ndarray, np.ndarray]:
+        keep = np.where(~self.deleted)[0]
+        if not len(keep):
+            return np.zeros(0, dtype="int64"), np.zeros((0, self.dim), dtype="float32")
+        labels = self.labels[keep]
+        vecs = np.vstack([self.index.reconstruct(int(l)) for l in labels]).astype("float32")
+        return keep, vecs
+
+    def _maybe_train(self, extra: np.ndarray):
+        """
+        IVF: switch from the exact staging index to a trained IVF index once
+        there is enough data to train on.
+        """
+        if self.kind != "ivf" or _is_ivf(self.index):
+            return
+        n_live = int((~self.deleted).sum()) + extra.shape[0]
+        if n_live < CORPUS_IVF_MIN_TRAIN:
+            return
+        self._rebuild(extra_for_training=extra)
+
+    def _rebuild(self, extra_for_training: Optional[np.ndarray] = None):
+        keep, vecs = self._live_vectors()
+        train = vecs if extra_for_training is None else np.vstack([vecs, extra_for_training])
+
+        index = _new_index(self.dim, self.kind, n_hint=len(train))
+        if _is_ivf(index):
+            index.set_direct_map_type(faiss.DirectMap.Hashtable)  # reconstruct() by label
+            index.train(train)
+        if len(keep):
+            index.add_with_ids(vecs, self.labels[keep])
+
+        self.index = index
+        self.labels = self.labels[keep]
+        self.contract_ids = [self.contract_ids[i] for i in keep]
+        self.clause_ids = self.clause_ids[keep]
+        self.deleted = np.zeros(len(keep), dtype=bool)
+        self._reindex_positions()
+
+    def compact(self):
+        before = len(self.labels)
+        self._rebuild()
+        logger.info(f"[CORPUS] compacted {before} -> {len(self.labels)} vectors ({self.kind})")
+
+    # ---------- search ----------
+    def search(self, query_vecs: np.ndarray, k: int) -> List[List[Tuple[str, int, float]]]:
+        """
+        Per query: [(contract_id, clause_id, l2_distance), ...] best first.
+        """
+        n_live = int((~self.deleted).sum())
+        if n_live == 0:
+            return [[] for _ in range(len(query_vecs))]
+
+        if self.kind == "hnsw":
+            faiss.downcast_index(self.index.index).hnsw.efSearch = max(CORPUS_HNSW_EF_SEARCH, k)
+        elif _is_ivf(self.index):
+            self.index.nprobe = min(CORPUS_IVF_NPROBE, self.index.nlist)
+
+        # over-fetch to make up for deleted labels still in the graph
+        n_deleted = len(self.deleted) - n_live
+        fetch = min(len(self.labels), k + n_deleted)
+        distances, labels = self.index.search(np.ascontiguousarray(query_vecs, dtype="float32"), fetch)
+
+        out: List[List[Tuple[str, int, float]]] = []
+        for row_d, row_l in zip(distances, labels):
+            hits: List[Tuple[str, int, float]] = []
+            for d, l in zip(row_d, row_l):
+                i = self._pos.get(int(l))
+                if i is None or self.deleted[i]:
+                    continue
+                hits.append((self.contract_ids[i], int(self.clause_ids[i]), float(d)))
+                if len(hits) >= k:
+                    break
+            out.append(hits)
+        return out
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "kind": self.kind,
+            "trained_ivf": _is_ivf(self.index),
+            "vectors": int(len(self.labels)),
+            "deleted": int(self.deleted.sum()),
+            "contracts": len(self.live_contracts()),
+        }
+
+
+class CorpusIndexStore:
+    """
+    Per-tenant CorpusIndex files under CORPUS_INDEX_DIR, with an in-process
+    cache that reloads when another worker has written a newer file.
+    Writers serialize on a per-tenant lock file.
+    """
+
+    def __init__(self, directory: str, dim: int, kind: str):
+        self.directory = directory
+        self.dim = dim
+        self.kind = kind
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._tenant_locks: Dict[int, threading.Lock] = {}
+        self._loaded: Dict[int, Tuple[Tuple[int, int], CorpusIndex]] = {}
+
+    def _path(self, user_id: int) -> str:
+        return os.path.join(self.directory, f"user_{int(user_id)}.corpus.npz")
+
+    @contextmanager
+    def _write_lock(self, user_id: int):
+        with self._lock:
+            tlock = self._tenant_locks.setdefault(user_id, threading.Lock())
+        with tlock:
+            if fcntl is None:
+                yield
+                return
+            with open(self._path(user_id) + ".lock", "a+") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def get(self, user_id: int) -> CorpusIndex:
+        path = self._path(user_id)
+        try:
+            st = os.stat(path)
+            version = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return CorpusIndex(self.dim, self.kind)
+
+        with self._lock:
+            cached = self._loaded.get(user_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        corpus = CorpusIndex.from_file(path)
+        with self._lock:
+            self._loaded[user_id] = (version, corpus)
+        return corpus
+
+    def _load_for_write(self, user_id: int) -> CorpusIndex:
+        """
+        A private copy to modify (caller holds the write lock). The cached
+        instance may be searched by request threads right now, so it is never
+        changed in place; _save swaps the new one in.
+        """
+        path = self._path(user_id)
+        if not os.path.exists(path):
+            return CorpusIndex(self.dim, self.kind)
+        return CorpusIndex.from_file(path)
+
+    def _save(self, user_id: int, corpus: CorpusIndex):
+        path = self._path(user_id)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(corpus.to_bytes())
+        os.replace(tmp, path)
+
+        st = os.stat(path)
+        with self._lock:
+            self._loaded[user_id] = ((st.st_mtime_ns, st.st_size), corpus)
+
+    def update(self, user_id: int, additions: Dict[str, Tuple[List[int], np.ndarray]]):
+        """
+        additions: contract_id -> (clause_ids, vectors). One load/save per call.
+        """
+        if not additions:
+            return
+        start = time.perf_counter()
+        with self._write_lock(user_id):
+            corpus = self._load_for_write(user_id)
+            if corpus.kind != self.kind:
+                logger.info(f"[CORPUS] user_id={user_id} switching {corpus.kind} -> {self.kind}")
+                corpus.kind = self.kind
+                corpus.compact()
+            for contract_id, (clause_ids, vectors) in additions.items():
+                corpus.add_contract(contract_id, clause_ids, vectors)
+            self._save(user_id, corpus)
+        logger.info(
+            f"[CORPUS] user_id={user_id} +{len(additions)} contracts "
+            f"vectors={len(corpus.labels)} ms={round((time.perf_counter() - start) * 1000, 2)}"
+        )
+
+    def remove(self, user_id: int, contract_id: str):
+        with self._write_lock(user_id):
+            corpus = self._load_for_write(user_id)
+            was_empty = contract_id in corpus.empty_contracts
+            if corpus.remove_contract(contract_id) or was_empty:
+                self._save(user_id, corpus)
+
+
+_STORE: Optional[CorpusIndexStore] = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_corpus_store(dim: int) -> CorpusIndexStore:
+    global _STORE
+    if _STORE is None:
+        with _STORE_LOCK:
+            if _STORE is None:
+                _STORE = CorpusIndexStore(CORPUS_INDEX_DIR, dim=dim, kind=CORPUS_INDEX_TYPE)
+    return _STORE
@@ -0,0 +1,307 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from tools.logger import logger
+
+DATA_DIR = os.getenv("DATA_DIR", "/tmp/data")
+
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE_ENABLED", "1") not in {"0", "false", "False", ""}
+EMBED_CACHE_DIR = os.getenv("EMBED_CACHE_DIR", os.path.join(DATA_DIR, "embed_cache"))
+EMBED_CACHE_MAX_MB = float(os.getenv("EMBED_CACHE_MAX_MB", "512"))
+
+# Vector file grows in steps of this many slots
+_GROW_SLOTS = 4096
+
+# When full, free at least this share of slots in one go (LRU)
+_EVICT_FRACTION = 0.05
+
+_WS = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Whitespace-insensitive: the tokenizer ignores runs of spaces/newlines anyway,
+    so re-flowed copies of the same boilerplate share one entry.
+    """
+    return _WS.sub(" ", text).strip()
+
+
+def embedding_key(model_id: str, text: str) -> str:
+    h = hashlib.sha256()
+    h.update(model_id.encode("utf-8"))
+    h.update(b"\0")
+    h.update(normalize_text(text).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _digest(vec: np.ndarray) -> str:
+    return hashlib.blake2b(vec.tobytes(), digest_size=8).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Node-wide embedding cache for one (model, dim).
+
+    - vectors: flat float32 file of fixed-size slots (<name>.f32), read via memmap
+    - index:   SQLite (WAL) mapping key -> slot, with a digest of the vector bytes
+               and last_access for LRU eviction; shared by all uvicorn workers
+
+    Slots freed by eviction are reused. A reader that races with a slot being
+    overwritten sees a digest mismatch and treats the entry as a miss.
+    """
+
+    def __init__(self, directory: str, model_id: str, dim: int, max_bytes: int):
+        self.model_id = model_id
+        self.dim = dim
+        self.slot_bytes = dim * 4
+        self.max_slots = max(1, int(max_bytes // self.slot_bytes))
+
+        safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_id)
+        os.makedirs(directory, exist_ok=True)
+        self.db_path = os.path.join(directory, f"{safe}-{dim}.sqlite3")
+        self.vec_path = os.path.join(directory, f"{safe}-{dim}.f32")
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._map: Optional[np.memmap] = None
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "digest_mismatches": 0, "errors": 0}
+
+        self._init_schema()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        conn = self._conn()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                slot INTEGER NOT NULL UNIQUE,
+                digest TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access)")
+        conn.execute("CREATE TABLE IF NOT EXISTS free_slots (slot INTEGER PRIMARY KEY)")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v INTEGER NOT NULL)")
+        conn.execute("INSERT OR IGNORE INTO meta (k, v) VALUES ('next_slot', 0)")
+
+        if not os.path.exists(self.vec_path):
+            open(self.vec_path, "ab").close()
+
+    def _bump(self, name: str, n: int = 1):
+        with self._lock:
+            self._stats[name] += n
+
+    def _vectors(self, need_slots: int) -> Optional[np.memmap]:
+        """
+        Read-only view of the vector file; remapped when another worker grew it.
+        """
+        with self._lock:
+            if self._map is None or self._map.shape[0] < need_slots:
+                n = os.path.getsize(self.vec_path) // self.slot_bytes
+                if n == 0:
+                    return None
+                self._map = np.memmap(self.vec_path, dtype="float32", mode="r", shape=(n, self.dim))
+            return self._map
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        out: List[Optional[np.ndarray]] = [None] * len(texts)
+        if not texts:
+            return out
+
+        keys = [embedding_key(self.model_id, t) for t in texts]
+        try:
+            conn = self._conn()
+            rows: Dict[str, tuple] = {}
+            uniq = list(dict.fromkeys(keys))
+            for i in range(0, len(uniq), 500):
+                chunk = uniq[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                for key, slot, digest in conn.execute(
+                    f"SELECT key, slot, digest FROM entries WHERE key IN ({marks})", chunk
+                ):
+                    rows[key] = (slot, digest)
+
+            vectors = self._vectors(max((s for s, _ in rows.values()), default=-1) + 1) if rows else None
+
+            hit_keys = set()
+            for i, key in enumerate(keys):
+                row = rows.get(key)
+                if row is None or vectors is None or row[0] >= vectors.shape[0]:
+                    continue
+                vec = np.array(vectors[row[0]], dtype="float32")
+                if _digest(vec) != row[1]:
+                    self._bump("digest_mismatches")
+                    continue
+                out[i] = vec
+                hit_keys.add(key)
+
+            if hit_keys:
+                now = time.time()
+                conn.executemany("UPDATE entries SET last_access = ? WHERE key = ?", [(now, k) for k in hit_keys])
+
+        except (sqlite3.Error, OSError, ValueError) as e:
+            logger.warning(f"[EMBED CACHE] get failed: {e}")
+            self._bump("errors")
+            return [None] * len(texts)
+
+        hits = sum(1 for v in out if v is not None)
+        self._bump("hits", hits)
+        self._bump("misses", len(texts) - hits)
+        return out
+
+    def _evict_locked(self, conn: sqlite3.Connection, need: int):
+        n = max(need, int(self.max_slots * _EVICT_FRACTION), 1)
+        victims = conn.execute(
+            "SELECT key, slot FROM entries ORDER BY last_access ASC LIMIT ?", (n,)
+        ).fetchall()
+        conn.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k, _ in victims])
+        conn.executemany("INSERT OR IGNORE INTO free_slots (slot) VALUES (?)", [(s,) for _, s in victims])
+        self._bump("evictions", len(victims))
+        logger.info(f"[EMBED CACHE] evicted {len(victims)} vectors")
+
+    def put_many(self, texts: Sequence[str], vectors: np.ndarray):
+        if not len(texts):
+            return
+
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        pending: Dict[str, np.ndarray] = {}
+        for t, v in zip(texts, vectors):
+            pending.setdefault(embedding_key(self.model_id, t), v)
+
+        now = time.time()
+        try:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                keys = list(pending)
+                existing = set()
+                for i in range(0, len(keys), 500):
+                    chunk = keys[i:i + 500]
+                    marks = ",".join("?" * len(chunk))
+                    existing.update(
+                        k for (k,) in conn.execute(f"SELECT key FROM entries WHERE key IN ({marks})", chunk)
+                    )
+                new_keys = [k for k in keys if k not in existing][:self.max_slots]
+
+                next_slot = conn.execute("SELECT v FROM meta WHERE k = 'next_slot'").fetchone()[0]
+                free = [s for (s,) in conn.execute("SELECT slot FROM free_slots LIMIT ?", (len(new_keys),))]
+                fresh = min(len(new_keys) - len(free), self.max_slots - next_slot)
+                if len(free) + max(fresh, 0) < len(new_keys):
+                    self._evict_locked(conn, len(new_keys) - len(free) - max(fresh, 0))
+                    free = [s for (s,) in conn.execute("SELECT slot FROM free_slots LIMIT ?", (len(new_keys),))]
+                    fresh = min(len(new_keys) - len(free), self.max_slots - next_slot)
+
+                slots = free + list(range(next_slot, next_slot + max(fresh, 0)))
+                new_keys = new_keys[:len(slots)]
+                slots = slots[:len(new_keys)]
+
+                used_free = [s for s in slots if s < next_slot]
+                conn.executemany("DELETE FROM free_slots WHERE slot = ?", [(s,) for s in used_free])
+                next_slot = max([next_slot] + [s + 1 for s in slots])
+                conn.execute("UPDATE meta SET v = ? WHERE k = 'next_slot'", (next_slot,))
+
+                conn.executemany(
+                    "INSERT INTO entries (key, slot, digest, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                    [(k, s, _digest(pending[k]), now, now) for k, s in zip(new_keys, slots)],
+                )
+
+                # grow the file while still holding the write lock
+                have = os.path.getsize(self.vec_path) // self.slot_bytes
+                if next_slot > have:
+                    want = min(self.max_slots, -(-next_slot // _GROW_SLOTS) * _GROW_SLOTS)
+                    with open(self.vec_path, "r+b") as f:
+                        f.truncate(want * self.slot_bytes)
+
+                with open(self.vec_path, "r+b") as f:
+                    for k, s in zip(new_keys, slots):
+                        f.seek(s * self.slot_bytes)
+                        f.write(pending[k].tobytes())
+
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+            self._bump("writes", len(new_keys))
+
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"[EMBED CACHE] put failed: {e}")
+            self._bump("errors")
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            out = dict(self._stats)
+
+        lookups = out["hits"] + out["misses"]
+        out["hit_rate"] = round(out["hits"] / lookups, 3) if lookups else 0.0
+
+        try:
+            out["entries"] = self._conn().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            out["bytes"] = os.path.getsize(self.vec_path)
+        except (sqlite3.Error, OSError):
+            pass
+
+        out["model"] = self.model_id
+        out["max_entries"] = self.max_slots
+        return out
+
+
+_CACHES: Dict[str, EmbeddingCache] = {}
+_CACHES_LOCK = threading.Lock()
+_FAILED = set()
+
+
+def get_embedding_cache(model_id: str, dim: int) -> Optional[EmbeddingCache]:
+    """
+    One cache per (model, dim) per worker process. None when disabled
+    (EMBED_CACHE_ENABLED=0) or when the cache files can't be opened.
+    """
+    if not EMBED_CACHE_ENABLED:
+        return None
+
+    name = f"{model_id}:{dim}"
+    if name in _FAILED:
+        return None
+
+    cache = _CACHES.get(name)
+    if cache is None:
+        with _CACHES_LOCK:
+            cache = _CACHES.get(name)
+            if cache is None and name not in _FAILED:
+                try:
+                    cache = EmbeddingCache(
+                        EMBED_CACHE_DIR,
+                        model_id=model_id,
+                        dim=dim,
+                        max_bytes=int(EMBED_CACHE_MAX_MB * 1024 * 1024),
+                    )
+                    _CACHES[name] = cache
+                except Exception as e:
+                    logger.warning(f"[EMBED CACHE] disabled, could not open {EMBED_CACHE_DIR}: {e}")
+                    _FAILED.add(name)
+                    return None
+    return cache
+
+
+def embedding_cache_stats() -> Dict[str, Dict[str, float]]:
+    with _CACHES_LOCK:
+        caches = list(_CACHES.values())
+    return {c.model_id: c.stats() for c in caches}
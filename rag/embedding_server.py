@@ -0,0 +1,387 @@
+"""
+Node-local embedding server: one model shared by every API worker.
+
+    python -m rag.embedding_server --address /tmp/data/embed.sock --max-batch 64 --max-wait-ms 5
+
+Workers started with EMBED_SERVER=<address> send their (cache-missed) texts
+here instead of loading their own model. Requests arriving from all workers
+within max_wait_ms are merged into one encode call of up to max_batch texts.
+
+Address: a Unix socket path ("/path/embed.sock" or "unix:/path") or "host:port".
+
+Wire format: every message is a 4-byte big-endian length + payload.
+Request: JSON {"op": "encode" | "info" | "stats", "texts": [...]}.
+Response: JSON header; for "encode" it is followed by one frame of raw
+float32 (n, dim) little-endian vectors.
+"""
+import os
+import sys
+import json
+import time
+import queue
+import signal
+import socket
+import struct
+import argparse
+import threading
+import socketserver
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from tools.logger import logger
+
+DATA_DIR = os.getenv("DATA_DIR", "/tmp/data")
+
+EMBED_SERVER_ADDRESS = os.getenv("EMBED_SERVER_ADDRESS", os.path.join(DATA_DIR, "embed.sock"))
+EMBED_SERVER_MAX_BATCH = int(os.getenv("EMBED_SERVER_MAX_BATCH", "64"))
+EMBED_SERVER_MAX_WAIT_MS = float(os.getenv("EMBED_SERVER_MAX_WAIT_MS", "5"))
+EMBED_SERVER_TIMEOUT = float(os.getenv("EMBED_SERVER_TIMEOUT", "60"))
+
+_LEN = struct.Struct(">I")
+_MAX_FRAME = 256 * 1024 * 1024
+
+
+class EmbeddingServerUnavailable(ConnectionError):
+    pass
+
+
+def parse_address(address: str) -> Tuple[int, Any]:
+    """
+    -> (socket family, address) for socket.connect / bind.
+    """
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:"):]
+    if "/" in address:
+        return socket.AF_UNIX, address
+    host, _, port = address.rpartition(":")
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray(n)
+    view = memoryview(buf)
+    got = 0
+    while got < n:
+        r = sock.recv_into(view[got:], n - got)
+        if r == 0:
+            raise ConnectionError("connection closed")
+        got += r
+    return bytes(buf)
+
+
+def recv_frame(sock: socket.socket) -> bytes:
+    (n,) = _LEN.unpack(_recv_exact(sock, _LEN.size))
+    if n > _MAX_FRAME:
+        raise ValueError(f"frame too large: {n}")
+    return _recv_exact(sock, n)
+
+
+def send_frames(sock: socket.socket, *payloads: bytes):
+    sock.sendall(b"".join(_LEN.pack(len(p)) + p for p in payloads))
+
+
+# =========================
+# Server
+# =========================
+
+class _Pending:
+    __slots__ = ("texts", "done", "result", "error")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.done = threading.Event()
+        self.result: Optional[np.ndarray] = None
+        self.error: Optional[BaseException] = None
+
+
+class DynamicBatcher:
+    """
+    Single model thread. Takes the first waiting request, then keeps collecting
+    until max_batch texts or max_wait_ms have passed, and runs one encode.
+    A request larger than max_batch is encoded on its own.
+    """
+
+    def __init__(self, model, max_batch: int, max_wait_ms: float):
+        self.model = model
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue: "queue.Queue[_Pending]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "texts": 0, "batches": 0, "encode_ms": 0.0, "max_batch_seen": 0}
+
+        self._thread = threading.Thread(target=self._loop, name="embed-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, texts: List[str]) -> np.ndarray:
+        p = _Pending(texts)
+        self._queue.put(p)
+        p.done.wait()
+        if p.error is not None:
+            raise p.error
+        return p.result
+
+    def _collect(self, carry: Optional[_Pending]) -> Tuple[List[_Pending], Optional[_Pending]]:
+        first = carry if carry is not None else self._queue.get()
+        batch, size = [first], len(first.texts)
+
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                p = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if size + len(p.texts) > self.max_batch:
+                return batch, p  # starts the next batch
+            batch.append(p)
+            size += len(p.texts)
+        return batch, None
+
+    def _loop(self):
+        carry = None
+        while True:
+            batch, carry = self._collect(carry)
+            texts = [t for p in batch for t in p.texts]
+
+            t0 = time.perf_counter()
+            try:
+                vectors = np.asarray(
+                    self.model.encode(texts, batch_size=self.max_batch, show_progress_bar=False),
+                    dtype="<f4",
+                )
+            except Exception as e:
+                logger.warning(f"[EMBED SERVER] encode failed for {len(texts)} texts: {e}")
+                for p in batch:
+                    p.error = e
+                    p.done.set()
+                continue
+            encode_ms = (time.perf_counter() - t0) * 1000
+
+            start = 0
+            for p in batch:
+                p.result = vectors[start:start + len(p.texts)]
+                start += len(p.texts)
+                p.done.set()
+
+            with self._lock:
+                self._stats["requests"] += len(batch)
+                self._stats["texts"] += len(texts)
+                self._stats["batches"] += 1
+                self._stats["encode_ms"] += encode_ms
+                self._stats["max_batch_seen"] = max(self._stats["max_batch_seen"], len(texts))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._stats)
+        out["encode_ms"] = round(out["encode_ms"], 1)
+        out["avg_batch"] = round(out["texts"] / out["batches"], 2) if out["batches"] else 0.0
+        out["queued"] = self._queue.qsize()
+        out["max_batch"] = self.max_batch
+        out["max_wait_ms"] = self.max_wait * 1000
+        return out
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server = self.server
+        sock = self.request
+        while True:
+            try:
+                req = json.loads(recv_frame(sock))
+            except (ConnectionError, OSError):
+                return
+            except ValueError as e:
+                send_frames(sock, json.dumps({"error": str(e)}).encode("utf-8"))
+                return
+
+            op = req.get("op", "encode")
+            try:
+                if op == "encode":
+                    texts = [str(t) for t in req.get("texts") or []]
+                    vectors = server.batcher.submit(texts) if texts else np.zeros((0, server.dim), "<f4")
+                    header = {"n": int(vectors.shape[0]), "dim": int(vectors.shape[1])}
+                    send_frames(sock, json.dumps(header).encode("utf-8"), vectors.tobytes())
+                elif op == "info":
+                    send_frames(sock, json.dumps({"model_id": server.model_id, "dim": server.dim}).encode("utf-8"))
+                elif op == "stats":
+                    send_frames(sock, json.dumps(server.batcher.stats()).encode("utf-8"))
+                else:
+                    send_frames(sock, json.dumps({"error": f"unknown op: {op}"}).encode("utf-8"))
+            except (ConnectionError, OSError):
+                return
+            except Exception as e:
+                try:
+                    send_frames(sock, json.dumps({"error": f"{type(e).__name__}: {e}"}).encode("utf-8"))
+                except OSError:
+                    return
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 128  # every worker thread may connect at once
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+
+def _remove_stale_socket(path: str):
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)  # left over from a crashed server
+        return
+    finally:
+        probe.close()
+    raise RuntimeError(f"Embedding server already listening on {path}")
+
+
+def make_server(model, model_id: str, address: str, max_batch: int, max_wait_ms: float):
+    family, addr = parse_address(address)
+    if family == socket.AF_UNIX:
+        os.makedirs(os.path.dirname(addr) or ".", exist_ok=True)
+        _remove_stale_socket(addr)
+        server = _UnixServer(addr, _Handler)
+    else:
+        server = _TCPServer(addr, _Handler)
+
+    server.batcher = DynamicBatcher(model, max_batch, max_wait_ms)
+    server.model_id = model_id
+    server.dim = int(model.get_sentence_embedding_dimension())
+    return server
+
+
+# =========================
+# Client
+# =========================
+
+class EmbeddingClient:
+    """
+    SentenceTransformer-style encode() backed by the embedding server.
+    One persistent connection per calling thread; a broken connection is
+    re-opened once before EmbeddingServerUnavailable is raised.
+    """
+
+    def __init__(self, address: str, timeout: float = EMBED_SERVER_TIMEOUT):
+        self.address = address
+        self.timeout = timeout
+        self._family, self._addr = parse_address(address)
+        self._local = threading.local()
+        self._info: Optional[Dict[str, Any]] = None
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(self._family, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self._addr)
+        except OSError as e:
+            sock.close()
+            raise EmbeddingServerUnavailable(f"embedding server {self.address}: {e}") from e
+        if self._family == socket.AF_INET:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, "sock", None)
+        self._local.sock = None
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    def _request(self, req: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[bytes]]:
+        payload = json.dumps(req).encode("utf-8")
+        for attempt in (0, 1):
+            sock = getattr(self._local, "sock", None)
+            if sock is None:
+                sock = self._local.sock = self._connect()
+            try:
+                send_frames(sock, payload)
+                header = json.loads(recv_frame(sock))
+                body = recv_frame(sock) if req.get("op") == "encode" and "error" not in header else None
+                break
+            except (ConnectionError, OSError) as e:
+                self._close()
+                if attempt:
+                    raise EmbeddingServerUnavailable(f"embedding server {self.address}: {e}") from e
+
+        if "error" in header:
+            raise RuntimeError(f"embedding server: {header['error']}")
+        return header, body
+
+    def info(self) -> Dict[str, Any]:
+        if self._info is None:
+            self._info, _ = self._request({"op": "info"})
+        return self._info
+
+    def stats(self) -> Dict[str, Any]:
+        return self._request({"op": "stats"})[0]
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return int(self.info()["dim"])
+
+    def encode(self, sentences, batch_size: int = 32, show_progress_bar: bool = False, **kwargs) -> np.ndarray:
+        texts = [sentences] if isinstance(sentences, str) else list(sentences)
+        header, body = self._request({"op": "encode", "texts": texts})
+        return np.frombuffer(body, dtype="<f4").reshape(header["n"], header["dim"]).astype("float32", copy=False)
+
+
+_CLIENT: Optional[EmbeddingClient] = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def get_embedding_client(address: str) -> EmbeddingClient:
+    global _CLIENT
+    if _CLIENT is None:
+        with _CLIENT_LOCK:
+            if _CLIENT is None:
+                _CLIENT = EmbeddingClient(address)
+    return _CLIENT
+
+
+def embedding_server_stats() -> Optional[Dict[str, Any]]:
+    """
+    Batcher counters of the shared server (node-wide), None if this worker doesn't use one.
+    """
+    if _CLIENT is None:
+        return None
+    try:
+        return _CLIENT.stats()
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the embedding model to all workers on this node.")
+    parser.add_argument("--address", default=EMBED_SERVER_ADDRESS)
+    parser.add_argument("--max-batch", type=int, default=EMBED_SERVER_MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=EMBED_SERVER_MAX_WAIT_MS)
+    args = parser.parse_args()
+
+    from rag.vector_store import EMBED_MODEL_ID, load_local_model
+
+    server = make_server(load_local_model(), EMBED_MODEL_ID, args.address, args.max_batch, args.max_wait_ms)
+    logger.info(
+        f"[EMBED SERVER] {EMBED_MODEL_ID} on {args.address} "
+        f"(max_batch={args.max_batch}, max_wait_ms={args.max_wait_ms})"
+    )
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))  # run the cleanup below
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        family, addr = parse_address(args.address)
+        if family == socket.AF_UNIX and os.path.exists(addr):
+            os.unlink(addr)
+
+
+if __name__ == "__main__":
+    main()
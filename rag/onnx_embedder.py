@@ -0,0 +1,219 @@
+"""
+ONNX Runtime embedding backend (int8 dynamic quantization) for CPU workers.
+
+Runs the same sentence-transformers model without torch at serving time:
+tokenizers (Rust) -> ONNX encoder -> mean pooling -> L2 normalize.
+
+One-time export (needs torch + sentence-transformers, e.g. on a build box):
+
+    python -m rag.onnx_embedder --model all-MiniLM-L6-v2 --out /tmp/data/models/all-MiniLM-L6-v2-onnx-int8
+
+Then run the API with EMBED_BACKEND=onnx (and EMBED_ONNX_DIR if not default).
+Check parity/throughput with benchmarks/bench_embeddings.py.
+"""
+import os
+import json
+import inspect
+import argparse
+import threading
+from typing import List, Optional
+
+import numpy as np
+
+ONNX_MODEL_FILE = "model.int8.onnx"
+ONNX_FP32_FILE = "model.fp32.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+CONFIG_FILE = "embedder.json"
+
+
+def onnx_variant(model_dir: str) -> str:
+    """
+    "int8" | "fp32": which export model_dir serves (read from its embedder.json;
+    "int8", the export default, when the config can't be read).
+    """
+    try:
+        with open(os.path.join(model_dir, CONFIG_FILE), "r", encoding="utf-8") as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        return "int8"
+    onnx_file = config.get("onnx_file", ONNX_MODEL_FILE)
+    return "int8" if config.get("quantized", onnx_file == ONNX_MODEL_FILE) else "fp32"
+
+
+class OnnxEmbedder:
+    """
+    Drop-in for SentenceTransformer.encode() as used by rag.vector_store.
+    """
+
+    def __init__(self, model_dir: str, threads: int = 0):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(model_dir, CONFIG_FILE), "r", encoding="utf-8") as f:
+            self.config = json.load(f)
+
+        self.model_dir = model_dir
+        self.max_seq_length = int(self.config.get("max_seq_length", 256))
+        self.normalize = bool(self.config.get("normalize", True))
+        self.dim = int(self.config["dim"])
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=self.max_seq_length)
+        self.tokenizer.no_padding()  # padded per batch below
+        self.pad_id = int(self.config.get("pad_token_id", 0))
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            opts.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, self.config.get("onnx_file", ONNX_MODEL_FILE)),
+            sess_options=opts,
+            providers=["CPUExecutionProvider"],
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def _run(self, texts: List[str]) -> np.ndarray:
+        encs = self.tokenizer.encode_batch(texts)
+        max_len = max(1, max(len(e.ids) for e in encs))
+
+        input_ids = np.full((len(encs), max_len), self.pad_id, dtype=np.int64)
+        attention = np.zeros((len(encs), max_len), dtype=np.int64)
+        type_ids = np.zeros((len(encs), max_len), dtype=np.int64)
+        for i, e in enumerate(encs):
+            n = len(e.ids)
+            input_ids[i, :n] = e.ids
+            attention[i, :n] = 1
+            type_ids[i, :n] = e.type_ids
+
+        feeds = {"input_ids": input_ids, "attention_mask": attention}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = type_ids
+
+        hidden = self.session.run(None, feeds)[0]  # (batch, seq, dim)
+
+        mask = attention[:, :, None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype(np.float32)
+
+    def encode(self, sentences, batch_size: int = 32, show_progress_bar: bool = False, **kwargs) -> np.ndarray:
+        texts = [sentences] if isinstance(sentences, str) else list(sentences)
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+
+        # length-sorted batches waste less compute on padding
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            out[idx] = self._run([texts[i] for i in idx])
+        return out
+
+
+def export_onnx(model_name: str, out_dir: str, quantize: bool = True, opset: int = 17) -> str:
+    """
+    Export a sentence-transformers model (Transformer + mean Pooling [+ Normalize])
+    to ONNX and apply int8 dynamic quantization. Returns the output directory.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer, models
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    st = SentenceTransformer(model_name, device="cpu")
+    transformer = st[0]
+    pooling = next((m for m in st if isinstance(m, models.Pooling)), None)
+    if pooling is not None and hasattr(pooling, "get_pooling_mode_str"):
+        pooling_mode = pooling.get_pooling_mode_str()
+    else:  # newer sentence-transformers
+        pooling_mode = getattr(pooling, "pooling_mode", None)
+    if pooling_mode != "mean":
+        raise ValueError("Only mean-pooling sentence-transformers models are supported")
+    normalize = any(isinstance(m, models.Normalize) for m in st)
+
+    os.makedirs(out_dir, exist_ok=True)
+    tokenizer = st.tokenizer
+    tokenizer.save_pretrained(out_dir)  # writes tokenizer.json for fast tokenizers
+    if not os.path.exists(os.path.join(out_dir, TOKENIZER_FILE)):
+        raise ValueError("Model has no fast tokenizer (tokenizer.json); cannot export")
+
+    hf_model = transformer.auto_model.eval()
+    sample = tokenizer(["export sample sentence"], return_tensors="pt")
+    input_names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in sample]
+    dynamic = {n: {0: "batch", 1: "seq"} for n in input_names}
+    dynamic["last_hidden_state"] = {0: "batch", 1: "seq"}
+
+    class _Encoder(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            return self.model(**dict(zip(input_names, inputs))).last_hidden_state
+
+    fp32_path = os.path.join(out_dir, ONNX_FP32_FILE)
+    kwargs = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        kwargs["dynamo"] = False  # TorchScript exporter: stable dynamic axes
+    with torch.no_grad():
+        torch.onnx.export(
+            _Encoder(hf_model),
+            tuple(sample[n] for n in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic,
+            opset_version=opset,
+            **kwargs,
+        )
+
+    onnx_file = ONNX_FP32_FILE
+    if quantize:
+        quantize_dynamic(fp32_path, os.path.join(out_dir, ONNX_MODEL_FILE), weight_type=QuantType.QInt8)
+        onnx_file = ONNX_MODEL_FILE
+
+    config = {
+        "model": model_name,
+        "dim": st.get_sentence_embedding_dimension(),
+        "max_seq_length": int(st.max_seq_length or 256),
+        "normalize": normalize,
+        "pad_token_id": int(tokenizer.pad_token_id or 0),
+        "onnx_file": onnx_file,
+        "quantized": quantize,
+    }
+    with open(os.path.join(out_dir, CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+    return out_dir
+
+
+_EMBEDDER: Optional[OnnxEmbedder] = None
+_EMBEDDER_LOCK = threading.Lock()
+
+
+def get_onnx_embedder(model_dir: str, threads: int = 0) -> OnnxEmbedder:
+    global _EMBEDDER
+    if _EMBEDDER is None:
+        with _EMBEDDER_LOCK:
+            if _EMBEDDER is None:
+                _EMBEDDER = OnnxEmbedder(model_dir, threads=threads)
+    return _EMBEDDER
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a sentence-transformers model to quantized ONNX.")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--no-quantize", action="store_true")
+    parser.add_argument("--opset", type=int, default=17)
+    args = parser.parse_args()
+
+    out = export_onnx(args.model, args.out, quantize=not args.no_quantize, opset=args.opset)
+    print(f"exported to {out}")
+
+
+if __name__ == "__main__":
+    main()
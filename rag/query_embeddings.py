@@ -0,0 +1,127 @@
+import os
+import re
+import threading
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from tools.logger import logger
+
+DATA_DIR = os.getenv("DATA_DIR", "/tmp/data")
+
+STATIC_QUERY_EMBED_DIR = os.getenv("STATIC_QUERY_EMBED_DIR", os.path.join(DATA_DIR, "query_embeddings"))
+
+
+class StaticQueryEmbeddings:
+    """
+    In-memory vectors for the fixed retrieval queries used by the tools
+    (risk templates, key topics, section queries, ...).
+
+    Persisted as one .npz per (model, dim), so they are encoded once per model
+    version and simply loaded by every worker afterwards. Lookups are exact
+    string matches and never touch the model.
+    """
+
+    def __init__(self, directory: str, model_id: str, dim: int):
+        self.model_id = model_id
+        self.dim = dim
+
+        safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_id)
+        self.path = os.path.join(directory, f"{safe}-{dim}.npz")
+
+        self._lock = threading.Lock()
+        self._vectors: Dict[str, np.ndarray] = {}
+        self._loaded = False
+        self._stats = {"hits": 0}
+
+    def load(self) -> int:
+        """
+        Read the persisted file (if any). Returns the number of queries loaded.
+        """
+        with self._lock:
+            self._loaded = True
+            if not os.path.exists(self.path):
+                return 0
+            try:
+                with np.load(self.path, allow_pickle=False) as data:
+                    if str(data["model"]) != self.model_id or data["vectors"].shape[1] != self.dim:
+                        logger.warning(f"[STATIC QUERIES] ignoring {self.path}: model/dim mismatch")
+                        return 0
+                    texts = [str(t) for t in data["texts"]]
+                    vectors = np.asarray(data["vectors"], dtype="float32")
+            except Exception as e:
+                logger.warning(f"[STATIC QUERIES] could not read {self.path}: {e}")
+                return 0
+
+            self._vectors.update(zip(texts, vectors))
+            return len(texts)
+
+    def save(self):
+        with self._lock:
+            texts = list(self._vectors)
+            vectors = np.vstack([self._vectors[t] for t in texts]) if texts else np.zeros((0, self.dim), "float32")
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+        np.savez(tmp, model=np.array(self.model_id), texts=np.array(texts), vectors=vectors.astype("float32"))
+        os.replace(tmp, self.path)
+
+    def ensure(self, queries: Sequence[str], encode: Callable[[List[str]], np.ndarray]) -> int:
+        """
+        Load from disk, encode whatever is missing in one batch, persist.
+        Returns the number of queries that had to be encoded.
+        """
+        if not self._loaded:
+            self.load()
+
+        with self._lock:
+            missing = [q for q in dict.fromkeys(queries) if q not in self._vectors]
+        if not missing:
+            return 0
+
+        vectors = np.asarray(encode(missing), dtype="float32")
+        with self._lock:
+            self._vectors.update(zip(missing, vectors))
+        self.save()
+        return len(missing)
+
+    def lookup(self, texts: Sequence[str]) -> Optional[np.ndarray]:
+        """
+        (len(texts), dim) matrix if every text is a known static query, else None.
+        """
+        if not self._loaded:
+            self.load()
+
+        vectors = self._vectors
+        if not texts or not all(t in vectors for t in texts):
+            return None
+
+        with self._lock:
+            self._stats["hits"] += 1
+        return np.vstack([vectors[t] for t in texts])
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            out = dict(self._stats)
+            out["queries"] = len(self._vectors)
+        return out
+
+
+_STORES: Dict[str, StaticQueryEmbeddings] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def get_static_queries(model_id: str, dim: int) -> StaticQueryEmbeddings:
+    name = f"{model_id}:{dim}"
+    with _STORES_LOCK:
+        store = _STORES.get(name)
+        if store is None:
+            store = StaticQueryEmbeddings(STATIC_QUERY_EMBED_DIR, model_id, dim)
+            _STORES[name] = store
+        return store
+
+
+def static_query_stats() -> Dict[str, Dict[str, int]]:
+    with _STORES_LOCK:
+        stores = list(_STORES.values())
+    return {s.model_id: s.stats() for s in stores}
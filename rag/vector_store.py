@@ -1,32 +1,337 @@
 import os
 import json
-from typing import List, Tuple, Optional
+import struct
+import shutil
+import hashlib
+from typing import Dict, List, Tuple, Optional
 
 import faiss
 import numpy as np
 
+from tools.logger import logger
+from tools.confidence import distances_to_confidence
+from tools.single_flight import get_group
+from rag.embedding_server import EmbeddingServerUnavailable, get_embedding_client
+from rag.embedding_cache import get_embedding_cache, normalize_text
+from rag.query_embeddings import get_static_queries
+from rag.bm25 import BM25Index, reciprocal_rank_fusion
+
 os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
 
+EMBED_MODEL_NAME = "all-MiniLM-L6-v2"
+EMBED_DIM = 384
+
+# "torch" (SentenceTransformer, default) | "onnx" (int8 ONNX Runtime, see rag/onnx_embedder.py)
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch").strip().lower()
+EMBED_ONNX_DIR = os.getenv(
+    "EMBED_ONNX_DIR", os.path.join(os.getenv("DATA_DIR", "/tmp/data"), "models", f"{EMBED_MODEL_NAME}-onnx-int8")
+)
+EMBED_ONNX_THREADS = int(os.getenv("EMBED_ONNX_THREADS", "0"))  # 0 = onnxruntime default
+
+# Identifies the vectors (model + backend + ONNX export) for the embedding cache
+# and static query store: int8 vectors are close to, but not bit-identical with,
+# fp32 / torch ones.
+if EMBED_BACKEND == "torch":
+    EMBED_MODEL_ID = EMBED_MODEL_NAME
+elif EMBED_BACKEND == "onnx":
+    from rag.onnx_embedder import onnx_variant
+
+    EMBED_MODEL_ID = f"{EMBED_MODEL_NAME}+onnx-{onnx_variant(EMBED_ONNX_DIR)}"
+else:
+    EMBED_MODEL_ID = f"{EMBED_MODEL_NAME}+{EMBED_BACKEND}"
+
+# Address of a node-local embedding server (rag/embedding_server.py); when set,
+# workers send texts there instead of loading their own model.
+EMBED_SERVER = os.getenv("EMBED_SERVER", "").strip()
+# Encode in-process if the server is down (costs a model load per worker)
+EMBED_SERVER_FALLBACK = os.getenv("EMBED_SERVER_FALLBACK", "1") not in {"0", "false", "False", ""}
+
 _MODEL: Optional[object] = None
+_REMOTE_CHECKED = False
 
+# Identical encode batches in flight at the same time share one forward pass
+_FLIGHT = get_group("embeddings")
 
-def get_model():
+
+def load_local_model():
     """
-    Singleton: load SentenceTransformer only once per worker process.
+    Singleton: load the embedding backend only once per process.
+    Both backends expose SentenceTransformer-style encode().
     """
     global _MODEL
     if _MODEL is None:
-        from sentence_transformers import SentenceTransformer
-        _MODEL = SentenceTransformer("all-MiniLM-L6-v2")
+        if EMBED_BACKEND == "onnx":
+            from rag.onnx_embedder import get_onnx_embedder
+            _MODEL = get_onnx_embedder(EMBED_ONNX_DIR, threads=EMBED_ONNX_THREADS)
+        elif EMBED_BACKEND == "torch":
+            from sentence_transformers import SentenceTransformer
+            _MODEL = SentenceTransformer(EMBED_MODEL_NAME)
+        else:
+            raise ValueError(f"Unknown EMBED_BACKEND: {EMBED_BACKEND}")
     return _MODEL
 
 
+def get_model():
+    """
+    The embedding server client when EMBED_SERVER is set, else the local model.
+    """
+    global _REMOTE_CHECKED
+    if not EMBED_SERVER:
+        return load_local_model()
+
+    client = get_embedding_client(EMBED_SERVER)
+    if not _REMOTE_CHECKED:
+        # cached vectors are keyed by EMBED_MODEL_ID: the server must produce the same ones
+        served = client.info().get("model_id")
+        if served != EMBED_MODEL_ID:
+            raise ValueError(f"Embedding server serves {served!r}, this worker expects {EMBED_MODEL_ID!r}")
+        _REMOTE_CHECKED = True
+    return client
+
+
+def _encode(texts: List[str], batch_size: int) -> np.ndarray:
+    try:
+        model = get_model()
+        embeddings = model.encode(list(texts), batch_size=batch_size, show_progress_bar=False)
+    except EmbeddingServerUnavailable as e:
+        if not EMBED_SERVER_FALLBACK:
+            raise
+        logger.warning(f"[EMBEDDINGS] {e}; encoding {len(texts)} texts in-process")
+        embeddings = load_local_model().encode(list(texts), batch_size=batch_size, show_progress_bar=False)
+    return np.asarray(embeddings, dtype="float32")
+
+
+def encode_texts(texts: List[str], batch_size: int = 16) -> np.ndarray:
+    """
+    Encode texts -> float32 matrix (len(texts), dim).
+
+    Static tool queries are served from precomputed vectors. Otherwise vectors
+    come from the node-wide embedding cache where possible; only
+    misses (deduplicated) go through the model. Concurrent calls with the
+    exact same texts are coalesced into one lookup/encode.
+    """
+    if not texts:
+        return np.zeros((0, EMBED_DIM), dtype="float32")
+
+    # fixed tool queries: precomputed, no model / cache round trip
+    static = get_static_queries(EMBED_MODEL_ID, EMBED_DIM).lookup(texts)
+    if static is not None:
+        return static
+
+    h = hashlib.sha256(EMBED_MODEL_ID.encode("utf-8"))
+    for t in texts:
+        h.update(b"\0")
+        h.update(t.encode("utf-8"))
+
+    def run() -> np.ndarray:
+        cache = get_embedding_cache(EMBED_MODEL_ID, EMBED_DIM)
+        if cache is None:
+            return _encode(texts, batch_size)
+
+        cached = cache.get_many(texts)
+        missing: Dict[str, str] = {}
+        for t, v in zip(texts, cached):
+            if v is None:
+                missing.setdefault(normalize_text(t), t)
+        if not missing:
+            return np.vstack(cached).astype("float32", copy=False)
+
+        to_encode = list(missing.values())
+        encoded = _encode(to_encode, batch_size)
+        cache.put_many(to_encode, encoded)
+        fresh = dict(zip(missing.keys(), encoded))
+
+        return np.vstack(
+            [v if v is not None else fresh[normalize_text(t)] for t, v in zip(texts, cached)]
+        ).astype("float32", copy=False)
+
+    return _FLIGHT.do(h.hexdigest(), run)
+
+
+# Sidecar next to the .faiss file: ids + UTF-8 text arena (see _write_meta)
+META_MAGIC = b"CAVSMETA"
+META_VERSION = 1
+_META_HEADER = struct.Struct("<8sIIQ")  # magic, version, count, arena bytes  (24 bytes)
+_META_HEADER_SIZE = 32                  # padded so the int64 arrays are 8-byte aligned
+
+# Map vectors read-only instead of reading them into memory; pages are shared
+# by every worker that has the same contract open.
+VECTOR_INDEX_MMAP = os.getenv("VECTOR_INDEX_MMAP", "1") not in {"0", "false", "False", ""}
+
+
+class _TextArena:
+    """
+    Read-only list-like view over an offset-indexed UTF-8 arena.
+    Texts are decoded on access, so opening an index costs nothing per clause.
+    """
+
+    def __init__(self, offsets: np.ndarray, arena: np.ndarray):
+        self._offsets = offsets
+        self._arena = arena
+
+    def __len__(self) -> int:
+        return max(0, len(self._offsets) - 1)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return bytes(self._arena[start:end]).decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def _write_meta(path: str, ids: List[int], texts: List[str]):
+    """
+    Layout (little-endian):
+      header   magic "CAVSMETA", u32 version, u32 count, u64 arena bytes, padding to 32
+      ids      int64[count]
+      offsets  uint64[count + 1]   (text i = arena[offsets[i]:offsets[i+1]])
+      arena    UTF-8 bytes
+    """
+    encoded = [t.encode("utf-8") for t in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype="<u8")
+    if encoded:
+        offsets[1:] = np.cumsum([len(b) for b in encoded])
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        header = _META_HEADER.pack(META_MAGIC, META_VERSION, len(encoded), int(offsets[-1]))
+        f.write(header.ljust(_META_HEADER_SIZE, b"\0"))
+        f.write(np.asarray(ids, dtype="<i8").tobytes())
+        f.write(offsets.tobytes())
+        for b in encoded:
+            f.write(b)
+    os.replace(tmp, path)
+
+
+def _read_meta(path: str) -> Tuple[np.ndarray, _TextArena]:
+    with open(path, "rb") as f:
+        magic, version, count, arena_bytes = _META_HEADER.unpack(f.read(_META_HEADER.size))
+    if magic != META_MAGIC:
+        raise ValueError(f"{path}: not a vector store meta file")
+    if version != META_VERSION:
+        raise ValueError(f"{path}: unsupported meta version {version}")
+
+    ids_off = _META_HEADER_SIZE
+    offs_off = ids_off + 8 * count
+    arena_off = offs_off + 8 * (count + 1)
+
+    buf = np.memmap(path, dtype=np.uint8, mode="r")
+    ids = buf[ids_off:offs_off].view("<i8")
+    offsets = buf[offs_off:arena_off].view("<u8")
+    arena = buf[arena_off:arena_off + arena_bytes]
+    return ids, _TextArena(offsets, arena)
+
+
+# Index layout for newly built contracts (loaded indexes keep whatever they were saved with):
+#   "l2"          float32, L2 distance on raw vectors (legacy)
+#   "cosine"      float32, inner product on L2-normalized vectors
+#   "cosine_fp16" same, vectors stored as float16 (1/2 the size)
+#   "cosine_sq8"  same, 8-bit scalar quantized, per-dimension ranges trained on the contract (1/4)
+VECTOR_INDEX_MODE = os.getenv("VECTOR_INDEX_MODE", "l2").strip().lower()
+
+_COSINE_QTYPES = {
+    "cosine": None,
+    "cosine_fp16": "QT_fp16",
+    "cosine_sq8": "QT_8bit",
+}
+
+
+def _new_index(dim: int, mode: str) -> faiss.Index:
+    if mode == "l2":
+        return faiss.IndexFlatL2(dim)
+    if mode not in _COSINE_QTYPES:
+        raise ValueError(f"Unknown VECTOR_INDEX_MODE: {mode}")
+    qtype = _COSINE_QTYPES[mode]
+    if qtype is None:
+        return faiss.IndexFlatIP(dim)
+    return faiss.IndexScalarQuantizer(dim, getattr(faiss.ScalarQuantizer, qtype), faiss.METRIC_INNER_PRODUCT)
+
+
+def _normalized(vectors: np.ndarray) -> np.ndarray:
+    out = np.array(vectors, dtype="float32", copy=True, order="C")
+    faiss.normalize_L2(out)
+    return out
+
+
+# Files that make up a saved index: <index_path> + suffix
+INDEX_FILE_SUFFIXES = ("", ".meta.bin", ".meta.json", ".bm25.npz", ".qdist.npz")
+
+
+def nearest_rows(distances: np.ndarray, k: int) -> np.ndarray:
+    """
+    Column indices of the k smallest entries in each row of a
+    VectorStore.query_distances matrix, nearest first: (queries, min(k, rows)).
+    """
+    k = min(k, distances.shape[1])
+    if k <= 0:
+        return np.zeros((distances.shape[0], 0), dtype="int64")
+    if k < distances.shape[1]:
+        part = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    else:
+        part = np.broadcast_to(np.arange(k), distances.shape).copy()
+    order = np.argsort(np.take_along_axis(distances, part, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1)
+
+
+def link_index(src_path: str, dst_path: str):
+    """
+    Give a saved index a second name without copying: hard links where possible.
+    Safe to share because save() only ever replaces files (tmp + rename), so
+    re-saving one name never changes the other's data.
+    """
+    os.makedirs(os.path.dirname(dst_path) or ".", exist_ok=True)
+    for suffix in INDEX_FILE_SUFFIXES:
+        src = src_path + suffix
+        if not os.path.exists(src):
+            continue
+        dst = dst_path + suffix
+        try:
+            os.link(src, dst)
+        except OSError:
+            # different filesystem / no hard link support
+            shutil.copyfile(src, dst)
+
+
 class VectorStore:
-    def __init__(self, dim: int = 384):
+    def __init__(self, dim: int = EMBED_DIM, mode: str = None):
         self.dim = dim
-        self.index = faiss.IndexFlatL2(dim)
+        self.index = _new_index(dim, mode or VECTOR_INDEX_MODE)
         self.texts: List[str] = []
         self.ids: List[int] = []
+        self._read_only = False
+        self._bm25: Optional[BM25Index] = None
+        # query text -> distance to every row; static tool queries are filled
+        # at ingest and saved with the index (see query_distances)
+        self._qdist: Dict[str, np.ndarray] = {}
+        # stored vectors (and squared norms, for l2) as one matrix for _distances;
+        # reset whenever rows change
+        self._vecs: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    @property
+    def metric(self) -> str:
+        """
+        "cosine" (scores are cosine distances, 1 - cos) or "l2" (squared L2).
+        Pass it to tools.confidence so scores map to confidence correctly.
+        """
+        return "cosine" if self.index.metric_type == faiss.METRIC_INNER_PRODUCT else "l2"
+
+    def _make_writable(self):
+        # a loaded store is backed by read-only mappings; copy before mutating
+        if self._read_only:
+            self.index = faiss.deserialize_index(faiss.serialize_index(self.index))
+            self._read_only = False
+        if not isinstance(self.ids, list):
+            self.ids = [int(i) for i in self.ids]
+        if not isinstance(self.texts, list):
+            self.texts = list(self.texts)
 
     def add(self, items: List[Tuple[int, str]], batch_size: int = 16):
         """
@@ -35,64 +340,230 @@ class VectorStore:
         if not items:
             return
 
-        clause_ids, texts = zip(*items)
-        model = get_model()
+        texts = [t for _, t in items]
+        self.add_embeddings(items, encode_texts(texts, batch_size=batch_size))
 
-        embeddings = model.encode(
-            list(texts),
-            batch_size=batch_size,
-            show_progress_bar=False,
-        )
+    def add_embeddings(self, items: List[Tuple[int, str]], embeddings: np.ndarray):
+        """
+        Like add(), with vectors already computed (e.g. reused from a previous version).
+        """
+        if not items:
+            return
+
+        clause_ids, texts = zip(*items)
         embeddings = np.asarray(embeddings, dtype="float32")
+        if self.metric == "cosine":
+            embeddings = _normalized(embeddings)
 
+        self._make_writable()
+        if not self.index.is_trained:
+            # SQ8: value ranges come from the first batch (normally the whole contract)
+            self.index.train(embeddings)
         self.index.add(embeddings)
         self.texts.extend(list(texts))
         self.ids.extend(list(clause_ids))
+        self._bm25 = None  # rebuilt on next use / save
+        self._qdist = {}
+        self._vecs = None
 
     def search(self, query: str, k: int = 5) -> List[Tuple[int, str]]:
-        model = get_model()
-        query_vec = model.encode([query], show_progress_bar=False)
-        query_vec = np.asarray(query_vec, dtype="float32")
+        return self.search_many([query], k=k)[0]
 
-        _, indices = self.index.search(query_vec, k)
+    def search_with_scores(self, query: str, k: int = 5) -> List[Tuple[int, str, float]]:
+        return self.search_many_with_scores([query], k=k)[0]
 
-        results: List[Tuple[int, str]] = []
-        for i in indices[0]:
-            if 0 <= i < len(self.texts):
-                results.append((self.ids[i], self.texts[i]))
-        return results
+    def search_many(self, queries: List[str], k: int = 5) -> List[List[Tuple[int, str]]]:
+        """
+        One result list per query, same order as `queries`.
+        """
+        return [[(cid, txt) for cid, txt, _ in hits] for hits in self.search_many_with_scores(queries, k=k)]
 
-    def search_with_scores(self, query: str, k: int = 5) -> List[Tuple[int, str, float]]:
-        model = get_model()
-        query_vec = model.encode([query], show_progress_bar=False)
-        query_vec = np.asarray(query_vec, dtype="float32")
+    def search_many_with_scores(self, queries: List[str], k: int = 5) -> List[List[Tuple[int, str, float]]]:
+        """
+        Batched search: all queries are encoded together and searched with a
+        single FAISS call over the query matrix. One list per query, each
+        sorted by distance (smaller = better match; see `metric`).
+        """
+        if not queries:
+            return []
 
-        distances, indices = self.index.search(query_vec, k)
+        query_vecs = encode_texts(list(queries))
 
-        results: List[Tuple[int, str, float]] = []
-        for dist, idx in zip(distances[0], indices[0]):
-            if 0 <= idx < len(self.texts):
-                results.append((self.ids[idx], self.texts[idx], float(dist)))
+        if self.metric == "cosine":
+            sims, indices = self.index.search(_normalized(query_vecs), k)
+            distances = 1.0 - sims
+        else:
+            distances, indices = self.index.search(query_vecs, k)
 
-        # smaller L2 distance = better match
-        results.sort(key=lambda x: x[2])
-        return results
+        out: List[List[Tuple[int, str, float]]] = []
+        for row_dist, row_idx in zip(distances, indices):
+            results: List[Tuple[int, str, float]] = []
+            for dist, idx in zip(row_dist, row_idx):
+                if 0 <= idx < len(self.texts):
+                    results.append((int(self.ids[idx]), self.texts[idx], float(dist)))
+            results.sort(key=lambda x: x[2])
+            out.append(results)
+        return out
+
+    def query_distances(self, queries: List[str]) -> np.ndarray:
+        """
+        (len(queries), rows) matrix of the distances search would return (see
+        `metric`); column j is row j of ids/texts. Rows already known (static
+        tool queries, computed at ingest and loaded with the index) cost
+        nothing; others are computed once from the stored vectors, no FAISS search.
+        """
+        known = self._qdist
+        missing = [q for q in dict.fromkeys(queries) if q not in known]
+        if missing:
+            fresh = dict(zip(missing, self._distances(encode_texts(missing))))
+            # copy-on-write so concurrent readers of a shared session never see a
+            # half-filled dict; answer from our own merge (a concurrent writer may
+            # publish over it, which only costs a recompute later)
+            known = {**known, **fresh}
+            self._qdist = {**self._qdist, **fresh}
+
+        if not queries:
+            return np.zeros((0, len(self.ids)), dtype="float32")
+        return np.vstack([known[q] for q in queries])
+
+    def _stored_vectors(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (rows x dim vectors as FAISS sees them, their squared norms); reconstructed once.
+        """
+        cached = self._vecs
+        if cached is None:
+            n = self.index.ntotal
+            vecs = self.index.reconstruct_n(0, n) if n else np.zeros((0, self.dim), dtype="float32")
+            cached = self._vecs = (vecs, (vecs * vecs).sum(axis=1))
+        return cached
+
+    def _distances(self, query_vecs: np.ndarray) -> np.ndarray:
+        vecs, sq = self._stored_vectors()
+        if self.metric == "cosine":
+            # stored vectors are unit length (quantized ones as FAISS sees them)
+            return (1.0 - _normalized(query_vecs) @ vecs.T).astype("float32")
+        q = np.asarray(query_vecs, dtype="float32")
+        d = (q * q).sum(axis=1)[:, None] + sq[None, :] - 2.0 * (q @ vecs.T)
+        return np.maximum(d, 0.0).astype("float32")
+
+    @property
+    def bm25(self) -> BM25Index:
+        """
+        Lexical index over the same rows; built lazily if not loaded from disk.
+        """
+        if self._bm25 is None:
+            self._bm25 = BM25Index.build(list(self.texts))
+        return self._bm25
+
+    def keyword_search(self, query: str, k: int = 5) -> List[Tuple[int, str, float, float]]:
+        """
+        BM25 only, no embedding: [(clause_id, text, bm25 score, coverage), ...] best first.
+        coverage (0..1) is the share of the query's terms (IDF-weighted) in the clause.
+        """
+        return [
+            (int(self.ids[row]), self.texts[row], score, coverage)
+            for row, score, coverage in self.bm25.search(query, k=k)
+        ]
+
+    def hybrid_search_with_scores(
+        self,
+        query: str,
+        k: int = 5,
+        lexical: Optional[List[Tuple[int, str, float, float]]] = None,
+    ) -> List[Tuple[int, str, float, float]]:
+        """
+        Dense + BM25 fused with reciprocal rank fusion:
+        [(clause_id, text, confidence, coverage), ...]. confidence is the dense
+        confidence (per `metric`) of every returned row, keyword-only hits
+        included; coverage is the lexical query-term coverage (0 for dense-only
+        hits), kept apart since a one-term query fully covers every clause that
+        has the term. Pass `lexical` if keyword_search already ran with
+        k=max(2 * k, 10); it is not searched again.
+        """
+        fetch = max(k * 2, 10)
+        if lexical is None:
+            lexical = self.keyword_search(query, k=fetch)
+        if not len(self.ids):
+            return []
+
+        # distances to every row (one matmul): dense ranking + confidence for lexical hits
+        dist = self._distances(encode_texts([query]))[0]
+        conf = distances_to_confidence(dist, self.metric)
+        row_of = {int(cid): row for row, cid in enumerate(self.ids)}
+        dense = [int(self.ids[row]) for row in nearest_rows(dist[None, :], fetch)[0]]
+        coverage = {cid: cov for cid, _, _, cov in lexical}
+
+        fused = reciprocal_rank_fusion([dense, [h[0] for h in lexical]])
+        return [
+            (cid, self.texts[row_of[cid]], float(conf[row_of[cid]]), coverage.get(cid, 0.0))
+            for cid, _ in fused[:k]
+        ]
 
     def save(self, index_path: str):
+        """
+        Writes <index_path> (FAISS), <index_path>.meta.bin (ids + texts),
+        <index_path>.bm25.npz (lexical index) and <index_path>.qdist.npz
+        (query x clause distances, if any were computed).
+        """
         os.makedirs(os.path.dirname(index_path), exist_ok=True)
 
-        faiss.write_index(self.index, index_path)
+        tmp = f"{index_path}.{os.getpid()}.tmp"
+        faiss.write_index(self.index, tmp)
+        os.replace(tmp, index_path)
 
-        meta_path = index_path + ".meta.json"
-        with open(meta_path, "w", encoding="utf-8") as f:
-            json.dump({"ids": self.ids, "texts": self.texts}, f, ensure_ascii=False)
+        _write_meta(index_path + ".meta.bin", [int(i) for i in self.ids], list(self.texts))
+        self.bm25.save(index_path + ".bm25.npz")
+
+        if self._qdist:
+            known = self._qdist
+            tmp = f"{index_path}.qdist.{os.getpid()}.tmp.npz"
+            np.savez(
+                tmp,
+                model=np.array(EMBED_MODEL_ID),
+                queries=np.array(list(known.keys()), dtype=str),
+                dist=np.vstack(list(known.values())),
+            )
+            os.replace(tmp, index_path + ".qdist.npz")
 
     def load(self, index_path: str):
-        self.index = faiss.read_index(index_path)
+        """
+        Vectors, ids and texts are memory-mapped read-only (no per-clause work).
+        Indexes written before the binary meta format fall back to .meta.json.
+        """
+        self.index = None
+        if VECTOR_INDEX_MMAP:
+            flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+            try:
+                self.index = faiss.read_index(index_path, flags)
+                self._read_only = True
+            except RuntimeError:
+                self.index = None
+        if self.index is None:
+            self.index = faiss.read_index(index_path)
+            self._read_only = False
+        self._vecs = None
+
+        self._bm25 = None
+        bm25_path = index_path + ".bm25.npz"
+        if os.path.exists(bm25_path):
+            self._bm25 = BM25Index.load(bm25_path)  # older indexes build it on first keyword search
+
+        self._qdist = {}
+        qdist_path = index_path + ".qdist.npz"
+        if os.path.exists(qdist_path):
+            with np.load(qdist_path, allow_pickle=False) as data:
+                # vectors from another embedding model would give meaningless distances
+                if str(data["model"]) == EMBED_MODEL_ID and data["dist"].shape[1] == self.index.ntotal:
+                    self._qdist = dict(zip(data["queries"].tolist(), data["dist"]))
+
+        meta_bin = index_path + ".meta.bin"
+        if os.path.exists(meta_bin):
+            self.ids, self.texts = _read_meta(meta_bin)
+            return
 
         meta_path = index_path + ".meta.json"
         with open(meta_path, "r", encoding="utf-8") as f:
             meta = json.load(f)
 
         self.ids = meta.get("ids", [])
-        self.texts = meta.get("texts", [])
\ No newline at end of file
+        self.texts = meta.get("texts", [])
@@ -1,6 +1,15 @@
-import json
+import os
 import re
-from llm import call_llm
+import functools
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from llm import call_llm_batch
+from rag.vector_store import encode_texts
+from tools.local_clause_classifier import get_local_classifier, record_classified
+from tools.logger import logger
+from tools.llm_metrics import record_parse
 from tools.json_utils import safe_json_load
 
 ALLOWED_CLAUSE_TYPES = [
@@ -16,73 +25,176 @@ ALLOWED_CLAUSE_TYPES = [
     "other"
 ]
 
+# One prompt per chunk; chunks run concurrently on the shared LLM pool
+CLASSIFY_CHUNK_MAX_CLAUSES = max(1, int(os.getenv("CLASSIFY_CHUNK_MAX_CLAUSES", "25")))
+CLASSIFY_CHUNK_MAX_CHARS = max(1, int(os.getenv("CLASSIFY_CHUNK_MAX_CHARS", "12000")))
+# Extra attempts for a chunk whose reply doesn't parse / doesn't cover its ids
+CLASSIFY_CHUNK_RETRIES = max(0, int(os.getenv("CLASSIFY_CHUNK_RETRIES", "2")))
 
-def extract_json(text):
-    """
-    Extract JSON safely even if LLM wraps it in ```json blocks
-    """
-    match = re.search(r"\[.*\]", text, re.DOTALL)
-    if match:
-        return match.group(0)
-    return None
-
-
-def classify_clauses_batch(clauses):
-    """
-    Classify clauses in batch using LLM with strict JSON enforcement.
-    Returns list of clause types aligned with input order.
-    """
-
-    numbered_clauses = "\n\n".join(
-        [f"{i+1}. {clause}" for i, clause in enumerate(clauses)]
-    )
-
-    system_prompt = f"""
+SYSTEM_PROMPT = f"""
 You are a legal contract clause classifier.
 
+Each clause is prefixed with its id in square brackets, e.g. [12].
 Classify each clause into exactly ONE of these types:
 
 {ALLOWED_CLAUSE_TYPES}
 
-Return ONLY a JSON list of strings.
-The list length MUST equal number of clauses.
+Return ONLY a JSON object mapping every clause id (as a string) to its type.
+Every id in the input MUST appear exactly once.
 No explanation.
 No markdown.
 No extra text.
 
 Example output:
-["confidentiality", "termination", "payment"]
+{{"12": "confidentiality", "13": "termination", "14": "payment"}}
 """
 
-    user_prompt = f"""
+
+def extract_json(text):
+    """
+    Extract JSON safely even if LLM wraps it in ```json blocks
+    """
+    match = re.search(r"\{.*\}", text or "", re.DOTALL)
+    if match:
+        return match.group(0)
+    return None
+
+
+def chunk_clauses(clauses: Sequence[str]) -> List[List[int]]:
+    """
+    Split clause indices into consecutive chunks bounded by
+    CLASSIFY_CHUNK_MAX_CLAUSES and CLASSIFY_CHUNK_MAX_CHARS (a single
+    oversized clause still gets a chunk of its own).
+    """
+    chunks: List[List[int]] = []
+    current: List[int] = []
+    chars = 0
+    for i, clause in enumerate(clauses):
+        size = len(clause or "")
+        if current and (len(current) >= CLASSIFY_CHUNK_MAX_CLAUSES or chars + size > CLASSIFY_CHUNK_MAX_CHARS):
+            chunks.append(current)
+            current, chars = [], 0
+        current.append(i)
+        chars += size
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _user_prompt(clauses: Sequence[str], ids: Sequence[int]) -> str:
+    numbered = "\n\n".join(f"[{i + 1}] {clauses[i]}" for i in ids)
+    return f"""
 Classify the following clauses:
 
-{numbered_clauses}
+{numbered}
 """
 
-    response = call_llm(system_prompt=system_prompt, user_prompt=user_prompt)
 
+def _parse_labels(response, ids: Sequence[int]) -> Dict[int, str]:
+    """
+    {clause index: label} for the ids the reply covers; unknown labels become "other".
+    """
+    if not isinstance(response, str):  # the call itself failed
+        return {}
     try:
-        json_text = extract_json(response)
-        classifications = safe_json_load(json_text)
+        data = safe_json_load(extract_json(response))
+    except Exception:
+        return {}
+    if not isinstance(data, dict):
+        return {}
 
-        # Safety check
-        if not isinstance(classifications, list):
-            raise ValueError("Output is not list")
+    wanted = {str(i + 1): i for i in ids}
+    out: Dict[int, str] = {}
+    for key, label in data.items():
+        i = wanted.get(str(key).strip().strip("[]"))
+        if i is None or not isinstance(label, str):
+            continue
+        label = label.strip().lower()
+        out[i] = label if label in ALLOWED_CLAUSE_TYPES else "other"
+    return out
 
-        if len(classifications) != len(clauses):
-            raise ValueError("Length mismatch")
 
-        # Clean + validate
-        cleaned = []
-        for label in classifications:
-            label = label.strip().lower()
-            if label not in ALLOWED_CLAUSE_TYPES:
-                label = "other"
-            cleaned.append(label)
+def _covers(response: str, ids: Sequence[int]) -> bool:
+    return len(_parse_labels(response, ids)) == len(ids)
 
-        return cleaned
 
-    except Exception as e:
-        print("Classification parsing failed. Falling back to 'other'.")
-        return ["other"] * len(clauses)
+def _classify_with_llm(clauses: List[str]) -> List[Optional[str]]:
+    """
+    Clauses go out in id-keyed chunks classified concurrently; a chunk whose
+    reply fails to parse or misses ids is retried on its own (such replies are
+    never cached, so the retry is a fresh call).
+    None for the clauses still unlabelled after that.
+    """
+    labels: List[Optional[str]] = [None] * len(clauses)
+    pending = chunk_clauses(clauses)
+
+    for attempt in range(CLASSIFY_CHUNK_RETRIES + 1):
+        if not pending:
+            break
+
+        responses = call_llm_batch(
+            [(SYSTEM_PROMPT, _user_prompt(clauses, ids)) for ids in pending],
+            return_exceptions=True,
+            tool="clause_classifier",
+            validate=[functools.partial(_covers, ids=ids) for ids in pending],
+        )
+
+        failed = []
+        for ids, response in zip(pending, responses):
+            parsed = _parse_labels(response, ids)
+            for i, label in parsed.items():
+                labels[i] = label
+            ok = len(parsed) == len(ids)
+            record_parse("clause_classifier", ok)
+            if not ok:
+                failed.append(ids)
+                reason = response if isinstance(response, Exception) else f"{len(parsed)}/{len(ids)} ids parsed"
+                logger.warning(f"[CLASSIFY] chunk {ids[0] + 1}-{ids[-1] + 1} attempt {attempt + 1} failed: {reason}")
+        pending = failed
+
+    missing = sum(1 for label in labels if label is None)
+    if missing:
+        logger.warning(f"[CLASSIFY] {missing}/{len(clauses)} clauses unclassified, falling back to 'other'")
+    return labels
+
+
+def classify_clauses_batch(clauses):
+    """
+    Classify clauses using LLM with strict JSON enforcement.
+    Clauses the LLM never labelled (see _classify_with_llm) fall back to 'other'.
+    Returns list of clause types aligned with input order.
+    """
+    return [label or "other" for label in _classify_with_llm(list(clauses))]
+
+
+def classify_clauses(clauses, vectors=None) -> Tuple[List[str], List[str]]:
+    """
+    Local nearest-centroid classifier first; only clauses it is unsure about
+    go to the LLM (classify_clauses_batch).
+    vectors: the clauses' embeddings if already computed (rows aligned with clauses).
+    Returns (clause types, label sources "local" | "llm" | "fallback"), aligned
+    with input order; "fallback" marks the 'other' given to clauses the LLM
+    never labelled, which the local classifier must not train on.
+    """
+    clauses = list(clauses)
+    types: List[Optional[str]] = [None] * len(clauses)
+
+    clf = get_local_classifier() if clauses else None
+    if clf is not None:
+        if vectors is None:
+            vectors = encode_texts(clauses)
+        labels, confidence, sims = clf.predict(vectors)
+        for i in np.flatnonzero(clf.confident(confidence, sims)):
+            types[i] = labels[i]
+
+    to_llm = [i for i, t in enumerate(types) if t is None]
+    sources = ["llm" if t is None else "local" for t in types]
+    if to_llm:
+        for i, t in zip(to_llm, _classify_with_llm([clauses[i] for i in to_llm])):
+            types[i] = t or "other"
+            if t is None:
+                sources[i] = "fallback"
+
+    record_classified(len(clauses) - len(to_llm), len(to_llm))
+    logger.info(f"[CLASSIFY] {len(clauses) - len(to_llm)}/{len(clauses)} clauses classified locally")
+    return types, sources
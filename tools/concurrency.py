@@ -0,0 +1,26 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+
+def run_parallel(tasks: Dict[str, Callable[[], Any]], max_workers: int = 0) -> Dict[str, Any]:
+    """
+    Run independent zero-arg callables at the same time and return {name: result}.
+
+    - A fresh pool per call, so nested run_parallel calls can't deadlock each other.
+    - Context vars (request tags, deadlines, ...) are copied into every task.
+    - The first exception (in task order) is re-raised after all tasks finish.
+    """
+    if not tasks:
+        return {}
+
+    workers = max_workers or len(tasks)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tool") as pool:
+        futures = {
+            name: pool.submit(contextvars.copy_context().run, fn)
+            for name, fn in tasks.items()
+        }
+
+    # pool.__exit__ waited for everything
+    return {name: fut.result() for name, fut in futures.items()}
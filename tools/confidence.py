@@ -1,6 +1,8 @@
 import math
 from typing import List
 
+import numpy as np
+
 def l2_to_confidence(dist: float, alpha: float = 0.35) -> float:
     """
     Convert FAISS L2 distance -> confidence in [0,1].
@@ -16,13 +18,43 @@ def l2_to_confidence(dist: float, alpha: float = 0.35) -> float:
     conf = math.exp(-alpha * d)
     return max(0.0, min(conf, 1.0))
 
-def average_confidence(distances: List[float], alpha: float = 0.35) -> float:
+def cosine_to_confidence(dist: float) -> float:
+    """
+    Cosine distance (1 - cos, from a cosine-mode VectorStore) -> confidence in [0,1].
+    conf = cos, clipped at 0
+    """
+    if dist is None:
+        return 0.0
+    try:
+        d = float(dist)
+    except Exception:
+        return 0.0
+    return max(0.0, min(1.0 - d, 1.0))
+
+def distance_to_confidence(dist: float, metric: str = "l2", alpha: float = 0.35) -> float:
+    """
+    metric is VectorStore.metric ("l2" | "cosine").
+    """
+    if metric == "cosine":
+        return cosine_to_confidence(dist)
+    return l2_to_confidence(dist, alpha=alpha)
+
+def distances_to_confidence(dists: np.ndarray, metric: str = "l2", alpha: float = 0.35) -> np.ndarray:
+    """
+    Array version of distance_to_confidence (e.g. rows of VectorStore.query_distances).
+    """
+    d = np.asarray(dists, dtype="float64")
+    if metric == "cosine":
+        return np.clip(1.0 - d, 0.0, 1.0)
+    return np.clip(np.exp(-alpha * d), 0.0, 1.0)
+
+def average_confidence(distances: List[float], alpha: float = 0.35, metric: str = "l2") -> float:
     if not distances:
         return 0.0
-    confs = [l2_to_confidence(d, alpha=alpha) for d in distances]
+    confs = [distance_to_confidence(d, metric=metric, alpha=alpha) for d in distances]
     return sum(confs) / len(confs)
 
-def top_confidence(distances: List[float], alpha: float = 0.35) -> float:
+def top_confidence(distances: List[float], alpha: float = 0.35, metric: str = "l2") -> float:
     if not distances:
         return 0.0
-    return max(l2_to_confidence(d, alpha=alpha) for d in distances)
\ No newline at end of file
+    return max(distance_to_confidence(d, metric=metric, alpha=alpha) for d in distances)
\ No newline at end of file
@@ -1,22 +1,151 @@
+import os
 import re
+import time
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
 from pypdf import PdfReader
-import re
-from pypdf import PdfReader
 
+from tools.logger import logger
+
+# PDFs with at least this many pages are extracted by a process pool
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "24"))
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "4"))
+
+
+@dataclass
+class PageText:
+    page_no: int   # 1-based
+    text: str
+    ms: float      # extraction time of this page
+
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                # spawn: the API process has live threads, forking it is unsafe
+                _POOL = ProcessPoolExecutor(
+                    max_workers=PDF_EXTRACT_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _POOL
+
+
+# per worker process: the last PDF opened, so consecutive page ranges don't re-parse it
+_WORKER_READER: Dict[str, Tuple[int, PdfReader]] = {}
 
-def load_contract(pdf_path: str) -> str:
+
+def _extract_page_range(pdf_path: str, start: int, end: int) -> List[Tuple[int, str, float]]:
+    mtime = os.stat(pdf_path).st_mtime_ns
+    cached = _WORKER_READER.get(pdf_path)
+    if cached is None or cached[0] != mtime:
+        _WORKER_READER.clear()
+        cached = _WORKER_READER[pdf_path] = (mtime, PdfReader(pdf_path))
+    reader = cached[1]
+
+    out = []
+    for i in range(start, end):
+        t0 = time.perf_counter()
+        text = reader.pages[i].extract_text() or ""
+        out.append((i + 1, text, (time.perf_counter() - t0) * 1000))
+    return out
+
+
+def iter_pages(pdf_path: str, max_chars: Optional[int] = None, stream: Optional[BinaryIO] = None) -> Iterator[PageText]:
+    """
+    Yields pages in order. Stops after the page that brings the extracted text
+    to max_chars. Large PDFs are extracted in page ranges on a process pool,
+    only a few ranges ahead of the consumer so a cutoff wastes little work.
+
+    stream: the PDF bytes already in memory (e.g. an mmap of the upload); read
+    instead of opening pdf_path. Pool workers still open pdf_path themselves.
+    """
+    reader = PdfReader(stream if stream is not None else pdf_path)
+    n_pages = len(reader.pages)
+    total = 0
+
+    if n_pages < PDF_PARALLEL_MIN_PAGES or PDF_EXTRACT_WORKERS <= 1:
+        for i in range(n_pages):
+            t0 = time.perf_counter()
+            text = reader.pages[i].extract_text() or ""
+            yield PageText(i + 1, text, (time.perf_counter() - t0) * 1000)
+            total += len(text)
+            if max_chars and total >= max_chars:
+                return
+        return
+
+    pool = _get_pool()
+    ranges = deque((s, min(s + PDF_PAGES_PER_TASK, n_pages)) for s in range(0, n_pages, PDF_PAGES_PER_TASK))
+    pending = deque()
+    try:
+        while ranges or pending:
+            while ranges and len(pending) < 2 * PDF_EXTRACT_WORKERS:
+                start, end = ranges.popleft()
+                pending.append(pool.submit(_extract_page_range, pdf_path, start, end))
+
+            for page_no, text, ms in pending.popleft().result():
+                yield PageText(page_no, text, ms)
+                total += len(text)
+                if max_chars and total >= max_chars:
+                    return
+    finally:
+        for f in pending:
+            f.cancel()
+
+
+def extract_contract_text(
+    pdf_path: str,
+    max_chars: Optional[int] = None,
+    stream: Optional[BinaryIO] = None,
+) -> Tuple[str, dict]:
+    """
+    (text, stats). Same text as load_contract; stats has page counts, total
+    time and the per-page extraction times.
+    """
+    t0 = time.perf_counter()
+    parts: List[str] = []
+    page_ms: List[float] = []
+    chars = 0
+    for page in iter_pages(pdf_path, max_chars=max_chars, stream=stream):
+        page_ms.append(round(page.ms, 2))
+        if page.text:
+            parts.append(page.text)
+            parts.append("\n")
+            chars += len(page.text) + 1
+
+    stats = {
+        "pages_read": len(page_ms),
+        "chars": chars,
+        "truncated": bool(max_chars and chars >= max_chars),
+        "total_ms": round((time.perf_counter() - t0) * 1000, 2),
+        "page_ms": page_ms,
+    }
+    slowest = sorted(range(len(page_ms)), key=lambda i: page_ms[i], reverse=True)[:3]
+    logger.info(
+        f"[PDF] {os.path.basename(pdf_path)} pages={stats['pages_read']} chars={chars} "
+        f"truncated={stats['truncated']} total_ms={stats['total_ms']} "
+        f"slowest={[(i + 1, page_ms[i]) for i in slowest]}"
+    )
+    return "".join(parts), stats
+
+
+def load_contract(pdf_path: str, max_chars: Optional[int] = None, stream: Optional[BinaryIO] = None) -> str:
     """
     Loads PDF and converts to raw text.
+    With max_chars, stops reading pages once that much text has been extracted.
     """
-    reader = PdfReader(pdf_path)
-    full_text = ""
-
-    for page in reader.pages:
-        text = page.extract_text()
-        if text:
-            full_text += text + "\n"
-
-    return full_text
+    return extract_contract_text(pdf_path, max_chars=max_chars, stream=stream)[0]
 
 
 def clean_raw_text(text: str) -> str:
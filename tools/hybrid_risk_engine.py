@@ -1,9 +1,13 @@
 import re
 from typing import List, Dict, Any, Tuple
 
+import numpy as np
+
 from llm import call_llm
-from tools.json_utils import safe_json_load
-from tools.confidence import l2_to_confidence 
+from tools.llm_metrics import record_parse
+from tools.json_utils import parses_as, safe_json_load
+from tools.confidence import distances_to_confidence
+from rag.vector_store import nearest_rows
 
 
 RISK_TEMPLATES = {
@@ -37,39 +41,35 @@ RISK_TEMPLATES = {
 def analyze_risks_hybrid(store, vector_store, per_template_k: int = 4, max_candidates: int = 24) -> List[Dict[str, Any]]:
     """
     FAST hybrid risk detection:
-    - Use FAISS vector_store retrieval to pick candidate clauses for each risk template
+    - Pick candidate clauses for each risk template from the precomputed template x clause distances
     - Then confirm + grade with LLM
 
     Returns: List[{risk_type, clause_id, risk_level, explanation, mitigation, similarity_score, confidence}]
     """
 
-    # 1) Retrieve candidates per template using FAISS 
-    candidates: List[Dict[str, Any]] = []
-    seen: set[Tuple[int, str]] = set()
-
-    for risk_name, desc in RISK_TEMPLATES.items():
-        hits_scored = vector_store.search_with_scores(desc, k=per_template_k)  # [(cid, txt, dist), ...]
-        for cid, txt, dist in hits_scored:
-            if not isinstance(cid, int):
-                continue
-            key = (cid, risk_name)
-            if key in seen:
-                continue
-            seen.add(key)
-
-            # Turn L2 distance into a 0..1-ish confidence
-            conf = float(l2_to_confidence(dist))
-            candidates.append({
-                "risk_type": risk_name,
-                "clause_id": cid,
-                "clause_text": txt,
-                "similarity_score": round(conf, 3),  
-                "_raw_conf": conf,
-            })
-
-    # sort strongest first and cap
-    candidates.sort(key=lambda x: float(x.get("_raw_conf", 0.0)), reverse=True)
-    candidates = candidates[:max_candidates]
+    # 1) Candidates per template from the template x clause distance matrix
+    #    (computed at ingest, stored with the index: no model / FAISS call here)
+    risk_names = list(RISK_TEMPLATES.keys())
+    dist = vector_store.query_distances(list(RISK_TEMPLATES.values()))
+    rows = nearest_rows(dist, per_template_k)  # (templates, k): one pair per (clause, template)
+
+    tmpl = np.repeat(np.arange(len(risk_names)), rows.shape[1])
+    rows = rows.ravel()
+    # Turn distance (L2 or cosine, per store) into a 0..1-ish confidence
+    conf = distances_to_confidence(dist[tmpl, rows], vector_store.metric)
+
+    # strongest first (ties keep template order) and cap
+    order = np.argsort(-conf, kind="stable")[:max_candidates]
+    candidates: List[Dict[str, Any]] = [
+        {
+            "risk_type": risk_names[tmpl[i]],
+            "clause_id": int(vector_store.ids[rows[i]]),
+            "clause_text": vector_store.texts[rows[i]],
+            "similarity_score": round(float(conf[i]), 3),
+            "_raw_conf": float(conf[i]),
+        }
+        for i in order
+    ]
 
     if not candidates:
         return []
@@ -123,7 +123,7 @@ Here are potentially risky clauses:
 Provide professional structured risk analysis.
 """
 
-    response = call_llm(system_prompt=system_prompt, user_prompt=user_prompt)
+    response = call_llm(system_prompt=system_prompt, user_prompt=user_prompt, tool="hybrid_risk", validate=parses_as(list))
     response = response.strip()
     response = re.sub(r"^```(?:json)?\s*|\s*```$", "", response).strip()
 
@@ -150,9 +150,11 @@ Provide professional structured risk analysis.
             except Exception:
                 r["similarity_score"] = float(base)
 
+        record_parse("hybrid_risk", True)
         return parsed
 
     except Exception as e:
+        record_parse("hybrid_risk", False)
         print("JSON Parse Error:", e)
         return [{
             "risk_type": "LLM Parsing Error",
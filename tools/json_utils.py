@@ -1,5 +1,5 @@
 import json, re
-from typing import Any
+from typing import Any, Callable
 
 def safe_json_load(raw: str) -> Any:
     if raw is None:
@@ -21,4 +21,15 @@ def safe_json_load(raw: str) -> Any:
     if not m:
         raise ValueError("No JSON found in response")
 
-    return json.loads(m.group(1))
\ No newline at end of file
+    return json.loads(m.group(1))
+
+def parses_as(kind: type) -> Callable[[str], bool]:
+    """
+    validate= check for llm.call_llm: the reply parses to a JSON `kind` (dict / list).
+    """
+    def check(raw: str) -> bool:
+        try:
+            return isinstance(safe_json_load(raw), kind)
+        except Exception:
+            return False
+    return check
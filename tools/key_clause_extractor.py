@@ -1,6 +1,7 @@
 from typing import Dict, List
 from llm import call_llm
 from tools.json_utils import safe_json_load
+from rag.vector_store import nearest_rows
 
 KEY_TOPICS = [
     ("termination", "Termination / exit / resignation / notice"),
@@ -28,21 +29,47 @@ def looks_like_payment(txt: str) -> bool:
 DEFAULT_MAX_DIST = 1.20
 PAYMENT_MAX_DIST = 1.10
 
+# Same cut-offs for cosine-mode stores (cos >= ...). Embeddings are unit length,
+# so these equal the L2 ones above (squared L2 = 2 - 2cos) but don't drift per contract.
+DEFAULT_MIN_COSINE = 0.40
+PAYMENT_MIN_COSINE = 0.45
+
 
 def extract_key_clauses(store, vector_store, top_k: int = 3) -> Dict[str, List[dict]]:
     """
     Returns dict: topic -> list of {clause_id, clause_text}
-    Assumes vector_store.search_with_scores(query,k) returns:
+    Uses vector_store.query_distances when available; otherwise
+    assumes vector_store.search_with_scores(query,k) returns:
       List[ (clause_id, clause_text, dist) ]   OR
       List[ (clause_text, dist) ] (fallback supported)
     """
 
     results: Dict[str, List[dict]] = {}
 
-    for key, query in KEY_TOPICS:
-       
+    topic_dist = None
+    batched = None
+    if hasattr(vector_store, "query_distances"):
+        # topic x clause distances precomputed at ingest: ranking is an array op
+        topic_dist = vector_store.query_distances([query for _, query in KEY_TOPICS])
+        ranked = nearest_rows(topic_dist, top_k * 3)
+    elif hasattr(vector_store, "search_many_with_scores"):
+        batched = vector_store.search_many_with_scores([query for _, query in KEY_TOPICS], k=top_k * 3)
+
+    for i, (key, query) in enumerate(KEY_TOPICS):
+
+        # Filtering rules
+        if getattr(vector_store, "metric", "l2") == "cosine":
+            max_dist = 1.0 - (PAYMENT_MIN_COSINE if key == "payment" else DEFAULT_MIN_COSINE)
+        else:
+            max_dist = PAYMENT_MAX_DIST if key == "payment" else DEFAULT_MAX_DIST
+
         hits = []
-        if hasattr(vector_store, "search_with_scores"):
+        if topic_dist is not None:
+            rows = ranked[i][topic_dist[i, ranked[i]] <= max_dist]
+            hits = [(int(vector_store.ids[r]), vector_store.texts[r], float(topic_dist[i, r])) for r in rows]
+        elif batched is not None:
+            hits = batched[i]
+        elif hasattr(vector_store, "search_with_scores"):
             hits = vector_store.search_with_scores(query, k=top_k * 3)
         else:
             # fallback
@@ -52,9 +79,6 @@ def extract_key_clauses(store, vector_store, top_k: int = 3) -> Dict[str, List[d
 
         picked: List[dict] = []
 
-        # Filtering rules
-        max_dist = PAYMENT_MAX_DIST if key == "payment" else DEFAULT_MAX_DIST
-
         for h in hits:
             clause_id = None
             clause_text = None
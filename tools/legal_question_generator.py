@@ -2,7 +2,9 @@ from typing import List
 import re
 
 from llm import call_llm
-from tools.json_utils import safe_json_load
+from tools.llm_metrics import record_parse
+from tools.json_utils import parses_as, safe_json_load
+from rag.vector_store import nearest_rows
 
 
 QUESTION_AREAS = [
@@ -25,8 +27,11 @@ def _clean_json(raw: str) -> str:
 def generate_legal_questions(vector_store, k: int = 2):
     evidence_blocks: List[str] = []
 
-    for key, query in QUESTION_AREAS:
-        hits = vector_store.search(query, k=k)  # [(clause_id, clause_text), ...]
+    # area x clause distances precomputed at ingest
+    ranked = nearest_rows(vector_store.query_distances([query for _, query in QUESTION_AREAS]), k)
+
+    for (key, _), rows in zip(QUESTION_AREAS, ranked):
+        hits = [(int(vector_store.ids[r]), vector_store.texts[r]) for r in rows]
         block = "\n\n".join([f"[Clause {cid}] {text[:350]}" for cid, text in hits])
         evidence_blocks.append(f"{key}:\n{block}")
 
@@ -57,11 +62,13 @@ Evidence:
 Return 6 high-value questions (not more).
 """
 
-    raw = call_llm(system_prompt=system_prompt, user_prompt=user_prompt)
+    raw = call_llm(system_prompt=system_prompt, user_prompt=user_prompt, tool="legal_questions", validate=parses_as(list))
     raw = _clean_json(raw)
 
     try:
         data = safe_json_load(raw)
+        record_parse("legal_questions", isinstance(data, list))
         return data if isinstance(data, list) else []
     except Exception:
+        record_parse("legal_questions", False)
         return {"parse_error": raw}
\ No newline at end of file
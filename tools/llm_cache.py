@@ -0,0 +1,218 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Optional
+
+from tools.logger import logger
+
+DATA_DIR = os.getenv("DATA_DIR", "/tmp/data")
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") not in {"0", "false", "False", ""}
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(DATA_DIR, "llm_cache.sqlite3"))
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "256"))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))  # default 7 days
+
+# Check the size cap every N writes (SUM over the table is cheap but not free)
+_EVICT_EVERY = 16
+
+
+def make_key(model: str, prompt: str) -> str:
+    """
+    Content address: sha256 over model id + full prompt text.
+    """
+    h = hashlib.sha256()
+    h.update(model.encode("utf-8"))
+    h.update(b"\0")
+    h.update(prompt.encode("utf-8"))
+    return h.hexdigest()
+
+
+class LLMCache:
+    """
+    On-disk LLM response cache (SQLite, WAL mode).
+
+    - One file per node: every uvicorn worker opens the same DB, so a response
+      fetched by one worker is a hit for all of them and survives restarts.
+    - LRU eviction by last_access once total size exceeds max_bytes.
+    - Entries older than ttl_seconds are treated as misses and dropped.
+    """
+
+    def __init__(self, path: str, max_bytes: int, ttl_seconds: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "errors": 0}
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._init_schema()
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite connections are not shareable across threads; keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        conn = self._conn()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache(last_access)")
+
+    def _bump(self, name: str, n: int = 1):
+        with self._lock:
+            self._stats[name] += n
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        try:
+            conn = self._conn()
+            row = conn.execute(
+                "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self._bump("misses")
+                return None
+
+            response, created_at = row
+            if self.ttl_seconds > 0 and (now - created_at) > self.ttl_seconds:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._bump("misses")
+                return None
+
+            conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._bump("hits")
+            return response
+
+        except sqlite3.Error as e:
+            logger.warning(f"[LLM CACHE] get failed: {e}")
+            self._bump("errors")
+            return None
+
+    def set(self, key: str, model: str, response: str):
+        if response is None:
+            return
+
+        now = time.time()
+        try:
+            self._conn().execute(
+                "INSERT OR REPLACE INTO llm_cache (key, model, response, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, len(response.encode("utf-8")), now, now),
+            )
+            self._bump("writes")
+
+            with self._lock:
+                self._writes += 1
+                check = self._writes % _EVICT_EVERY == 0
+            if check:
+                self.evict()
+
+        except sqlite3.Error as e:
+            logger.warning(f"[LLM CACHE] set failed: {e}")
+            self._bump("errors")
+
+    def evict(self):
+        """
+        Drop expired rows, then least-recently-used rows until under max_bytes.
+        """
+        conn = self._conn()
+
+        if self.ttl_seconds > 0:
+            cur = conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            if cur.rowcount:
+                self._bump("evictions", cur.rowcount)
+
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # walk oldest-first until enough bytes are freed
+        to_free = total - self.max_bytes
+        freed = 0
+        victims = []
+        rows = conn.execute("SELECT key, size FROM llm_cache ORDER BY last_access ASC").fetchall()
+        for key, size in rows:
+            victims.append((key,))
+            freed += size
+            if freed >= to_free:
+                break
+
+        conn.executemany("DELETE FROM llm_cache WHERE key = ?", victims)
+        self._bump("evictions", len(victims))
+        logger.info(f"[LLM CACHE] evicted {len(victims)} entries ({freed} bytes)")
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            out = dict(self._stats)
+
+        lookups = out["hits"] + out["misses"]
+        out["hit_rate"] = round(out["hits"] / lookups, 3) if lookups else 0.0
+
+        try:
+            entries, size = self._conn().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+            ).fetchone()
+            out["entries"] = entries
+            out["bytes"] = size
+        except sqlite3.Error:
+            pass
+
+        out["max_bytes"] = self.max_bytes
+        out["ttl_seconds"] = self.ttl_seconds
+        return out
+
+
+_CACHE: Optional[LLMCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """
+    Singleton per worker process. None when disabled (LLM_CACHE_ENABLED=0)
+    or when the cache file can't be opened.
+    """
+    global _CACHE, LLM_CACHE_ENABLED
+    if not LLM_CACHE_ENABLED:
+        return None
+    if _CACHE is None:
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                try:
+                    _CACHE = LLMCache(
+                        LLM_CACHE_PATH,
+                        max_bytes=int(LLM_CACHE_MAX_MB * 1024 * 1024),
+                        ttl_seconds=LLM_CACHE_TTL_SECONDS,
+                    )
+                except Exception as e:
+                    logger.warning(f"[LLM CACHE] disabled, could not open {LLM_CACHE_PATH}: {e}")
+                    LLM_CACHE_ENABLED = False
+                    return None
+    return _CACHE
+
+
+def cache_stats() -> Dict[str, float]:
+    cache = get_llm_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
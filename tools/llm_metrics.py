@@ -0,0 +1,202 @@
+import os
+import math
+import threading
+import contextvars
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from tools.logger import logger
+from tools.metrics import get_histogram, histograms_snapshot
+
+# USD per 1M tokens (defaults: gemini-2.0-flash list price)
+LLM_PRICE_INPUT_PER_1M = float(os.getenv("LLM_PRICE_INPUT_PER_1M", "0.10"))
+LLM_PRICE_OUTPUT_PER_1M = float(os.getenv("LLM_PRICE_OUTPUT_PER_1M", "0.40"))
+
+# Per-contract ledgers kept in memory (oldest dropped first)
+LLM_LEDGER_MAX_CONTRACTS = int(os.getenv("LLM_LEDGER_MAX_CONTRACTS", "1000"))
+
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+
+_TAGS: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar("llm_tags", default={})
+
+_LOCK = threading.Lock()
+_BY_TOOL: Dict[str, Dict[str, float]] = {}
+_BY_CONTRACT: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+
+@contextmanager
+def llm_tags(**tags):
+    """
+    Attach tags (tool, contract_id, request_id, ...) to every LLM call made in
+    this block, including tool threads started from it. Inner blocks override.
+    """
+    token = _TAGS.set({**_TAGS.get(), **{k: v for k, v in tags.items() if v is not None}})
+    try:
+        yield
+    finally:
+        _TAGS.reset(token)
+
+
+def current_tags() -> Dict[str, Any]:
+    return dict(_TAGS.get())
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """
+    ~4 chars per token; good enough to rank call sites and estimate spend.
+    """
+    if not text:
+        return 0
+    return int(math.ceil(len(text) / 4.0))
+
+
+def _cost(prompt_tokens: int, output_tokens: int) -> float:
+    return (prompt_tokens * LLM_PRICE_INPUT_PER_1M + output_tokens * LLM_PRICE_OUTPUT_PER_1M) / 1_000_000
+
+
+def _empty_ledger() -> Dict[str, float]:
+    return {
+        "calls": 0,
+        "provider_calls": 0,
+        "cache_hits": 0,
+        "coalesced": 0,
+        "errors": 0,
+        "parse_ok": 0,
+        "parse_failed": 0,
+        "prompt_chars": 0,
+        "prompt_tokens": 0,
+        "output_chars": 0,
+        "output_tokens": 0,
+        "wall_ms": 0.0,
+        "cost_usd": 0.0,
+    }
+
+
+def _add(ledger: Dict[str, float], source: str, ok: bool, wall_ms: float,
+         prompt_chars: int, prompt_tokens: int, output_chars: int, output_tokens: int):
+    ledger["calls"] += 1
+    ledger["wall_ms"] += wall_ms
+    ledger["prompt_chars"] += prompt_chars
+    ledger["prompt_tokens"] += prompt_tokens
+    if not ok:
+        ledger["errors"] += 1
+        return
+
+    ledger["output_chars"] += output_chars
+    ledger["output_tokens"] += output_tokens
+    if source == "provider":
+        ledger["provider_calls"] += 1
+        ledger["cost_usd"] += _cost(prompt_tokens, output_tokens)
+    elif source == "cache":
+        ledger["cache_hits"] += 1
+    elif source == "coalesced":
+        ledger["coalesced"] += 1
+
+
+def record_call(
+    tool: str,
+    prompt: str,
+    output: Optional[str],
+    wall_ms: float,
+    source: str,
+    ok: bool = True,
+    error: Optional[BaseException] = None,
+):
+    """
+    source: "provider" (paid round trip) | "cache" | "coalesced" (shared another
+    caller's in-flight request). Only provider calls are charged in the ledger.
+    """
+    tags = current_tags()
+    contract_id = tags.get("contract_id")
+    request_id = tags.get("request_id")
+
+    prompt_chars = len(prompt or "")
+    prompt_tokens = estimate_tokens(prompt)
+    output_chars = len(output or "")
+    output_tokens = estimate_tokens(output)
+
+    get_histogram(f"llm.call_ms.{tool}").observe(wall_ms)
+    get_histogram(f"llm.prompt_tokens.{tool}", TOKEN_BUCKETS).observe(prompt_tokens)
+    if ok:
+        get_histogram(f"llm.output_tokens.{tool}", TOKEN_BUCKETS).observe(output_tokens)
+
+    with _LOCK:
+        ledger = _BY_TOOL.setdefault(tool, _empty_ledger())
+        _add(ledger, source, ok, wall_ms, prompt_chars, prompt_tokens, output_chars, output_tokens)
+
+        if contract_id:
+            entry = _BY_CONTRACT.get(contract_id)
+            if entry is None:
+                entry = {"total": _empty_ledger(), "by_tool": {}}
+                _BY_CONTRACT[contract_id] = entry
+                while len(_BY_CONTRACT) > LLM_LEDGER_MAX_CONTRACTS:
+                    _BY_CONTRACT.popitem(last=False)
+            else:
+                _BY_CONTRACT.move_to_end(contract_id)
+            _add(entry["total"], source, ok, wall_ms, prompt_chars, prompt_tokens, output_chars, output_tokens)
+            _add(entry["by_tool"].setdefault(tool, _empty_ledger()), source, ok, wall_ms,
+                 prompt_chars, prompt_tokens, output_chars, output_tokens)
+
+    status = "ok" if ok else f"error={type(error).__name__ if error else 'unknown'}"
+    logger.info(
+        f"[LLM CALL] tool={tool} contract_id={contract_id} request_id={request_id} source={source} "
+        f"ms={round(wall_ms, 2)} prompt_chars={prompt_chars} prompt_tokens~{prompt_tokens} "
+        f"output_chars={output_chars} {status}"
+    )
+
+
+def record_parse(tool: str, ok: bool):
+    """
+    Call sites report whether the LLM output parsed into the expected shape.
+    """
+    contract_id = current_tags().get("contract_id")
+    field = "parse_ok" if ok else "parse_failed"
+
+    with _LOCK:
+        _BY_TOOL.setdefault(tool, _empty_ledger())[field] += 1
+        entry = _BY_CONTRACT.get(contract_id) if contract_id else None
+        if entry is not None:
+            entry["total"][field] += 1
+            entry["by_tool"].setdefault(tool, _empty_ledger())[field] += 1
+
+    if not ok:
+        logger.warning(f"[LLM PARSE] tool={tool} contract_id={contract_id} failed to parse output")
+
+
+def _rounded(ledger: Dict[str, float]) -> Dict[str, float]:
+    out = dict(ledger)
+    out["wall_ms"] = round(out["wall_ms"], 2)
+    out["cost_usd"] = round(out["cost_usd"], 6)
+    return out
+
+
+def llm_usage_summary() -> Dict[str, Any]:
+    """
+    Aggregates across all contracts (safe to expose without auth: no ids).
+    """
+    with _LOCK:
+        by_tool = {t: _rounded(l) for t, l in _BY_TOOL.items()}
+
+    total = _empty_ledger()
+    for ledger in by_tool.values():
+        for k, v in ledger.items():
+            total[k] += v
+
+    return {
+        "total": _rounded(total),
+        "by_tool": dict(sorted(by_tool.items(), key=lambda kv: kv[1]["wall_ms"], reverse=True)),
+        "histograms": histograms_snapshot("llm."),
+        "pricing_per_1m_tokens": {"input": LLM_PRICE_INPUT_PER_1M, "output": LLM_PRICE_OUTPUT_PER_1M},
+    }
+
+
+def contract_usage(contract_id: str) -> Optional[Dict[str, Any]]:
+    with _LOCK:
+        entry = _BY_CONTRACT.get(contract_id)
+        if entry is None:
+            return None
+        return {
+            "total": _rounded(entry["total"]),
+            "by_tool": {t: _rounded(l) for t, l in entry["by_tool"].items()},
+        }
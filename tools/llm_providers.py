@@ -0,0 +1,333 @@
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional
+
+from tools.logger import logger
+
+DATA_DIR = os.getenv("DATA_DIR", "/tmp/data")
+
+
+class LLMProvider:
+    """
+    Backend interface used by llm.call_llm: one prompt in, raw text out.
+    `model` is part of the response-cache key, so two providers that can
+    return different text for the same prompt must report different models.
+    """
+
+    name: str = "base"
+    model: str = ""
+
+    def generate(self, prompt: str) -> str:
+        raise NotImplementedError
+
+    def is_transient(self, exc: BaseException) -> bool:
+        """
+        Worth retrying? (network blips, socket timeouts)
+        """
+        return isinstance(exc, (ConnectionError, TimeoutError))
+
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+
+    def __init__(self, model: str, api_key: Optional[str] = None):
+        self.model = model
+        self._api_key = api_key
+        self._client: Optional[Any] = None
+        self._lock = threading.Lock()
+
+    def client(self):
+        """
+        One genai.Client per worker process; google.genai is only imported
+        when this backend is actually used.
+        """
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import google.genai as genai
+                    self._client = genai.Client(api_key=self._api_key or os.getenv("GEMINI_API_KEY"))
+        return self._client
+
+    def generate(self, prompt: str) -> str:
+        response = self.client().models.generate_content(
+            model=self.model,
+            contents=prompt,
+        )
+        return response.text
+
+    def is_transient(self, exc: BaseException) -> bool:
+        if super().is_transient(exc):
+            return True
+
+        # google.genai.errors.APIError carries the HTTP status in .code
+        code = getattr(exc, "code", None)
+        if isinstance(code, int) and (code == 429 or 500 <= code < 600):
+            return True
+
+        try:
+            import httpx
+            return isinstance(exc, httpx.TransportError)
+        except ImportError:
+            return False
+
+
+class ReplayProvider(LLMProvider):
+    """
+    Record/replay backend.
+
+    - mode="record": forward to `inner` and write every response to `directory`
+    - mode="replay": answer only from `directory`; a prompt that was never
+      recorded raises KeyError (or goes to `inner` when one is given)
+
+    One JSON file per prompt, named by sha256(model + prompt), so recordings
+    can be copied between machines and diffed.
+    """
+
+    name = "replay"
+
+    def __init__(self, directory: str, mode: str = "replay", inner: Optional[LLMProvider] = None, model: str = ""):
+        if mode not in {"record", "replay"}:
+            raise ValueError(f"Unknown replay mode: {mode}")
+        if mode == "record" and inner is None:
+            raise ValueError("record mode needs an inner provider")
+
+        self.directory = directory
+        self.mode = mode
+        self.inner = inner
+        self.model = inner.model if inner is not None else model
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, prompt: str) -> str:
+        h = hashlib.sha256(f"{self.model}\0{prompt}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{h}.json")
+
+    def generate(self, prompt: str) -> str:
+        path = self._path(prompt)
+
+        if self.mode == "replay":
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    return json.load(f)["response"]
+            if self.inner is None:
+                raise KeyError(f"No recorded response for prompt ({os.path.basename(path)})")
+
+        text = self.inner.generate(prompt)
+
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model, "prompt": prompt, "response": text}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        return text
+
+    def is_transient(self, exc: BaseException) -> bool:
+        if self.inner is not None:
+            return self.inner.is_transient(exc)
+        return super().is_transient(exc)
+
+
+_CLAUSE_REF = re.compile(r"\[Clause (\d+)\]")
+
+_CLASSIFIER_KEYWORDS = [
+    ("confidentiality", ["confidential", "non-disclosure", "trade secret"]),
+    ("termination", ["terminat", "notice period", "resign"]),
+    ("payment", ["salary", "remuneration", "ctc", "payable", "stipend", "bonus"]),
+    ("dispute_resolution", ["arbitration", "dispute"]),
+    ("non_compete", ["compete", "solicit"]),
+    ("intellectual_property", ["intellectual property", "invention", "source code"]),
+    ("liability", ["liab", "indemn", "damages"]),
+    ("governing_law", ["governing law", "jurisdiction", "courts"]),
+    ("employment_terms", ["probation", "working hours", "leave", "designation"]),
+]
+
+
+class SyntheticProvider(LLMProvider):
+    """
+    Offline stand-in for load tests and benchmarks.
+
+    Sleeps latency_ms +/- jitter_ms, then returns schema-valid output for the
+    tool that built the prompt (recognised by its system prompt). The text is
+    a pure function of the prompt; only the timing is random (seeded).
+
+    tail_rate / tail_ms add stragglers and error_rate raises ConnectionError,
+    for exercising hedging and retries.
+    """
+
+    name = "synthetic"
+    model = "synthetic"
+
+    def __init__(
+        self,
+        latency_ms: float = 800.0,
+        jitter_ms: float = 300.0,
+        seed: Optional[int] = None,
+        tail_rate: float = 0.0,
+        tail_ms: float = 0.0,
+        error_rate: float = 0.0,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tail_rate = tail_rate
+        self.tail_ms = tail_ms
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _sleep(self):
+        with self._lock:
+            jitter = self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+            tail = self.tail_ms if self._rng.random() < self.tail_rate else 0.0
+            fail = self._rng.random() < self.error_rate
+        delay = max(0.0, self.latency_ms + jitter + tail) / 1000.0
+        if delay:
+            time.sleep(delay)
+        if fail:
+            raise ConnectionError("synthetic transient failure")
+
+    def generate(self, prompt: str) -> str:
+        self._sleep()
+
+        system, _, task = prompt.partition("User Task:")
+
+        if "clause classifier" in system:
+            return json.dumps(self._classify(task))
+        if "senior legal risk analyst" in system:
+            return json.dumps(self._validate_risks(task))
+        if "employment contract risk analyst" in system:
+            return json.dumps(self._discover_risks(task))
+        if "structured analyst" in system:
+            return json.dumps(self._structured(task))
+        if "contract summarizer" in system:
+            return json.dumps(self._summary(task))
+        if "senior legal advisor" in system:
+            return json.dumps(self._questions(task))
+        if "planning router" in system:
+            return json.dumps({"intent": "qa", "k": 5, "steps": [{"tool": "qa", "args": {}}], "notes": "synthetic"})
+        if "contract QA assistant" in system:
+            cids = self._clause_ids(task)
+            if not cids:
+                return "Not found"
+            return f"Synthetic answer based on [Clause {cids[0]}]."
+
+        return "Synthetic response."
+
+    @staticmethod
+    def _clause_ids(text: str) -> List[int]:
+        seen: List[int] = []
+        for m in _CLAUSE_REF.finditer(text):
+            cid = int(m.group(1))
+            if cid not in seen:
+                seen.append(cid)
+        return seen
+
+    @staticmethod
+    def _pick(options: List[str], key: str) -> str:
+        h = int(hashlib.md5(key.encode("utf-8")).hexdigest(), 16)
+        return options[h % len(options)]
+
+    def _classify(self, task: str) -> Dict[str, str]:
+        body = task.split("Classify the following clauses:", 1)[-1]
+        parts = re.split(r"(?m)^\s*\[(\d+)\]\s", body)[1:]
+
+        labels = {}
+        for cid, clause in zip(parts[::2], parts[1::2]):
+            low = clause.lower()
+            label = "other"
+            for clause_type, words in _CLASSIFIER_KEYWORDS:
+                if any(w in low for w in words):
+                    label = clause_type
+                    break
+            labels[cid] = label
+        return labels
+
+    def _validate_risks(self, task: str) -> List[Dict[str, Any]]:
+        out = []
+        pattern = r"Clause ID: (-?\d+)\s*\nRisk Type: (.+?)\s*\nRetrieval Score: ([\d.]+)"
+        for cid, risk_type, score in re.findall(pattern, task):
+            out.append({
+                "risk_type": risk_type,
+                "clause_id": int(cid),
+                "risk_level": self._pick(["Low", "Medium", "High"], f"{cid}:{risk_type}"),
+                "explanation": f"Synthetic assessment of {risk_type.lower()}.",
+                "mitigation": "Negotiate clearer, balanced wording.",
+                "similarity_score": float(score),
+            })
+        return out
+
+    def _discover_risks(self, task: str) -> List[Dict[str, Any]]:
+        cids = self._clause_ids(task.split("Evidence clauses:", 1)[-1])
+        out = []
+        for i, cid in enumerate(cids[:3]):
+            out.append({
+                "risk_type": f"Synthetic Risk {i + 1}",
+                "risk_level": self._pick(["Low", "Medium", "High"], f"discover:{cid}"),
+                "explanation": "Synthetic additional risk.",
+                "mitigation": "Review with counsel.",
+                "citations": [cid],
+            })
+        return out
+
+    def _structured(self, task: str) -> Dict[str, Any]:
+        body = task.split("Retrieved evidence per section:", 1)[-1]
+        keys = re.findall(r"[{,]\s*'(\w+)':\s", body)
+
+        out: Dict[str, Any] = {}
+        for key in keys:
+            if key == "other_red_flags":
+                out[key] = [{"issue": "Synthetic red flag", "citations": []}]
+                continue
+            out[key] = {"answer": f"Synthetic {key.replace('_', ' ')} summary.", "citations": []}
+        return out
+
+    def _summary(self, task: str) -> Dict[str, Any]:
+        cids = self._clause_ids(task)
+        return {
+            "summary": f"Synthetic summary of {len(cids)} clauses.",
+            "bullets": [f"Point drawn from [Clause {cid}]" for cid in cids[:5]],
+            "key_citations": cids[:5],
+        }
+
+    def _questions(self, task: str) -> List[Dict[str, Any]]:
+        cids = self._clause_ids(task)
+        return [
+            {
+                "question": f"Synthetic question {i + 1}?",
+                "reason": "Synthetic reason.",
+                "citations": [cid],
+            }
+            for i, cid in enumerate(cids[:6])
+        ]
+
+
+def provider_from_env(model: str) -> LLMProvider:
+    """
+    LLM_PROVIDER = gemini (default) | record | replay | synthetic
+    """
+    kind = os.getenv("LLM_PROVIDER", "gemini").strip().lower()
+    replay_dir = os.getenv("LLM_REPLAY_DIR", os.path.join(DATA_DIR, "llm_replay"))
+
+    if kind == "gemini":
+        return GeminiProvider(model)
+
+    if kind == "record":
+        return ReplayProvider(replay_dir, mode="record", inner=GeminiProvider(model))
+
+    if kind == "replay":
+        return ReplayProvider(replay_dir, mode="replay", model=model)
+
+    if kind == "synthetic":
+        seed = os.getenv("LLM_SYNTH_SEED")
+        return SyntheticProvider(
+            latency_ms=float(os.getenv("LLM_SYNTH_LATENCY_MS", "800")),
+            jitter_ms=float(os.getenv("LLM_SYNTH_JITTER_MS", "300")),
+            seed=int(seed) if seed else None,
+            tail_rate=float(os.getenv("LLM_SYNTH_TAIL_RATE", "0")),
+            tail_ms=float(os.getenv("LLM_SYNTH_TAIL_MS", "0")),
+            error_rate=float(os.getenv("LLM_SYNTH_ERROR_RATE", "0")),
+        )
+
+    raise ValueError(f"Unknown LLM_PROVIDER: {kind}")
@@ -16,4 +16,4 @@ Use ONLY the provided clauses. If not found, say Not found.
 Always cite as [Clause N]. Return plain text."""
     user_prompt = f"Question: {question}\n\nClauses:\n{context}"
 
-    return call_llm(system_prompt=system_prompt, user_prompt=user_prompt)
\ No newline at end of file
+    return call_llm(system_prompt=system_prompt, user_prompt=user_prompt, tool="qa")
\ No newline at end of file
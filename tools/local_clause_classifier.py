@@ -0,0 +1,251 @@
+"""
+Nearest-centroid clause classifier on the sentence embeddings computed at ingest.
+
+Centroids come from a small seed set plus past LLM labels (registered by the
+API via set_label_source). Clauses it is unsure about are left for the LLM
+classifier; see tools.clause_classifier.classify_clauses.
+
+Accuracy/latency against stored LLM labels: benchmarks/bench_clause_classifier.py
+"""
+import os
+import time
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from tools.logger import logger
+
+LOCAL_CLASSIFIER = os.getenv("LOCAL_CLASSIFIER", "1") not in {"0", "false", "False", ""}
+# Accept the local label only if the softmax probability of the best class and
+# its raw cosine similarity both clear these bars; otherwise the LLM decides.
+LOCAL_CLASSIFIER_MIN_CONFIDENCE = float(os.getenv("LOCAL_CLASSIFIER_MIN_CONFIDENCE", "0.6"))
+LOCAL_CLASSIFIER_MIN_SIM = float(os.getenv("LOCAL_CLASSIFIER_MIN_SIM", "0.35"))
+LOCAL_CLASSIFIER_TEMPERATURE = float(os.getenv("LOCAL_CLASSIFIER_TEMPERATURE", "0.02"))
+# Most recent LLM-labelled clauses used for training, and how often to refit
+LOCAL_CLASSIFIER_MAX_TRAIN = int(os.getenv("LOCAL_CLASSIFIER_MAX_TRAIN", "5000"))
+LOCAL_CLASSIFIER_REFRESH_SECONDS = float(os.getenv("LOCAL_CLASSIFIER_REFRESH_SECONDS", "3600"))
+# After a failed fit, wait this long before trying again (LLM only meanwhile)
+LOCAL_CLASSIFIER_RETRY_SECONDS = float(os.getenv("LOCAL_CLASSIFIER_RETRY_SECONDS", "60"))
+
+SEED_CLAUSES: Dict[str, List[str]] = {
+    "confidentiality": [
+        "The Employee shall keep confidential all information relating to the business of the Company and shall not disclose it to any third party.",
+        "All trade secrets, client lists and proprietary information shall be treated as strictly confidential during and after employment.",
+        "The Employee shall not, without prior written consent, disclose any confidential information obtained in the course of employment.",
+        "The obligations of non-disclosure shall survive the termination of this Agreement.",
+        "Upon leaving, the Employee shall return all documents and materials containing confidential information.",
+    ],
+    "termination": [
+        "Either party may terminate this Agreement by giving thirty days written notice to the other party.",
+        "The Company may terminate the employment without notice in case of misconduct, fraud or breach of this Agreement.",
+        "The Employee may resign by serving a notice period of two months or paying salary in lieu of notice.",
+        "During the probation period, employment may be terminated by either party with seven days notice.",
+        "Upon termination, the Employee shall be relieved only after completing the handover of all responsibilities.",
+    ],
+    "payment": [
+        "The Employee shall be paid a monthly salary of Rs. 50,000 payable on the last working day of each month.",
+        "The total annual cost to company (CTC) is Rs. 6,00,000 inclusive of all allowances and benefits.",
+        "The Employee shall be eligible for a performance bonus at the sole discretion of the management.",
+        "Remuneration shall be subject to deduction of income tax at source and other statutory deductions.",
+        "The stipend of Rs. 15,000 per month shall be paid during the internship period.",
+    ],
+    "dispute_resolution": [
+        "Any dispute arising out of this Agreement shall be referred to arbitration by a sole arbitrator appointed by the Company.",
+        "The arbitration shall be conducted in English under the Arbitration and Conciliation Act, 1996.",
+        "The parties shall first attempt to resolve any dispute amicably through mutual discussion.",
+        "Disputes not resolved by negotiation within thirty days shall be submitted to mediation.",
+    ],
+    "non_compete": [
+        "For a period of one year after leaving, the Employee shall not join or engage in any business competing with the Company.",
+        "The Employee shall not solicit or entice away any client, customer or employee of the Company.",
+        "During employment the Employee shall not take up any other employment or business without written permission.",
+        "The Employee agrees not to work for any competitor of the Company within the same city for twelve months.",
+    ],
+    "intellectual_property": [
+        "All inventions, designs, software and works created by the Employee during employment shall be the exclusive property of the Company.",
+        "The Employee assigns to the Company all intellectual property rights in any work product, including source code and documentation.",
+        "The Employee shall execute all documents required to register patents, copyrights or trademarks in the name of the Company.",
+        "Any invention conceived using Company resources shall vest in the Company.",
+    ],
+    "liability": [
+        "The Employee shall indemnify the Company against any loss or damages caused by negligence or breach of this Agreement.",
+        "The Company shall not be liable for any indirect, incidental or consequential damages.",
+        "The Employee shall be liable to compensate the Company for any loss of property entrusted to them.",
+        "The total liability of either party shall not exceed the amount paid under this Agreement.",
+    ],
+    "governing_law": [
+        "This Agreement shall be governed by and construed in accordance with the laws of India.",
+        "The courts at Bengaluru shall have exclusive jurisdiction over all matters arising from this Agreement.",
+        "This Agreement is subject to the jurisdiction of the courts of Mumbai.",
+    ],
+    "employment_terms": [
+        "The Employee is appointed to the designation of Software Engineer and shall report to the Engineering Manager.",
+        "The Employee shall be on probation for a period of six months from the date of joining.",
+        "The normal working hours are from 9:30 AM to 6:30 PM, Monday to Friday.",
+        "The Employee is entitled to 18 days of paid leave per calendar year in addition to public holidays.",
+        "The place of posting shall be Pune, and the Employee may be transferred to any other location.",
+        "The Employee shall join on or before the date mentioned in this letter.",
+    ],
+    "other": [
+        "This Agreement constitutes the entire agreement between the parties and supersedes all prior understandings.",
+        "If any provision of this Agreement is held invalid, the remaining provisions shall continue in full force.",
+        "Any amendment to this Agreement shall be valid only if made in writing and signed by both parties.",
+        "All notices under this Agreement shall be sent in writing to the addresses mentioned above.",
+        "This Agreement may be executed in counterparts, each of which shall be deemed an original.",
+        "Please sign and return the duplicate copy of this letter as a token of your acceptance.",
+        "Headings are for convenience only and shall not affect the interpretation of this Agreement.",
+    ],
+}
+
+LabelSource = Callable[[int], List[Tuple[str, str]]]  # limit -> [(text, clause_type), ...]
+
+
+class CentroidClassifier:
+    """
+    One unit-length centroid per clause type; prediction is a single matmul.
+    """
+
+    def __init__(self, labels: List[str], centroids: np.ndarray, counts: np.ndarray):
+        self.labels = labels
+        self.centroids = centroids
+        self.counts = counts
+
+    @classmethod
+    def fit(cls, vectors: np.ndarray, labels: Sequence[str]) -> "CentroidClassifier":
+        vectors = _unit(vectors)
+        names = sorted(set(labels))
+        y = np.array([names.index(l) for l in labels])
+        centroids = np.zeros((len(names), vectors.shape[1]), dtype="float32")
+        np.add.at(centroids, y, vectors)
+        return cls(names, _unit(centroids), np.bincount(y, minlength=len(names)))
+
+    def predict(self, vectors: np.ndarray) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """
+        -> (labels, confidence = softmax probability of the best class, cosine to its centroid)
+        """
+        sims = _unit(vectors) @ self.centroids.T
+        best = sims.argmax(axis=1)
+        top = sims[np.arange(len(sims)), best]
+        z = np.exp((sims - top[:, None]) / max(LOCAL_CLASSIFIER_TEMPERATURE, 1e-6))
+        confidence = 1.0 / z.sum(axis=1)
+        return [self.labels[i] for i in best], confidence, top
+
+    def confident(self, confidence: np.ndarray, sims: np.ndarray) -> np.ndarray:
+        return (confidence >= LOCAL_CLASSIFIER_MIN_CONFIDENCE) & (sims >= LOCAL_CLASSIFIER_MIN_SIM)
+
+
+def _unit(m: np.ndarray) -> np.ndarray:
+    m = np.asarray(m, dtype="float32")
+    return m / np.clip(np.linalg.norm(m, axis=1, keepdims=True), 1e-12, None)
+
+
+def seed_examples() -> List[Tuple[str, str]]:
+    return [(text, label) for label, texts in SEED_CLAUSES.items() for text in texts]
+
+
+def fit_local_classifier(
+    examples: Sequence[Tuple[str, str]],
+    encode: Optional[Callable[[List[str]], np.ndarray]] = None,
+) -> CentroidClassifier:
+    """
+    Fit on seed examples + the given (text, clause_type) pairs.
+    """
+    if encode is None:
+        from rag.vector_store import encode_texts as encode
+
+    rows = seed_examples() + [(t, l) for t, l in examples if t and l]
+    return CentroidClassifier.fit(encode([t for t, _ in rows]), [l for _, l in rows])
+
+
+_LABEL_SOURCE: Optional[LabelSource] = None
+_CLASSIFIER: Optional[CentroidClassifier] = None
+_FITTED_AT = 0.0  # last fit attempt, successful or not
+_FIT_FAILED = False
+_LOCK = threading.Lock()
+_STATS_LOCK = threading.Lock()
+_STATS = {"fits": 0, "train_rows": 0, "local": 0, "llm": 0}
+
+
+def set_label_source(fn: Optional[LabelSource]):
+    """
+    Where past LLM labels come from (the API reads them from the clauses table).
+    """
+    global _LABEL_SOURCE
+    _LABEL_SOURCE = fn
+
+
+def _refit():
+    global _CLASSIFIER, _FITTED_AT
+    rows: List[Tuple[str, str]] = []
+    if _LABEL_SOURCE is not None:
+        try:
+            rows = _LABEL_SOURCE(LOCAL_CLASSIFIER_MAX_TRAIN)
+        except Exception as e:
+            logger.warning(f"[LOCAL CLASSIFIER] could not load stored labels: {e}")
+
+    clf = fit_local_classifier(rows)
+    _CLASSIFIER, _FITTED_AT = clf, time.monotonic()
+    with _STATS_LOCK:
+        _STATS["fits"] += 1
+        _STATS["train_rows"] = len(rows)
+    logger.info(f"[LOCAL CLASSIFIER] fitted on {len(rows)} stored labels + {len(seed_examples())} seeds")
+
+
+def warm_local_classifier():
+    """
+    Start a background fit if one is due and none is running (called at API
+    startup, and by get_local_classifier for refits).
+    """
+    if LOCAL_CLASSIFIER and _fit_due() and _LOCK.acquire(blocking=False):
+        threading.Thread(target=_fit_and_release, name="local-classifier-fit", daemon=True).start()
+
+
+def _fit_and_release():
+    global _FITTED_AT, _FIT_FAILED
+    try:
+        if _fit_due():
+            _refit()
+            _FIT_FAILED = False
+    except Exception as e:
+        _FITTED_AT, _FIT_FAILED = time.monotonic(), True
+        logger.warning(f"[LOCAL CLASSIFIER] fit failed, retrying in {LOCAL_CLASSIFIER_RETRY_SECONDS:g}s: {e}")
+    finally:
+        _LOCK.release()
+
+
+def get_local_classifier() -> Optional[CentroidClassifier]:
+    """
+    The current model; never fits inline. A due (re)fit runs on a background
+    thread every LOCAL_CLASSIFIER_REFRESH_SECONDS, or LOCAL_CLASSIFIER_RETRY_SECONDS
+    after a failure, and callers keep using the current model meanwhile.
+    None when disabled or no fit has finished yet (callers go to the LLM).
+    """
+    if not LOCAL_CLASSIFIER:
+        return None
+    warm_local_classifier()
+    return _CLASSIFIER
+
+
+def _fit_due() -> bool:
+    if _FIT_FAILED:
+        return time.monotonic() - _FITTED_AT > LOCAL_CLASSIFIER_RETRY_SECONDS
+    return _CLASSIFIER is None or time.monotonic() - _FITTED_AT > LOCAL_CLASSIFIER_REFRESH_SECONDS
+
+
+def record_classified(local: int, llm: int):
+    with _STATS_LOCK:
+        _STATS["local"] += local
+        _STATS["llm"] += llm
+
+
+def local_classifier_stats() -> Dict[str, float]:
+    with _STATS_LOCK:
+        stats = dict(_STATS)
+    total = stats["local"] + stats["llm"]
+    return {
+        "enabled": LOCAL_CLASSIFIER,
+        "fitted": _CLASSIFIER is not None,
+        **stats,
+        "local_share": round(stats["local"] / total, 4) if total else 0.0,
+    }
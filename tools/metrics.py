@@ -1,4 +1,9 @@
 import time
+import bisect
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence
+
 from tools.logger import logger
 
 def time_it(label: str, fn , *args, **kwargs):
@@ -14,4 +19,108 @@ def time_it(label: str, fn , *args, **kwargs):
 
     logger.info(f"[PERF] {label} took {duration_ms} ms")
 
-    return result, duration_ms
\ No newline at end of file
+    return result, duration_ms
+
+
+class RollingPercentile:
+    """
+    Percentiles over the last `window` samples (thread-safe).
+    """
+
+    def __init__(self, window: int = 500):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, value: float):
+        with self._lock:
+            self._samples.append(value)
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._samples)
+
+    def percentile(self, p: float) -> Optional[float]:
+        with self._lock:
+            ordered = sorted(self._samples)
+        if not ordered:
+            return None
+        idx = min(len(ordered) - 1, max(0, int(round(p / 100.0 * (len(ordered) - 1)))))
+        return ordered[idx]
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram (Prometheus style, cumulative buckets on export).
+    Percentiles are estimated as the upper bound of the bucket they fall in.
+    """
+
+    DEFAULT_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS_MS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # last = +Inf
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._count += 1
+            self._sum += value
+            self._max = max(self._max, value)
+
+    def _quantile(self, counts: List[int], total: int, q: float) -> float:
+        target = q * total
+        running = 0
+        for i, c in enumerate(counts):
+            running += c
+            if running >= target:
+                return float(self.buckets[i]) if i < len(self.buckets) else self._max
+        return self._max
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = list(self._counts)
+            total, s, mx = self._count, self._sum, self._max
+
+        cumulative: Dict[str, int] = {}
+        running = 0
+        for bound, c in zip(list(self.buckets) + ["+Inf"], counts):
+            running += c
+            cumulative[f"le_{bound}"] = running
+
+        return {
+            "count": total,
+            "sum": round(s, 3),
+            "mean": round(s / total, 3) if total else 0.0,
+            "max": round(mx, 3),
+            "p50": self._quantile(counts, total, 0.50) if total else 0.0,
+            "p95": self._quantile(counts, total, 0.95) if total else 0.0,
+            "p99": self._quantile(counts, total, 0.99) if total else 0.0,
+            "buckets": cumulative,
+        }
+
+
+_HISTOGRAMS: Dict[str, Histogram] = {}
+_HISTOGRAMS_LOCK = threading.Lock()
+
+
+def get_histogram(name: str, buckets: Sequence[float] = Histogram.DEFAULT_BUCKETS_MS) -> Histogram:
+    """
+    Process-wide named histograms, e.g. "llm.queue_wait_ms.interactive".
+    """
+    with _HISTOGRAMS_LOCK:
+        h = _HISTOGRAMS.get(name)
+        if h is None:
+            h = Histogram(buckets)
+            _HISTOGRAMS[name] = h
+        return h
+
+
+def histograms_snapshot(prefix: str = "") -> Dict[str, Dict[str, Any]]:
+    with _HISTOGRAMS_LOCK:
+        items = [(n, h) for n, h in _HISTOGRAMS.items() if n.startswith(prefix)]
+    return {n: h.snapshot() for n, h in sorted(items)}
@@ -1,9 +1,13 @@
 import re
 from typing import List, Dict, Any, Optional, Tuple
 
+import numpy as np
+
 from llm import call_llm
-from tools.json_utils import safe_json_load
+from tools.llm_metrics import record_parse
+from tools.json_utils import parses_as, safe_json_load
 from tools.confidence import l2_to_confidence
+from rag.vector_store import nearest_rows
 
 
 BLOCKLIST = {
@@ -21,6 +25,14 @@ BLOCKLIST = {
     "Automatic Renewal",
 }
 
+DISCOVERY_QUERIES = [
+    "unfair obligations or one-sided terms employee must follow penalties",
+    "hidden restrictions resignation early termination bond damages section 73 74",
+    "employer discretion modify terms from time to time policy unilateral change",
+    "liability indemnity unlimited damages employee responsible loss",
+    "confidentiality very broad perpetual worldwide trade secrets",
+]
+
 def _clean_json(raw: str) -> str:
     raw = (raw or "").strip()
     raw = re.sub(r"^```(?:json)?\s*|\s*```$", "", raw).strip()
@@ -43,33 +55,22 @@ def discover_additional_risks(
     if vector_store is None:
         return []
 
-    DISCOVERY_QUERIES = [
-        "unfair obligations or one-sided terms employee must follow penalties",
-        "hidden restrictions resignation early termination bond damages section 73 74",
-        "employer discretion modify terms from time to time policy unilateral change",
-        "liability indemnity unlimited damages employee responsible loss",
-        "confidentiality very broad perpetual worldwide trade secrets",
-    ]
-
-    seen: set[int] = set()
-    picked: List[Tuple[int, str, float]] = []
-
-    # Pulls stronger clauses first 
-    for q in DISCOVERY_QUERIES:
-        hits = vector_store.search_with_scores(q, k=max(6, k // 2))  
-        for cid, txt, dist in hits:
-            if not isinstance(cid, int):
-                continue
-            if cid in seen:
-                continue
-            seen.add(cid)
-            picked.append((cid, txt, float(dist)))
-
-    if not picked:
+    # top hits per query from the precomputed query x clause distances,
+    # deduplicated (a clause keeps its best distance) and sorted globally
+    dist = vector_store.query_distances(DISCOVERY_QUERIES)
+    rows = nearest_rows(dist, max(6, k // 2))
+    if not rows.size:
         return []
 
-    picked.sort(key=lambda x: x[2]) 
-    picked = picked[:k]
+    hit = np.full(dist.shape, np.inf, dtype="float32")
+    np.put_along_axis(hit, rows, np.take_along_axis(dist, rows, axis=1), axis=1)
+    best = hit.min(axis=0)
+    cand = np.flatnonzero(np.isfinite(best))
+    cand = cand[np.argsort(best[cand], kind="stable")][:k]
+
+    picked: List[Tuple[int, str, float]] = [
+        (int(vector_store.ids[r]), vector_store.texts[r], float(best[r])) for r in cand
+    ]
 
     evidence = "\n\n".join([f"[Clause {cid}] {_cap(txt, 800)}" for cid, txt, _ in picked])
 
@@ -110,12 +111,15 @@ Evidence clauses:
 Return 3-6 additional risks max.
 """
 
-    raw = call_llm(system_prompt=system_prompt, user_prompt=user_prompt)
+    raw = call_llm(
+        system_prompt=system_prompt, user_prompt=user_prompt, tool="open_risk_discovery", validate=parses_as(list)
+    )
     raw = _clean_json(raw)
 
     try:
         data = safe_json_load(raw)
         if not isinstance(data, list):
+            record_parse("open_risk_discovery", False)
             return []
 
         out: List[Dict[str, Any]] = []
@@ -146,7 +150,9 @@ Return 3-6 additional risks max.
                 "citations": [c for c in citations if isinstance(c, int)],
             })
 
+        record_parse("open_risk_discovery", True)
         return out[:6]
 
     except Exception:
+        record_parse("open_risk_discovery", False)
         return []
\ No newline at end of file
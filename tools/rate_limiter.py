@@ -0,0 +1,245 @@
+import os
+import time
+import uuid
+import random
+import sqlite3
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from tools.logger import logger
+from tools.metrics import get_histogram, histograms_snapshot
+
+DATA_DIR = os.getenv("DATA_DIR", "/tmp/data")
+
+# Provider quota shared by every worker on the node. 0 = no limit.
+LLM_RATE_PER_MIN = float(os.getenv("LLM_RATE_PER_MIN", "0"))
+LLM_RATE_BURST = float(os.getenv("LLM_RATE_BURST", "10"))
+LLM_RATE_LIMIT_PATH = os.getenv("LLM_RATE_LIMIT_PATH", os.path.join(DATA_DIR, "llm_ratelimit.sqlite3"))
+
+# A background caller that has waited this long stops yielding to interactive ones
+LLM_RATE_MAX_STARVE_S = float(os.getenv("LLM_RATE_MAX_STARVE_S", "30"))
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BACKGROUND = "background"
+
+_PRIORITY_RANK = {PRIORITY_INTERACTIVE: 0, PRIORITY_BACKGROUND: 1}
+
+# Waiter rows not refreshed for this long belong to dead workers and are ignored
+_WAITER_STALE_S = 5.0
+_MAX_POLL_S = 0.25
+
+_PRIORITY: contextvars.ContextVar[str] = contextvars.ContextVar("llm_priority", default=PRIORITY_INTERACTIVE)
+
+
+class RateLimitTimeout(TimeoutError):
+    """
+    No token became available before the caller's timeout.
+    """
+
+
+@contextmanager
+def llm_priority(priority: str):
+    """
+    Tag every LLM call in this block (and in tool threads started from it)
+    with a priority class: "interactive" (default) or "background".
+    """
+    if priority not in _PRIORITY_RANK:
+        raise ValueError(f"Unknown priority: {priority}")
+    token = _PRIORITY.set(priority)
+    try:
+        yield
+    finally:
+        _PRIORITY.reset(token)
+
+
+def current_priority() -> str:
+    return _PRIORITY.get()
+
+
+class TokenBucketLimiter:
+    """
+    Token bucket kept in a node-local SQLite file, so all uvicorn workers
+    draw from the same provider quota.
+
+    Priority: callers register in a `waiters` table while they wait. A caller
+    only takes a token when no waiter of a higher priority class is queued
+    (anywhere on the node), so interactive QA overtakes background indexing.
+    Background callers stop yielding after LLM_RATE_MAX_STARVE_S.
+    """
+
+    def __init__(self, path: str, rate_per_s: float, burst: float, name: str = "llm"):
+        self.path = path
+        self.rate_per_s = rate_per_s
+        self.burst = max(1.0, burst)
+        self.name = name
+
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._init_schema()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS waiters ("
+            " id TEXT PRIMARY KEY, name TEXT NOT NULL, priority INTEGER NOT NULL, heartbeat REAL NOT NULL)"
+        )
+        conn.execute(
+            "INSERT OR IGNORE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)",
+            (self.name, self.burst, time.time()),
+        )
+
+    def _try_take(self, conn: sqlite3.Connection, waiter_id: str, rank: int, yield_to_higher: bool) -> float:
+        """
+        One transaction: refill, then take a token if allowed.
+        Returns 0.0 on success, otherwise a suggested sleep in seconds.
+        """
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            tokens, updated = conn.execute(
+                "SELECT tokens, updated FROM buckets WHERE name = ?", (self.name,)
+            ).fetchone()
+            tokens = min(self.burst, tokens + max(0.0, now - updated) * self.rate_per_s)
+
+            blocked = False
+            if yield_to_higher:
+                blocked = conn.execute(
+                    "SELECT COUNT(*) FROM waiters WHERE name = ? AND priority < ? AND heartbeat > ?",
+                    (self.name, rank, now - _WAITER_STALE_S),
+                ).fetchone()[0] > 0
+
+            if tokens >= 1.0 and not blocked:
+                conn.execute(
+                    "UPDATE buckets SET tokens = ?, updated = ? WHERE name = ?", (tokens - 1.0, now, self.name)
+                )
+                conn.execute("DELETE FROM waiters WHERE id = ?", (waiter_id,))
+                conn.execute("COMMIT")
+                return 0.0
+
+            conn.execute("UPDATE buckets SET tokens = ?, updated = ? WHERE name = ?", (tokens, now, self.name))
+            conn.execute(
+                "INSERT OR REPLACE INTO waiters (id, name, priority, heartbeat) VALUES (?, ?, ?, ?)",
+                (waiter_id, self.name, rank, now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        if tokens < 1.0:
+            return (1.0 - tokens) / self.rate_per_s
+        return _MAX_POLL_S  # token available but a higher class is queued
+
+    def acquire(self, priority: str = PRIORITY_INTERACTIVE, timeout: Optional[float] = None) -> float:
+        """
+        Block until a token is granted. Returns seconds spent waiting.
+        Raises RateLimitTimeout if `timeout` elapses first.
+        """
+        rank = _PRIORITY_RANK.get(priority, 0)
+        waiter_id = f"{os.getpid()}:{threading.get_ident()}:{uuid.uuid4().hex}"
+        conn = self._conn()
+        start = time.monotonic()
+
+        try:
+            while True:
+                waited = time.monotonic() - start
+                yield_to_higher = rank > 0 and waited < LLM_RATE_MAX_STARVE_S
+
+                sleep_s = self._try_take(conn, waiter_id, rank, yield_to_higher)
+                if sleep_s == 0.0:
+                    get_histogram(f"llm.queue_wait_ms.{priority}").observe(waited * 1000)
+                    return waited
+
+                if timeout is not None and waited + min(sleep_s, _MAX_POLL_S) > timeout:
+                    raise RateLimitTimeout(f"rate limit wait exceeded {timeout:.2f}s")
+
+                # short, jittered polls keep the heartbeat fresh and spread workers out
+                time.sleep(min(sleep_s, _MAX_POLL_S) * random.uniform(0.8, 1.2))
+        except BaseException:
+            try:
+                conn.execute("DELETE FROM waiters WHERE id = ?", (waiter_id,))
+            except sqlite3.Error:
+                pass
+            raise
+
+    def try_acquire(self, priority: str = PRIORITY_INTERACTIVE) -> bool:
+        """
+        Non-blocking: take a token only if one is free right now.
+        """
+        rank = _PRIORITY_RANK.get(priority, 0)
+        waiter_id = f"{os.getpid()}:{threading.get_ident()}:{uuid.uuid4().hex}"
+        conn = self._conn()
+        if self._try_take(conn, waiter_id, rank, yield_to_higher=rank > 0) == 0.0:
+            return True
+        conn.execute("DELETE FROM waiters WHERE id = ?", (waiter_id,))
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        conn = self._conn()
+        tokens, updated = conn.execute(
+            "SELECT tokens, updated FROM buckets WHERE name = ?", (self.name,)
+        ).fetchone()
+        waiting = conn.execute(
+            "SELECT priority, COUNT(*) FROM waiters WHERE name = ? AND heartbeat > ? GROUP BY priority",
+            (self.name, now - _WAITER_STALE_S),
+        ).fetchall()
+        rank_to_name = {v: k for k, v in _PRIORITY_RANK.items()}
+
+        return {
+            "rate_per_min": round(self.rate_per_s * 60, 3),
+            "burst": self.burst,
+            "tokens": round(min(self.burst, tokens + max(0.0, now - updated) * self.rate_per_s), 3),
+            "waiting": {rank_to_name.get(r, str(r)): n for r, n in waiting},
+        }
+
+
+_LIMITER: Optional[TokenBucketLimiter] = None
+_LIMITER_LOCK = threading.Lock()
+_LIMITER_FAILED = False
+
+
+def get_rate_limiter() -> Optional[TokenBucketLimiter]:
+    """
+    Singleton per worker process. None when LLM_RATE_PER_MIN is 0 or the
+    shared file can't be opened (calls then go through unthrottled).
+    """
+    global _LIMITER, _LIMITER_FAILED
+    if LLM_RATE_PER_MIN <= 0 or _LIMITER_FAILED:
+        return None
+    if _LIMITER is None:
+        with _LIMITER_LOCK:
+            if _LIMITER is None and not _LIMITER_FAILED:
+                try:
+                    _LIMITER = TokenBucketLimiter(
+                        LLM_RATE_LIMIT_PATH,
+                        rate_per_s=LLM_RATE_PER_MIN / 60.0,
+                        burst=LLM_RATE_BURST,
+                    )
+                except Exception as e:
+                    logger.warning(f"[RATE LIMIT] disabled, could not open {LLM_RATE_LIMIT_PATH}: {e}")
+                    _LIMITER_FAILED = True
+                    return None
+    return _LIMITER
+
+
+def rate_limiter_stats() -> Dict[str, Any]:
+    limiter = get_rate_limiter()
+    out: Dict[str, Any] = {"enabled": limiter is not None}
+    if limiter is not None:
+        out.update(limiter.stats())
+    out["queue_wait_ms"] = histograms_snapshot("llm.queue_wait_ms.")
+    return out
@@ -4,26 +4,31 @@ from tools.structured_analyzer import structured_analysis
 from tools.full_risk_engine import analyze_full_contract_risk
 from tools.unclear_detector import find_unclear_or_missing
 from tools.legal_question_generator import generate_legal_questions
+from tools.concurrency import run_parallel
 
 def build_full_report(store, vector_store):
     """
     One-call report builder.
     Returns dict you can print or save as JSON.
-    """
 
-    summary = summarize_contract(store)
-    key_clauses = extract_key_clauses(store, vector_store, top_k=3)
-    structured = structured_analysis(store, vector_store, k_per_section=3)
-    risk_report = analyze_full_contract_risk(store,vector_store=vector_store)
+    The sections are independent, so their LLM calls run concurrently
+    (bounded by LLM_MAX_CONCURRENCY in llm.py).
+    """
 
-    unclear = find_unclear_or_missing(store)
-    questions = generate_legal_questions(vector_store, k=4)
+    sections = run_parallel({
+        "summary": lambda: summarize_contract(store),
+        "key_clauses": lambda: extract_key_clauses(store, vector_store, top_k=3),
+        "structured_analysis": lambda: structured_analysis(store, vector_store, k_per_section=3),
+        "risk_report": lambda: analyze_full_contract_risk(store, vector_store=vector_store),
+        "unclear_or_missing": lambda: find_unclear_or_missing(store),
+        "questions_to_ask_lawyer": lambda: generate_legal_questions(vector_store, k=4),
+    })
 
     return {
-        "summary": summary,
-        "key_clauses": key_clauses,
-        "structured_analysis": structured,
-        "risk_report": risk_report,
-        "unclear_or_missing": unclear,
-        "questions_to_ask_lawyer": questions,
-    }
\ No newline at end of file
+        "summary": sections["summary"],
+        "key_clauses": sections["key_clauses"],
+        "structured_analysis": sections["structured_analysis"],
+        "risk_report": sections["risk_report"],
+        "unclear_or_missing": sections["unclear_or_missing"],
+        "questions_to_ask_lawyer": sections["questions_to_ask_lawyer"],
+    }
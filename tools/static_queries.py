@@ -0,0 +1,41 @@
+import os
+from typing import List
+
+from tools.hybrid_risk_engine import RISK_TEMPLATES
+from tools.open_risk_discovery import DISCOVERY_QUERIES
+from tools.key_clause_extractor import KEY_TOPICS
+from tools.structured_analyzer import SECTIONS
+from tools.legal_question_generator import QUESTION_AREAS
+
+from rag.vector_store import EMBED_DIM, EMBED_MODEL_ID, encode_texts
+from rag.query_embeddings import get_static_queries
+from tools.logger import logger
+
+STATIC_QUERY_PRECOMPUTE = os.getenv("STATIC_QUERY_PRECOMPUTE", "1") not in {"0", "false", "False", ""}
+
+
+def all_static_queries() -> List[str]:
+    """
+    Every fixed retrieval string the tools pass to VectorStore search.
+    """
+    queries: List[str] = list(RISK_TEMPLATES.values())
+    queries += DISCOVERY_QUERIES
+    queries += [q for _, q in KEY_TOPICS]
+    queries += [q for _, q in SECTIONS]
+    queries += [q for _, q in QUESTION_AREAS]
+    return list(dict.fromkeys(queries))
+
+
+def prepare_static_query_embeddings() -> int:
+    """
+    Load persisted static-query vectors for the current model, encoding (once)
+    any that are new. Called at API startup.
+    """
+    if not STATIC_QUERY_PRECOMPUTE:
+        return 0
+
+    store = get_static_queries(EMBED_MODEL_ID, EMBED_DIM)
+    queries = all_static_queries()
+    encoded = store.ensure(queries, encode_texts)
+    logger.info(f"[STATIC QUERIES] {len(queries)} ready ({encoded} newly encoded) model={EMBED_MODEL_ID}")
+    return encoded
@@ -1,7 +1,9 @@
 from llm import call_llm
-from tools.json_utils import safe_json_load
+from tools.llm_metrics import record_parse
+from tools.json_utils import parses_as, safe_json_load
 import re
 from tools.confidence import average_confidence
+from rag.vector_store import nearest_rows
 
 SECTIONS = [
     ("parties", "Identify parties (Employer / Employee), roles, and relationship"),
@@ -35,10 +37,14 @@ def structured_analysis(store, vector_store, k_per_section: int = 3):
     retrieved = {}
     section_conf_map = {}
 
-    for key, query in SECTIONS:
-        hits = vector_store.search_with_scores(query, k=k_per_section)  # [(cid, txt, dist), ...]
-        distances = [dist for _, _, dist in hits] if hits else []
-        section_conf = average_confidence(distances) if distances else 0.0
+    # section x clause distances precomputed at ingest; top-k per section
+    section_dist = vector_store.query_distances([query for _, query in SECTIONS])
+    ranked = nearest_rows(section_dist, k_per_section)
+
+    for i, (key, _) in enumerate(SECTIONS):
+        hits = [(int(vector_store.ids[r]), vector_store.texts[r], float(section_dist[i, r])) for r in ranked[i]]
+        distances = [d for _, _, d in hits]
+        section_conf = average_confidence(distances, metric=vector_store.metric) if distances else 0.0
         section_conf_map[key] = round(float(section_conf), 3)
 
         blocks = []
@@ -80,10 +86,13 @@ Create a structured contract analysis following the schema.
 Keep answers concise.
 """
 
-    raw = call_llm(system_prompt=system_prompt, user_prompt=user_prompt)
+    raw = call_llm(
+        system_prompt=system_prompt, user_prompt=user_prompt, tool="structured_analysis", validate=parses_as(dict)
+    )
     raw = _clean(raw)
 
     obj = safe_json_load(raw)
+    record_parse("structured_analysis", isinstance(obj, dict))
 
     overall_conf = round(sum(section_conf_map.values()) / max(1, len(section_conf_map)), 3)
     if isinstance(obj, dict):
@@ -1,5 +1,6 @@
 from llm import call_llm
-from tools.json_utils import safe_json_load
+from tools.llm_metrics import record_parse
+from tools.json_utils import parses_as, safe_json_load
 import re
 
 def summarize_contract(store,max_clauses : int = 40):
@@ -38,10 +39,16 @@ Contract clauses:
 Create a clear executive summary + 5-10 bullet points.
 """
     
-    raw = call_llm(system_prompt=system_prompt, user_prompt=user_prompt)
+    raw = call_llm(system_prompt=system_prompt, user_prompt=user_prompt, tool="summary", validate=parses_as(dict))
     raw = raw.strip()
     raw = re.sub(r"^```(?:json)?\s*|\s*```$", "", raw).strip()
-    return safe_json_load(raw)
+    try:
+        obj = safe_json_load(raw)
+    except Exception:
+        record_parse("summary", False)
+        raise
+    record_parse("summary", isinstance(obj, dict))
+    return obj
 
     try:
         return safe_json_load(raw)